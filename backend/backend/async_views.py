@@ -0,0 +1,80 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from rest_framework import exceptions
+
+from .query_budget import query_budget
+
+
+class AsyncAPIViewMixin:
+    """
+    Serves a DRF view as an async view on the ASGI application.
+
+    Mixed in before a synchronous APIView, it reuses the authentication, permission, pagination and
+    serializer setup of that view. Authentication runs on the event loop through the aauthenticate
+    method of the authenticators, and the handler runs there too when it is a coroutine. Django 3.2
+    has no async ORM, so a synchronous handler, which is where the queries are, runs in a single
+    sync_to_async call. The response is rendered on the event loop.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        async def view(request, *args, **kwargs):
+            self = cls(**initkwargs)
+            self.setup(request, *args, **kwargs)
+            return await self.adispatch(request, *args, **kwargs)
+
+        view.cls = view.view_class = cls
+        view.initkwargs = initkwargs
+        # Set directly, as the csrf_exempt decorator would hide that the view is a coroutine
+        view.csrf_exempt = True
+        return view
+
+    async def adispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            await self.aperform_authentication(request)
+            self.initial(request, *args, **kwargs)
+            handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            if asyncio.iscoroutinefunction(handler):
+                response = await handler(request, *args, **kwargs)
+            else:
+                response = await sync_to_async(self.run_handler)(handler, request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        response = self.finalize_response(request, response, *args, **kwargs)
+        # Rendered here as Django would otherwise render it on a worker thread
+        response.render()
+        rendered = HttpResponse(response.content, status=response.status_code)
+        for header, value in response.items():
+            rendered[header] = value
+        return rendered
+
+    def run_handler(self, handler, request, *args, **kwargs):
+        budget = getattr(self, 'query_budget', None)
+        if budget is None:
+            return handler(request, *args, **kwargs)
+        with query_budget(budget, self.__class__.__name__):
+            return handler(request, *args, **kwargs)
+
+    async def aperform_authentication(self, request):
+        for authenticator in request.authenticators:
+            aauthenticate = getattr(authenticator, 'aauthenticate', None)
+            try:
+                if aauthenticate is not None:
+                    user_auth_tuple = await aauthenticate(request)
+                else:
+                    user_auth_tuple = await sync_to_async(authenticator.authenticate)(request)
+            except exceptions.APIException:
+                request._not_authenticated()
+                raise
+            if user_auth_tuple is not None:
+                request._authenticator = authenticator
+                request.user, request.auth = user_auth_tuple
+                return
+        request._not_authenticated()
@@ -0,0 +1,71 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from .query_budget import QueryCounter
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies, elapsed):
+    """
+    Summarizes the per call latencies (seconds) of a run that took elapsed seconds.
+    """
+    return {
+        'calls': len(latencies),
+        'throughput': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'max_ms': round(max(latencies) * 1000, 3) if latencies else 0.0,
+    }
+
+
+def measure(call, calls, concurrency):
+    """
+    Runs call(index) for calls indexes from concurrency threads.
+
+    call returns whether it succeeded. Adds the failed calls and the mean and highest number of
+    queries per call to the latency summary.
+    """
+    def timed(index):
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            succeeded = call(index)
+        return time.perf_counter() - started, counter.count, succeeded
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        runs = list(pool.map(timed, range(calls)))
+    result = summarize([latency for latency, _, _ in runs], time.perf_counter() - started)
+    queries = [count for _, count, _ in runs]
+    result.update({
+        'errors': sum(1 for _, _, succeeded in runs if not succeeded),
+        'queries_mean': round(sum(queries) / len(queries), 2) if queries else 0.0,
+        'queries_max': max(queries, default=0),
+    })
+    return result
+
+
+@contextmanager
+def benchmark_database():
+    """
+    Runs the block against a new test database, dropped afterwards, like the test runner does.
+    """
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
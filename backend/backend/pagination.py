@@ -0,0 +1,98 @@
+import base64
+import json
+from functools import reduce
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Opaque cursor pagination over a unique, non null ordering.
+
+    The cursor holds the ordering values of the last row of a page and the next page is
+    fetched with a row comparison on them, so every page costs the same index range scan.
+    """
+    ordering = ()
+    page_size = 50
+    max_page_size = 200
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request, queryset.model)
+        if position is not None:
+            queryset = queryset.filter(self.position_filter(position))
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data
+        })
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def position_filter(self, position):
+        clauses = []
+        for index, field in enumerate(self.ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            equal = {ordering.lstrip('-'): position[ordering.lstrip('-')] for ordering in self.ordering[:index]}
+            clauses.append(Q(**equal, **{f'{name}__{lookup}': position[name]}))
+        # The inclusive bound on the leading column is redundant but lets the planner seek the index
+        leading = self.ordering[0].lstrip('-')
+        bound = Q(**{f"{leading}__{'lte' if self.ordering[0].startswith('-') else 'gte'}": position[leading]})
+        return bound & reduce(lambda left, right: left | right, clauses)
+
+    def get_position(self, item):
+        # Pages are model instances or, for values() querysets, dicts
+        if isinstance(item, dict):
+            return {field.lstrip('-'): item[field.lstrip('-')] for field in self.ordering}
+        return {field.lstrip('-'): getattr(item, field.lstrip('-')) for field in self.ordering}
+
+    def encode_cursor(self, item):
+        position = self.get_position(item)
+        values = [str(position[field.lstrip('-')]) for field in self.ordering]
+        return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii')
+
+    def get_cursor_field(self, model, name):
+        return model._meta.get_field(name)
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                raise ValueError
+            position = {}
+            for field, value in zip(self.ordering, values):
+                name = field.lstrip('-')
+                position[name] = self.get_cursor_field(model, name).to_python(value)
+            return position
+        except (TypeError, ValueError, UnicodeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
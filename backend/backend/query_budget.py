@@ -0,0 +1,61 @@
+import logging
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.paused = False
+
+    def __call__(self, execute, sql, params, many, context):
+        if not self.paused:
+            self.count += 1
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def query_budget(budget, name):
+    """
+    Counts the queries run inside the block and reports when there are more than budget.
+
+    Going over the budget raises QueryBudgetExceeded when QUERY_BUDGET_STRICT is set (development
+    and tests) and only logs a warning otherwise, so production traffic is never failed by it.
+    """
+    counter = QueryCounter()
+    with connection.execute_wrapper(counter):
+        yield counter
+    if counter.count > budget:
+        message = f'{name} ran {counter.count} queries, over its budget of {budget}'
+        if getattr(settings, 'QUERY_BUDGET_STRICT', False):
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+class QueryBudgetMixin:
+    query_budget = None
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.query_budget is None:
+            return super().dispatch(request, *args, **kwargs)
+        with query_budget(self.query_budget, self.__class__.__name__) as self.query_counter:
+            return super().dispatch(request, *args, **kwargs)
+
+    def perform_authentication(self, request):
+        # Authenticators only query when their cache misses, which is not the cost of the view
+        counter = getattr(self, 'query_counter', None)
+        if counter is None:
+            return super().perform_authentication(request)
+        counter.paused = True
+        try:
+            return super().perform_authentication(request)
+        finally:
+            counter.paused = False
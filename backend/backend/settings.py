@@ -17,6 +17,12 @@ DEBUG = True
 
 ALLOWED_HOSTS = ['*']
 
+# Views going over their declared query budget fail when strict and log a warning otherwise
+QUERY_BUDGET_STRICT = DEBUG
+
+# Turns request timing sampling off under tests
+TEST_RUNNER = 'backend.test_runner.TestRunner'
+
 
 # Application definition
 
@@ -35,6 +41,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'backend.timing.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -87,6 +94,19 @@ DATABASES = {
     }
 }
 
+# Local memory by default (development and tests). Every process must share one cache in production,
+# as it holds token revocations and the customer loan list responses.
+
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache')
+CACHE_LOCATION = os.environ.get('CACHE_LOCATION', default='')
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': CACHE_LOCATION,
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
@@ -129,13 +149,71 @@ STATIC_URL = '/static/'
 # Change default User Authentication Model
 AUTH_USER_MODEL = 'user.User'
 
+# Password hashing for logins runs on a pool of WORKERS threads, with at most QUEUE logins waiting
+# for up to TIMEOUT seconds before being refused
+LOGIN_HASHER = {
+    'WORKERS': os.cpu_count() or 1,
+    'QUEUE': 64,
+    'TIMEOUT': 10,
+}
+
+# Per process cache of authenticated users, entries live for TTL seconds or until the user changes in any process
+USER_CACHE = {
+    'MAX_SIZE': 1024,
+    'TTL': 60,
+}
+
+# Customer loan list responses are cached for TIMEOUT seconds, or until a loan of the customer changes
+CUSTOMER_LOAN_CACHE = {
+    'TIMEOUT': 300,
+}
+
+# Processes check for rate card changes made by other processes every CHECK_INTERVAL seconds
+RATE_CARD = {
+    'CHECK_INTERVAL': 5,
+}
+
+# Loan history older than this is moved to the archive table by archive_loan_history
+LOAN_HISTORY_RETENTION_DAYS = 180
+
+# Share of requests timed by RequestTimingMiddleware, reported in a Server-Timing header and a log line
+REQUEST_TIMING = {
+    'SAMPLE_RATE': float(os.environ.get('REQUEST_TIMING_SAMPLE_RATE', 0.01)),
+    'HEADER': True,
+    'LOG': True,
+}
+
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'backend.timing.TimedJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'backend.timing': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
 JWT_AUTH = {
     'JWT_ENCODE_HANDLER':
         'rest_framework_jwt.utils.jwt_encode_handler',
     'JWT_DECODE_HANDLER':
         'rest_framework_jwt.utils.jwt_decode_handler',
     'JWT_PAYLOAD_HANDLER':
-        'rest_framework_jwt.utils.jwt_payload_handler',
+        'user.utils.jwt_payload_handler',
     'JWT_PAYLOAD_GET_USER_ID_HANDLER':
         'rest_framework_jwt.utils.jwt_get_user_id_from_payload_handler',
     'JWT_RESPONSE_PAYLOAD_HANDLER':
@@ -156,4 +234,7 @@ JWT_AUTH = {
     'JWT_REFRESH_EXPIRATION_DELTA': timedelta(hours=2),
     'JWT_AUTH_HEADER_PREFIX': 'Bearer',
     'JWT_AUTH_COOKIE': None,
-}
\ No newline at end of file
+}
+
+# Read only views authorize from the role claims of the token instead of loading the user
+JWT_ROLE_CLAIMS = True
\ No newline at end of file
@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Runs the tests with request timing sampling turned off, so their responses and output never
+    depend on a random draw. The tests of the timing middleware turn it on with override_settings.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.request_timing = override_settings(REQUEST_TIMING={**settings.REQUEST_TIMING, 'SAMPLE_RATE': 0.0})
+        self.request_timing.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.request_timing.disable()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,181 @@
+import asyncio
+import json
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from rest_framework.renderers import JSONRenderer
+
+logger = logging.getLogger(__name__)
+
+# Timings of the sampled request being handled, None when it is not sampled
+_timings = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    def __init__(self):
+        self.durations = {}
+        self.queries = 0
+        self.active = set()
+
+    def add(self, name, seconds):
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+
+
+@contextmanager
+def timed(name):
+    """
+    Adds the time spent in the block to the name phase of the sampled request, if any.
+
+    Nested blocks of the same phase, such as nested serializers, are only counted once.
+    """
+    timings = _timings.get()
+    if timings is None or name in timings.active:
+        yield
+        return
+    timings.active.add(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.active.discard(name)
+        timings.add(name, time.perf_counter() - started)
+
+
+def time_queries(execute, sql, params, many, context):
+    timings = _timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.queries += 1
+        timings.add('db', time.perf_counter() - started)
+
+
+def install_query_timer(sender=None, connection=None, **kwargs):
+    # First in the list, as connection.execute_wrapper() blocks pop the last wrapper on exit
+    if time_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, time_queries)
+
+
+connection_created.connect(install_query_timer)
+
+
+class TimedSerializerMixin:
+    def to_representation(self, instance):
+        with timed('serialize'):
+            return super().to_representation(instance)
+
+
+class TimedJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timed('render'):
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+class RequestTimingMiddleware:
+    """
+    Times a sample of the requests and reports where their time went.
+
+    total covers the middleware below this one and the view, view starts once the URL has been
+    resolved, db is the time and number of queries, and auth, serialize and render are added by
+    the JWT authentication classes, the serializers and the JSON renderer. Sampled requests get a
+    Server-Timing header and a JSON log line on the backend.timing logger, as set in
+    REQUEST_TIMING. Requests left out of the sample only cost a random number.
+
+    It runs in the mode of the handler, so ASGI requests are not switched to a thread for it.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Makes the handler await __call__, as Django's MiddlewareMixin does
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+            # Django would run a sync view hook on a thread
+            self.process_view = self.aprocess_view
+        options = getattr(settings, 'REQUEST_TIMING', {})
+        self.sample_rate = options.get('SAMPLE_RATE', 0.0)
+        self.header = options.get('HEADER', True)
+        self.log = options.get('LOG', True)
+        # Connections of this thread opened before the middleware was loaded
+        for connection in connections.all():
+            install_query_timer(connection=connection)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+        timings = RequestTimings()
+        token = _timings.set(timings)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _timings.reset(token)
+        return self.report(request, response, timings, started)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+        timings = RequestTimings()
+        token = _timings.set(timings)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _timings.reset(token)
+        return self.report(request, response, timings, started)
+
+    def sampled(self):
+        return self.sample_rate and random.random() < self.sample_rate
+
+    def report(self, request, response, timings, started):
+        finished = time.perf_counter()
+        timings.add('total', finished - started)
+        view_started = getattr(request, '_timing_view_started', None)
+        if view_started is not None:
+            timings.add('view', finished - view_started)
+        if self.header:
+            response['Server-Timing'] = self.server_timing(timings)
+        if self.log:
+            self.log_timings(request, response, timings)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        self.start_view(request)
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        self.start_view(request)
+
+    def start_view(self, request):
+        if _timings.get() is not None:
+            request._timing_view_started = time.perf_counter()
+
+    def server_timing(self, timings):
+        metrics = []
+        for name, seconds in timings.durations.items():
+            description = f';desc="{timings.queries} queries"' if name == 'db' else ''
+            metrics.append(f'{name};dur={seconds * 1000:.3f}{description}')
+        return ', '.join(metrics)
+
+    def log_timings(self, request, response, timings):
+        match = request.resolver_match
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'queries': timings.queries,
+            **{f'{name}_ms': round(seconds * 1000, 3) for name, seconds in timings.durations.items()},
+        }))
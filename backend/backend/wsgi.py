@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
 application = get_wsgi_application()
+
+# Rate cards are looked up on every loan application, load them before the first one
+from loan.rates import rate_cards  # noqa: E402
+
+rate_cards.warm()
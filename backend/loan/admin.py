@@ -1,6 +1,6 @@
 from django.contrib import admin
 from simple_history.admin import SimpleHistoryAdmin
-from .models import Loan
+from .models import BatchShard, Loan, Payment, RateTier
 
 
 class LoanHistoryAdmin(SimpleHistoryAdmin):
@@ -12,3 +12,30 @@ class LoanHistoryAdmin(SimpleHistoryAdmin):
 
 
 admin.site.register(Loan, LoanHistoryAdmin)
+
+
+class RateTierAdmin(admin.ModelAdmin):
+    list_display = ['effective_from', 'min_principal_paise', 'interest_bps']
+    ordering = ['-effective_from', 'min_principal_paise']
+
+
+admin.site.register(RateTier, RateTierAdmin)
+
+
+class PaymentAdmin(admin.ModelAdmin):
+    list_display = ['loan', 'amount_paise', 'paid_at', 'posted_by', 'reversal_of', 'created_date']
+    raw_id_fields = ['loan', 'posted_by', 'reversal_of']
+    ordering = ['-paid_at']
+
+
+admin.site.register(Payment, PaymentAdmin)
+
+
+class BatchShardAdmin(admin.ModelAdmin):
+    list_display = ['job', 'run', 'start_pk', 'end_pk', 'next_pk', 'status', 'processed', 'attempts',
+                    'modified_date']
+    list_filter = ['job', 'status']
+    ordering = ['-modified_date']
+
+
+admin.site.register(BatchShard, BatchShardAdmin)
@@ -0,0 +1,71 @@
+from collections import namedtuple
+
+import numpy as np
+
+AmortizationSchedule = namedtuple('AmortizationSchedule', ['emi', 'principal', 'interest', 'balance', 'months'])
+
+
+def amortize(principals, months, rates):
+    """
+    Builds the month by month schedule of a batch of loans in one array pass.
+
+    Takes scalars or equal length sequences of principals, tenures in months and yearly interest rates.
+    Each of principal, interest and balance is a (loans x longest tenure) array, padded with zeros
+    beyond the tenure of shorter loans.
+    """
+    principals, months, rates = np.broadcast_arrays(np.atleast_1d(np.asarray(principals, dtype=np.float64)),
+                                                    np.atleast_1d(np.asarray(months, dtype=np.int64)),
+                                                    np.atleast_1d(np.asarray(rates, dtype=np.float64)))
+    if months.size and months.min() <= 0:
+        raise ValueError('Months must be greater than 0')
+    rate_per_month = rates / 1200
+    periods = np.arange(1, (months.max() if months.size else 0) + 1)
+    interest_bearing = rate_per_month > 0
+    safe_rate = np.where(interest_bearing, rate_per_month, 1)
+
+    total_growth = (1 + rate_per_month) ** months
+    emi = np.where(interest_bearing,
+                   principals * safe_rate * total_growth / np.where(interest_bearing, total_growth - 1, 1),
+                   principals / months)
+
+    growth = (1 + rate_per_month[:, None]) ** periods[None, :]
+    closing = np.where(interest_bearing[:, None],
+                       principals[:, None] * growth - emi[:, None] * (growth - 1) / safe_rate[:, None],
+                       principals[:, None] - emi[:, None] * periods[None, :])
+    closing[periods[None, :] >= months[:, None]] = 0
+    opening = np.concatenate([principals[:, None], closing[:, :-1]], axis=1)
+    interest = opening * rate_per_month[:, None]
+    principal_paid = opening - closing
+
+    active = periods[None, :] <= months[:, None]
+    return AmortizationSchedule(emi=emi,
+                                principal=np.where(active, principal_paid, 0),
+                                interest=np.where(active, interest, 0),
+                                balance=np.where(active, closing, 0),
+                                months=months)
+
+
+def schedule_rows(schedule, index=0):
+    rows = []
+    for period in range(int(schedule.months[index])):
+        rows.append({
+            'month': period + 1,
+            'emi': round(float(schedule.emi[index]), 2),
+            'principal': round(float(schedule.principal[index, period]), 2),
+            'interest': round(float(schedule.interest[index, period]), 2),
+            'balance': round(float(schedule.balance[index, period]), 2),
+        })
+    return rows
+
+
+def loan_schedules(queryset):
+    """
+    Amortizes every loan of a queryset in a single pass, for reporting and bulk jobs.
+
+    Returns the loan ids and an AmortizationSchedule whose rows follow the same order.
+    """
+    rows = list(queryset.filter(months__gt=0).values_list('pk', 'principal', 'months', 'interest'))
+    if not rows:
+        return [], amortize([], [], [])
+    pks, principals, months, rates = zip(*rows)
+    return list(pks), amortize(principals, months, rates)
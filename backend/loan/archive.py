@@ -0,0 +1,93 @@
+import datetime
+from itertools import groupby
+from operator import itemgetter
+
+from django.db import transaction
+
+from .models import BALANCE_FIELDS, Loan, LoanHistoryArchive
+from .money import MINOR_UNIT_FIELDS
+
+ARCHIVE_BATCH_SIZE = 500
+ARCHIVED_FIELDS = [field.attname for field in Loan._meta.concrete_fields]
+
+
+def compact(versions):
+    """
+    Turns the historical versions of one loan, oldest first, into archive rows.
+
+    The first row is a full snapshot, the others only keep the fields that differ from the
+    version before them.
+    """
+    archived, previous = [], None
+    for version in versions:
+        # Datetimes are kept to the microsecond, which DjangoJSONEncoder would truncate
+        state = {field: version[field].isoformat() if isinstance(version[field], datetime.datetime) else version[field]
+                 for field in ARCHIVED_FIELDS}
+        if previous is None:
+            changes = state
+        else:
+            changes = {field: value for field, value in state.items() if previous[field] != value}
+        archived.append(LoanHistoryArchive(loan_id=version['id'], history_date=version['history_date'],
+                                           history_type=version['history_type'],
+                                           history_user_id=version['history_user_id'],
+                                           snapshot=previous is None, changes=changes))
+        previous = state
+    return archived
+
+
+def archive_history(before, batch_size=ARCHIVE_BATCH_SIZE):
+    """
+    Moves the historical loan records older than before into LoanHistoryArchive.
+
+    Loans are handled batch_size at a time, each batch in its own transaction. Returns the number
+    of history rows archived.
+    """
+    old = Loan.history.filter(history_date__lt=before)
+    loan_ids = list(old.order_by('id').values_list('id', flat=True).distinct())
+    archived = 0
+    for start in range(0, len(loan_ids), batch_size):
+        batch = old.filter(id__in=loan_ids[start:start + batch_size])
+        with transaction.atomic():
+            versions = batch.order_by('id', 'history_date', 'history_id').values(
+                *ARCHIVED_FIELDS, 'history_date', 'history_type', 'history_user_id')
+            records = []
+            for _, loan_versions in groupby(versions, key=itemgetter('id')):
+                records += compact(loan_versions)
+            LoanHistoryArchive.objects.bulk_create(records, batch_size=batch_size)
+            batch.delete()
+        archived += len(records)
+    return archived
+
+
+def loan_as_of(pk, moment):
+    """
+    Returns the fields of the version of a loan current at moment, with its history_date and
+    history_type, or None if the loan had no version yet.
+
+    Recent versions come from the history table. Older ones are rebuilt from the latest archived
+    snapshot before moment and the changes archived after it. Both are index range lookups.
+    """
+    version = Loan.history.filter(id=pk, history_date__lte=moment).order_by('-history_date', '-history_id').values(
+        *ARCHIVED_FIELDS, 'history_date', 'history_type').first()
+    if version is not None:
+        return version
+    archive = LoanHistoryArchive.objects.filter(loan_id=pk, history_date__lte=moment)
+    last = archive.filter(snapshot=True).order_by('-history_date', '-id').first()
+    if last is None:
+        return None
+    state = dict(last.changes)
+    for record in archive.filter(id__gt=last.id).order_by('id'):
+        state.update(record.changes)
+        last = record
+    missing = set(ARCHIVED_FIELDS) - set(state)
+    for field in Loan._meta.concrete_fields:
+        state[field.attname] = field.to_python(state.get(field.attname, field.get_default()))
+    if missing:
+        # Snapshots archived before a column was added lack it, so it is derived as its backfill did
+        loan = Loan(**state)
+        if missing & set(MINOR_UNIT_FIELDS.values()):
+            loan.sync_minor_units()
+        if missing & set(BALANCE_FIELDS):
+            loan.sync_balance()
+        state.update({attname: getattr(loan, attname) for attname in missing})
+    return {**state, 'history_date': last.history_date, 'history_type': last.history_type}
@@ -0,0 +1,123 @@
+import abc
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.db import connection, connections, transaction
+from django.db.models import F, Max, Min, Sum
+
+from .models import BatchShard, Loan, Payment
+
+logger = logging.getLogger(__name__)
+
+SHARD_SIZE = 50000
+CHUNK_SIZE = 1000
+
+
+class BatchJob(abc.ABC):
+    """
+    Work over every loan, done chunk by chunk. process() gets the loans of one chunk, locked and in
+    primary key order, and runs in the transaction that checkpoints the chunk, so a chunk is either
+    done and recorded or not done at all.
+    """
+    name = None
+
+    def queryset(self):
+        return Loan.objects.all()
+
+    @abc.abstractmethod
+    def process(self, loans):
+        pass
+
+
+class ReconcileBalancesJob(BatchJob):
+    """
+    Recomputes the paid amount of every loan from its payments and fixes the balance and next due
+    date of the loans that drifted from the ledger.
+    """
+    name = 'reconcile_balances'
+
+    def queryset(self):
+        return Loan.objects.only('amount', 'emi', 'months', 'start_date', 'amount_paise', 'emi_paise', 'paid_paise',
+                                 'outstanding_paise', 'next_due_date')
+
+    def process(self, loans):
+        paid = dict(Payment.objects.filter(loan_id__gte=loans[0].pk, loan_id__lte=loans[-1].pk)
+                    .values('loan').annotate(total=Sum('amount_paise')).values_list('loan', 'total'))
+        drifted = []
+        for loan in loans:
+            balance = (loan.paid_paise, loan.outstanding_paise, loan.next_due_date)
+            loan.paid_paise = paid.get(loan.pk, 0)
+            loan.sync_balance()
+            if (loan.paid_paise, loan.outstanding_paise, loan.next_due_date) != balance:
+                drifted.append(loan)
+        Loan.objects.bulk_update(drifted, ['paid_paise', 'outstanding_paise', 'next_due_date'])
+
+
+JOBS = {job.name: job for job in (ReconcileBalancesJob(),)}
+
+
+def plan_shards(job, run, shard_size=SHARD_SIZE):
+    """
+    Splits the loans into primary key ranges of shard_size ids for a run of job. A run that was
+    planned already keeps its shards, with their checkpoints.
+    """
+    bounds = Loan.objects.aggregate(first=Min('pk'), last=Max('pk'))
+    if bounds['first'] is not None and not BatchShard.objects.filter(job=job, run=run).exists():
+        BatchShard.objects.bulk_create([
+            BatchShard(job=job, run=run, start_pk=start, end_pk=start + shard_size, next_pk=start)
+            for start in range(bounds['first'], bounds['last'] + 1, shard_size)
+        ], ignore_conflicts=True)
+    return list(BatchShard.objects.filter(job=job, run=run).order_by('start_pk'))
+
+
+def run_shard(pk, chunk_size=CHUNK_SIZE):
+    """
+    Processes one shard from its checkpoint on. Failures are recorded on the shard rather than
+    raised, so the other shards of the run carry on.
+    """
+    shard = BatchShard.objects.get(pk=pk)
+    job = JOBS[shard.job]
+    BatchShard.objects.filter(pk=pk).update(status="RUNNING", attempts=F('attempts') + 1, error='')
+    try:
+        while True:
+            with transaction.atomic():
+                loans = list(job.queryset().select_for_update().filter(pk__gte=shard.next_pk, pk__lt=shard.end_pk)
+                             .order_by('pk')[:chunk_size])
+                if not loans:
+                    break
+                job.process(loans)
+                shard.next_pk, shard.processed = loans[-1].pk + 1, shard.processed + len(loans)
+                BatchShard.objects.filter(pk=pk).update(next_pk=shard.next_pk, processed=shard.processed)
+    except Exception as e:
+        logger.exception('Shard %s:%s of %s %s failed', shard.start_pk, shard.end_pk, shard.job, shard.run)
+        BatchShard.objects.filter(pk=pk).update(status="FAILED", error=f'{type(e).__name__}: {e}')
+        return pk, "FAILED"
+    BatchShard.objects.filter(pk=pk).update(status="DONE")
+    return pk, "DONE"
+
+
+def run_job(job, run, workers=1, shard_size=SHARD_SIZE, chunk_size=CHUNK_SIZE, progress=None):
+    """
+    Runs every shard of a run of job that is not done yet, on a pool of worker processes, and
+    returns the shards of the run.
+
+    Workers are forked, so the connections of this process are closed first and every worker
+    opens its own on first use. With a single worker, or on SQLite where only one connection can
+    write at a time, the shards run one after another in this process.
+    """
+    if job not in JOBS:
+        raise KeyError(job)
+    pending = [shard.pk for shard in plan_shards(job, run, shard_size) if shard.status != "DONE"]
+    if workers <= 1 or connection.vendor == 'sqlite':
+        for pk in pending:
+            result = run_shard(pk, chunk_size)
+            if progress:
+                progress(*result)
+    elif pending:
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork')) as pool:
+            for future in as_completed([pool.submit(run_shard, pk, chunk_size) for pk in pending]):
+                if progress:
+                    progress(*future.result())
+    return list(BatchShard.objects.filter(job=job, run=run).order_by('start_pk'))
@@ -0,0 +1,42 @@
+from django.db import connection, transaction
+
+from .cache import invalidate_customer_lists
+from .models import Loan
+from .summary import apply_summary_changes
+
+BULK_BATCH_SIZE = 500
+MAX_BULK_APPLICATIONS = 5000
+
+
+def insert_loans(loans, batch_size=BULK_BATCH_SIZE):
+    """
+    Bulk inserts loans, with their paise, basis point and balance columns synced, and sets their
+    primary keys. Must run inside a transaction.
+
+    Backends that cannot return primary keys from a bulk insert (SQLite) hold the write lock
+    from the first insert until commit, so the newest len(loans) ids are the ones just inserted.
+    """
+    for loan in loans:
+        loan.sync_minor_units()
+        loan.sync_balance()
+    created = Loan.objects.bulk_create(loans, batch_size=batch_size)
+    if not connection.features.can_return_rows_from_bulk_insert:
+        pks = Loan.objects.order_by('-pk').values_list('pk', flat=True)[:len(created)]
+        for loan, pk in zip(created, reversed(list(pks))):
+            loan.pk = pk
+    return created
+
+
+def bulk_create_loans(loans, history_user=None, batch_size=BULK_BATCH_SIZE):
+    """
+    Inserts loans, their historical records and their share of the portfolio summary in batches,
+    inside one transaction, then drops the cached loan lists of their customers.
+    """
+    if not loans:
+        return []
+    with transaction.atomic():
+        created = insert_loans(loans, batch_size)
+        Loan.history.bulk_history_create(created, batch_size=batch_size, default_user=history_user)
+        apply_summary_changes(added=[loan.summary_state() for loan in created])
+    invalidate_customer_lists(*[loan.user_id for loan in created])
+    return created
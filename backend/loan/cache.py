@@ -0,0 +1,54 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+def version_key(user_id):
+    return f'loan:customer-list-version:{user_id}'
+
+
+def customer_list_version(user_id):
+    # A fresh version starts from the clock, so it never matches responses cached under an evicted one
+    version = cache.get(version_key(user_id))
+    if version is None:
+        cache.add(version_key(user_id), time.time_ns(), timeout=None)
+        version = cache.get(version_key(user_id))
+    return version
+
+
+def customer_list_key(user_id, url):
+    digest = hashlib.md5(url.encode('utf-8')).hexdigest()
+    return f'loan:customer-list:{user_id}:{customer_list_version(user_id)}:{digest}'
+
+
+def get_customer_list(user_id, url):
+    key = customer_list_key(user_id, url)
+    return key, cache.get(key)
+
+
+def set_customer_list(key, data):
+    cache.set(key, data, timeout=settings.CUSTOMER_LOAN_CACHE['TIMEOUT'])
+
+
+def bump_versions(user_ids):
+    for user_id in user_ids:
+        try:
+            cache.incr(version_key(user_id))
+        except ValueError:
+            cache.add(version_key(user_id), time.time_ns(), timeout=None)
+
+
+def invalidate_customer_lists(*user_ids):
+    """
+    Drops every cached loan list response of the given customers by moving them to a new version.
+
+    Inside a transaction it is done again on commit, as a list read from the old rows may have been
+    cached in between.
+    """
+    user_ids = set(user_ids)
+    bump_versions(user_ids)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: bump_versions(user_ids))
@@ -0,0 +1,122 @@
+import csv
+import datetime
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.fields import DateTimeField
+from rest_framework.renderers import BaseRenderer
+
+EXPORT_CHUNK_SIZE = 2000
+
+# Export column -> lookup, in the order of ListLoanSerializer
+EXPORT_FIELDS = {
+    'id': 'id',
+    'email': 'user__email',
+    'first_name': 'user__first_name',
+    'last_name': 'user__last_name',
+    'granted_by': 'granted_by__email',
+    'principal': 'principal',
+    'interest': 'interest',
+    'months': 'months',
+    'amount': 'amount',
+    'emi': 'emi',
+    'status': 'status',
+    'start_date': 'start_date',
+    'end_date': 'end_date',
+    'modified_date': 'modified_date',
+}
+DATE_FIELDS = ('start_date', 'end_date', 'modified_date')
+# Spreadsheets evaluate cells starting with these as formulas
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def parse_bound(value, end=False):
+    """
+    Parses a date range bound given as an ISO datetime or date and returns (lookup, datetime).
+
+    A bare date covers the whole day, so an end bound on it stops before midnight of the next day.
+    """
+    moment = parse_datetime(value)
+    if moment is not None:
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        return ('lte' if end else 'gte'), moment
+    day = parse_date(value)
+    if day is None:
+        raise ValueError(f'Invalid date {value}')
+    moment = timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+    if end:
+        return 'lt', moment + datetime.timedelta(days=1)
+    return 'gte', moment
+
+
+def export_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yields the loans of a queryset as dicts of plain values, fetching chunk_size rows at a time.
+
+    Rows are read with a server side cursor where the database has one, so memory does not grow
+    with the size of the export.
+    """
+    date_field = DateTimeField()
+    lookups = list(EXPORT_FIELDS.values())
+    for values in queryset.values_list(*lookups).iterator(chunk_size=chunk_size):
+        row = dict(zip(EXPORT_FIELDS, values))
+        for field in DATE_FIELDS:
+            if row[field] is not None:
+                row[field] = date_field.to_representation(row[field])
+        yield row
+
+
+def escape_cell(value):
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def csv_lines(header, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow([escape_cell(value) for value in row])
+
+
+def stream_csv(rows):
+    return csv_lines(list(EXPORT_FIELDS), (row.values() for row in rows))
+
+
+def stream_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    Lets the export be negotiated as CSV. Exports are streamed, so it only renders error responses.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return ''.join(csv_lines(list(data), [data.values()])).encode(self.charset)
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Lets the export be negotiated as NDJSON. Exports are streamed, so it only renders error responses.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return (json.dumps(data, cls=DjangoJSONEncoder) + '\n').encode(self.charset)
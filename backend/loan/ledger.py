@@ -0,0 +1,83 @@
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Loan, Payment
+from .money import to_rupees
+
+PAYABLE = ('APPROVED',)
+
+
+class PaymentRejected(Exception):
+    pass
+
+
+class PaymentConflict(Exception):
+    pass
+
+
+def apply_to_balance(loan, amount_paise):
+    """
+    Adds amount_paise to what was paid on a loan and writes the new balance with a single
+    conditional UPDATE, which misses when another posting changed the loan since it was read.
+    """
+    paid_paise = loan.paid_paise
+    loan.paid_paise += amount_paise
+    loan.sync_balance()
+    if not Loan.objects.filter(pk=loan.pk, status__in=PAYABLE, paid_paise=paid_paise).update(
+            paid_paise=loan.paid_paise, outstanding_paise=loan.outstanding_paise, next_due_date=loan.next_due_date):
+        raise PaymentConflict(f'Loan id {loan.pk} changed while posting to it')
+
+
+def post_payment(pk, amount_paise, paid_at=None, posted_by=None):
+    """
+    Records a payment on an approved loan and updates its balance in the same transaction.
+
+    Raises Loan.DoesNotExist, PaymentRejected when the loan is not approved or the payment is more
+    than its outstanding balance, or PaymentConflict on a concurrent posting.
+    """
+    if amount_paise <= 0:
+        raise PaymentRejected('Payment must be more than zero')
+    with transaction.atomic():
+        loan = Loan.objects.get(pk=pk)
+        if loan.status not in PAYABLE:
+            raise PaymentRejected(f'Loan is {loan.status}')
+        if amount_paise > loan.outstanding_paise:
+            raise PaymentRejected(f'Payment is more than the outstanding {to_rupees(loan.outstanding_paise)}')
+        payment = Payment.objects.create(loan=loan, amount_paise=amount_paise, paid_at=paid_at or timezone.now(),
+                                         posted_by=posted_by)
+        apply_to_balance(loan, amount_paise)
+    return loan, payment
+
+
+def reverse_payment(pk, posted_by=None):
+    """
+    Records the reversal of a payment as an entry of the opposite amount and puts the amount back
+    on the balance of its loan, in the same transaction.
+
+    Raises Payment.DoesNotExist, PaymentRejected when the entry is a reversal or already reversed,
+    or PaymentConflict on a concurrent posting.
+    """
+    with transaction.atomic():
+        payment = Payment.objects.select_related('loan').get(pk=pk)
+        if payment.reversal_of_id is not None:
+            raise PaymentRejected('A reversal cannot be reversed')
+        if Payment.objects.filter(reversal_of=payment).exists():
+            raise PaymentRejected(f'Payment id {pk} is already reversed')
+        loan = payment.loan
+        reversal = Payment.objects.create(loan=loan, amount_paise=-payment.amount_paise, paid_at=timezone.now(),
+                                          posted_by=posted_by, reversal_of=payment)
+        apply_to_balance(loan, reversal.amount_paise)
+    return loan, reversal
+
+
+def loan_balance(loan, now=None):
+    now = now or timezone.now()
+    return {
+        'id': loan.pk,
+        'status': loan.status,
+        'amount': to_rupees(loan.amount_paise),
+        'paid': to_rupees(loan.paid_paise),
+        'outstanding': to_rupees(loan.outstanding_paise),
+        'next_due_date': loan.next_due_date,
+        'overdue': loan.status in PAYABLE and loan.next_due_date is not None and loan.next_due_date < now
+    }
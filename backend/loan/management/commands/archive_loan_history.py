@@ -0,0 +1,21 @@
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from loan.archive import ARCHIVE_BATCH_SIZE, archive_history
+
+
+class Command(BaseCommand):
+    help = 'Moves loan history older than the retention period into the compacted archive table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.LOAN_HISTORY_RETENTION_DAYS,
+                            help='Keep this many days of history in the history table')
+        parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE, help='Loans archived per transaction')
+
+    def handle(self, *args, **options):
+        before = timezone.now() - datetime.timedelta(days=options['days'])
+        archived = archive_history(before, batch_size=options['batch_size'])
+        self.stdout.write(f'Archived {archived} history rows older than {before:%Y-%m-%d %H:%M}')
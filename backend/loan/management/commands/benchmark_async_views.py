@@ -0,0 +1,101 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client
+from django.urls import reverse
+from rest_framework_jwt.settings import api_settings
+
+from backend.benchmark import benchmark_database, summarize
+from loan.seed import seed_database
+from user.models import User
+
+jwt_payload_handler = api_settings.JWT_PAYLOAD_HANDLER
+jwt_encode_handler = api_settings.JWT_ENCODE_HANDLER
+
+# Endpoint, synchronous route, async route and the role calling it
+ENDPOINTS = [
+    ('profile', 'profile', 'async-profile', 'customer'),
+    ('list-agent', 'list-agent', 'async-list-agent', 'agent'),
+    ('list-admin', 'list-admin', 'async-list-admin', 'admin'),
+    ('list-approvals', 'list-approvals', 'async-list-approvals', 'admin'),
+    ('list-loans-admin-agent', 'list-loans-admin-agent', 'async-list-loans-admin-agent', 'admin'),
+    ('list-loans-customer', 'list-loans-customer', 'async-list-loans-customer', 'customer'),
+]
+
+
+class Command(BaseCommand):
+    help = ('Compares the read endpoints served by the WSGI handler, the ASGI handler and their async views on the '
+            'ASGI handler, at the same concurrency, against a temporary test database')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint and mode')
+        parser.add_argument('--concurrency', type=int, default=16, help='Requests in flight at a time')
+        parser.add_argument('--customers', type=int, default=50, help='Customers created in the test database')
+        parser.add_argument('--loans', type=int, default=1000, help='Loans created in the test database')
+        parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            tokens = self.seed(options['customers'], options['loans'])
+            results = []
+            for endpoint, name, async_name, role in ENDPOINTS:
+                token = tokens[role]
+                for mode, route in (('wsgi', name), ('asgi', name), ('asgi-async', async_name)):
+                    result = {'endpoint': endpoint, 'mode': mode}
+                    run = self.run_wsgi if mode == 'wsgi' else self.run_asgi
+                    result.update(run(reverse(route), token, options['requests'], options['concurrency']))
+                    results.append(result)
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(f"{'endpoint':<26}{'mode':<12}{'requests/sec':>14}{'p50 ms':>10}{'p99 ms':>10}")
+        for result in results:
+            self.stdout.write(f"{result['endpoint']:<26}{result['mode']:<12}{result['throughput']:>14}"
+                              f"{result['p50_ms']:>10}{result['p99_ms']:>10}")
+
+    def seed(self, customers, loans):
+        # Requests authenticate with tokens, so users get an unusable password
+        seeded = seed_database(customers, 10, loans, password=None)
+        users = {
+            'admin': seeded['admin'][0],
+            'agent': User.objects.filter(pk__in=seeded['agent'], is_approved=True).order_by('pk').first().pk,
+            'customer': seeded['customer'][0],
+        }
+        return {role: jwt_encode_handler(jwt_payload_handler(User.objects.get(pk=pk))) for role, pk in users.items()}
+
+    def run_wsgi(self, path, token, requests, concurrency):
+        def call(_):
+            started = time.perf_counter()
+            response = Client().get(path, HTTP_AUTHORIZATION=f'Bearer {token}')
+            if response.status_code != 200:
+                raise CommandError(f'{path} answered {response.status_code}')
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            latencies = list(pool.map(call, range(requests)))
+        return summarize(latencies, time.perf_counter() - started)
+
+    def run_asgi(self, path, token, requests, concurrency):
+        async def run():
+            client = AsyncClient()
+            slots = asyncio.Semaphore(concurrency)
+
+            async def call():
+                async with slots:
+                    started = time.perf_counter()
+                    # The async client of Django 3.2 takes headers by their name
+                    response = await client.get(path, authorization=f'Bearer {token}')
+                    if response.status_code != 200:
+                        raise CommandError(f'{path} answered {response.status_code}')
+                    return time.perf_counter() - started
+
+            started = time.perf_counter()
+            latencies = await asyncio.gather(*[call() for _ in range(requests)])
+            return summarize(latencies, time.perf_counter() - started)
+
+        return asyncio.run(run())
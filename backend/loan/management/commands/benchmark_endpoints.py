@@ -0,0 +1,118 @@
+import datetime
+import json
+import platform
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_jwt.settings import api_settings
+
+from backend.benchmark import benchmark_database, measure
+from loan.models import Loan
+from loan.seed import seed_database
+from user.models import User
+
+jwt_payload_handler = api_settings.JWT_PAYLOAD_HANDLER
+jwt_encode_handler = api_settings.JWT_ENCODE_HANDLER
+
+PASSWORD = 'benchmark-password'
+
+
+class Command(BaseCommand):
+    help = ('Seeds a temporary test database with the given number of loans and measures throughput, latency and '
+            'queries of every endpoint under concurrent requests')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loans', type=int, default=10000, help='Loans in the seeded database')
+        parser.add_argument('--customers', type=int, default=1000, help='Customers in the seeded database')
+        parser.add_argument('--agents', type=int, default=50, help='Agents in the seeded database')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint')
+        parser.add_argument('--concurrency', type=int, default=16, help='Requests in flight at a time')
+        parser.add_argument('--endpoint', action='append', dest='endpoints',
+                            help='Only run this endpoint, can be repeated')
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            fixtures = self.seed(options['customers'], options['agents'], options['loans'])
+            results = []
+            self.stdout.write(f"{'endpoint':<26}{'concurrency':>12}{'requests/sec':>14}{'p50 ms':>10}{'p95 ms':>10}"
+                              f"{'p99 ms':>10}{'queries':>9}{'errors':>8}")
+            for name, writes, call in self.endpoints(fixtures):
+                if options['endpoints'] and name not in options['endpoints']:
+                    continue
+                concurrency = options['concurrency']
+                if writes and connection.vendor == 'sqlite':
+                    # Writers on a shared SQLite database fail with "table is locked" instead of waiting
+                    concurrency = 1
+                result = {'endpoint': name, 'concurrency': concurrency}
+                result.update(measure(call, options['requests'], concurrency))
+                results.append(result)
+                self.stdout.write(f"{name:<26}{concurrency:>12}{result['throughput']:>14}{result['p50_ms']:>10}"
+                                  f"{result['p95_ms']:>10}{result['p99_ms']:>10}{result['queries_mean']:>9}"
+                                  f"{result['errors']:>8}")
+            report = {
+                'created': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'loans': options['loans'],
+                'customers': options['customers'],
+                'requests': options['requests'],
+                'results': results,
+            }
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def seed(self, customers, agents, loans):
+        seeded = seed_database(customers, agents, loans, password=PASSWORD)
+        return {
+            'admin': User.objects.get(pk=seeded['admin'][0]),
+            'agent': User.objects.filter(pk__in=seeded['agent'], is_approved=True).order_by('pk').first(),
+            'customer': User.objects.get(pk=seeded['customer'][0]),
+            'new_loans': list(Loan.objects.filter(status="NEW").order_by('pk').values_list('pk', flat=True)),
+            'run': datetime.datetime.now().strftime('%H%M%S%f'),
+        }
+
+    def endpoints(self, fixtures):
+        """
+        Returns (name, writes, call) for every endpoint, where call(index) sends the index-th request.
+        """
+        tokens = {role: f"Bearer {jwt_encode_handler(jwt_payload_handler(fixtures[role]))}"
+                  for role in ('admin', 'agent', 'customer')}
+
+        def request(method, route, role=None, data=None, status=200, **kwargs):
+            def call(index):
+                headers = {'HTTP_AUTHORIZATION': tokens[role]} if role else {}
+                url = reverse(route, kwargs={key: value(index) for key, value in kwargs.items()})
+                body = data(index) if data else None
+                response = getattr(Client(), method)(url, body, content_type='application/json', **headers)
+                return response.status_code == status
+            return call
+
+        new_loans = fixtures['new_loans']
+        return [
+            ('signup', True, request('post', 'signup', status=201, data=lambda index: {
+                'email': f"signup{fixtures['run']}-{index}@benchmark.local", 'password': PASSWORD,
+                'first_name': 'Benchmark', 'last_name': str(index), 'is_customer': True, 'is_agent': False})),
+            ('login', True, request('post', 'login', data=lambda index: {
+                'email': fixtures['customer'].email, 'password': PASSWORD})),
+            ('profile', False, request('get', 'profile', 'customer')),
+            ('customer-loan', True, request('post', 'customer-loan', 'agent', data=lambda index: {
+                'user': fixtures['customer'].email, 'principal': 50000.00 + index, 'months': 12})),
+            ('approve-reject-loan', True, request('put', 'approve-reject-loan', 'admin', data=lambda index: {
+                'status': "APPROVED" if index % 2 else "REJECTED"},
+                pk=lambda index: new_loans[index % len(new_loans)])),
+            ('list-loans-admin-agent', False, request('get', 'list-loans-admin-agent', 'admin')),
+            ('list-loans-customer', False, request('get', 'list-loans-customer', 'customer')),
+            ('list-agent', False, request('get', 'list-agent', 'agent')),
+            ('list-admin', False, request('get', 'list-admin', 'admin')),
+            ('list-approvals', False, request('get', 'list-approvals', 'admin')),
+            ('portfolio-summary', False, request('get', 'portfolio-summary', 'admin')),
+        ]
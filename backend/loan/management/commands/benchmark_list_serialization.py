@@ -0,0 +1,55 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from backend.benchmark import benchmark_database, summarize
+from loan.models import Loan
+from loan.pagination import LoanKeysetPagination
+from loan.seed import seed_database
+from loan.serializers import ListLoanSerializer, list_loan_projection
+
+
+class Command(BaseCommand):
+    help = ('Compares rendering loan list pages through ListLoanSerializer and through the values() projection '
+            'against a temporary test database, and checks both give the same bytes')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loans', type=int, default=5000, help='Loans created in the test database')
+        parser.add_argument('--page-size', type=int, default=LoanKeysetPagination.max_page_size,
+                            help='Loans per page')
+        parser.add_argument('--pages', type=int, default=200, help='Pages rendered per path')
+        parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            seed_database(max(options['loans'] // 10, 1), 20, options['loans'], password=None)
+            loans = Loan.objects.select_related('user', 'granted_by').order_by(*LoanKeysetPagination.ordering)
+            paths = {
+                'serializer': lambda: ListLoanSerializer(list(loans[:options['page_size']]), many=True).data,
+                'projection': lambda: list_loan_projection.data(
+                    list(list_loan_projection.queryset(loans)[:options['page_size']])),
+            }
+            rendered = {name: JSONRenderer().render(page()) for name, page in paths.items()}
+            if rendered['serializer'] != rendered['projection']:
+                raise CommandError('The projection does not render the same JSON as ListLoanSerializer')
+            results = []
+            for name, page in paths.items():
+                latencies = []
+                started = time.perf_counter()
+                for _ in range(options['pages']):
+                    page_started = time.perf_counter()
+                    JSONRenderer().render(page())
+                    latencies.append(time.perf_counter() - page_started)
+                result = {'path': name, 'page_size': options['page_size']}
+                result.update(summarize(latencies, time.perf_counter() - started))
+                results.append(result)
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(f"{'path':<14}{'pages/sec':>12}{'p50 ms':>10}{'p99 ms':>10}")
+        for result in results:
+            self.stdout.write(f"{result['path']:<14}{result['throughput']:>12}{result['p50_ms']:>10}"
+                              f"{result['p99_ms']:>10}")
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from loan.models import Loan
+from loan.pagination import DueLoanKeysetPagination, LoanKeysetPagination
+from loan.serializers import list_loan_projection
+from user.models import User
+
+
+class Command(BaseCommand):
+    help = 'Prints the query plan of the list endpoints so index usage can be checked against a real database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, default=1, help='Customer id used for the customer loan list')
+
+    def get_queries(self, user_id):
+        pagination = LoanKeysetPagination()
+        loans = list_loan_projection.queryset(Loan.objects.order_by(*pagination.ordering))
+        cursor = pagination.position_filter({'modified_date': timezone.now(), 'id': 1})
+        page = pagination.page_size + 1
+        overdue = Loan.objects.filter(status="APPROVED", outstanding_paise__gt=0, next_due_date__lt=timezone.now()) \
+            .order_by(*DueLoanKeysetPagination.ordering)
+        return [
+            ('list-loans-admin-agent', loans[:page]),
+            ('list-loans-admin-agent?cursor=', loans.filter(cursor)[:page]),
+            ('list-loans-admin-agent?status=APPROVED', loans.filter(status="APPROVED")[:page]),
+            ('list-loans-admin-agent?status=NEW&cursor=', loans.filter(cursor, status="NEW")[:page]),
+            ('list-loans-customer?status=NEW', loans.filter(user=user_id, status="NEW")[:page]),
+            ('overdue-loans', overdue[:page]),
+            ('list-agent', User.objects.filter(is_customer=True)),
+            ('list-admin', User.objects.filter(Q(is_customer=True) | Q(is_agent=True))),
+            ('list-approvals', User.objects.filter(is_agent=True, is_approved=False)),
+        ]
+
+    def handle(self, *args, **options):
+        for name, queryset in self.get_queries(options['user']):
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(queryset.explain())
+            self.stdout.write('')
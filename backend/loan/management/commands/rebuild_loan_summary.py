@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from loan.models import LoanSummary
+from loan.summary import rebuild_summary
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the portfolio summary from the loans table, for repairs after out of band writes'
+
+    def handle(self, *args, **options):
+        rebuild_summary()
+        self.stdout.write(f'Rebuilt {LoanSummary.objects.count()} summary rows')
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from loan.batch import CHUNK_SIZE, JOBS, SHARD_SIZE, run_job
+
+
+class Command(BaseCommand):
+    help = ('Runs a batch job over every loan, split into primary key range shards processed in parallel, '
+            'resuming the shards of an earlier run with the same --run that did not finish')
+
+    def add_arguments(self, parser):
+        parser.add_argument('job', choices=sorted(JOBS), help='Job to run')
+        parser.add_argument('--run', help='Name of the run, today by default, so a nightly job resumes on rerun')
+        parser.add_argument('--workers', type=int, default=4, help='Worker processes, each with its own connection')
+        parser.add_argument('--shard-size', type=int, default=SHARD_SIZE, help='Loan ids per shard of a new run')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Loans per transaction and checkpoint')
+
+    def handle(self, *args, **options):
+        run = options['run'] or timezone.localdate().isoformat()
+        started = time.perf_counter()
+
+        def progress(pk, status):
+            self.stdout.write(f'Shard {pk} {status} after {time.perf_counter() - started:.1f}s')
+
+        shards = run_job(options['job'], run, workers=options['workers'], shard_size=options['shard_size'],
+                         chunk_size=options['chunk_size'], progress=progress)
+        failed = [shard for shard in shards if shard.status != "DONE"]
+        processed = sum(shard.processed for shard in shards)
+        if failed:
+            for shard in failed:
+                self.stderr.write(f'Shard {shard.pk} ({shard.start_pk}:{shard.end_pk}) {shard.status}: {shard.error}')
+            raise CommandError(f"{len(failed)} of {len(shards)} shards of {options['job']} {run} did not finish, "
+                               f"run it again with --run {run} to resume them")
+        self.stdout.write(self.style.SUCCESS(
+            f"{options['job']} {run}: {len(shards)} shards, {processed} loans in {time.perf_counter() - started:.1f}s"))
@@ -0,0 +1,51 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from loan.seed import DEFAULT_PASSWORD, SEED_BATCH_SIZE, SEED_END, seed_database
+from user.models import User
+
+
+class Command(BaseCommand):
+    help = ('Bulk inserts customers, agents and loans with realistic principals, tenures, statuses and dates, '
+            'with their loan history and portfolio summary, the same for the same seed')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customers', type=int, default=100000, help='Customers to create')
+        parser.add_argument('--agents', type=int, default=500, help='Agents to create, about 5%% pending approval')
+        parser.add_argument('--admins', type=int, default=1, help='Admins to create')
+        parser.add_argument('--loans', type=int, default=1000000, help='Loans to create')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed, users get emails on seed<seed>.example.com')
+        parser.add_argument('--days', type=int, default=730, help='Loans start over this many days before --end')
+        parser.add_argument('--end', help=f'Last day loans start on as YYYY-MM-DD, {SEED_END:%Y-%m-%d} by default')
+        parser.add_argument('--password', default=DEFAULT_PASSWORD, help='Password shared by every created user')
+        parser.add_argument('--unusable-passwords', action='store_true', help='Create users that cannot log in')
+        parser.add_argument('--batch-size', type=int, default=SEED_BATCH_SIZE, help='Rows inserted per transaction')
+
+    def handle(self, *args, **options):
+        end = SEED_END
+        if options['end']:
+            try:
+                end = timezone.make_aware(datetime.datetime.strptime(options['end'], '%Y-%m-%d'))
+            except ValueError:
+                raise CommandError('--end must be a date formatted as YYYY-MM-DD')
+        domain = f"seed{options['seed']}.example.com"
+        if User.objects.filter(email__endswith=f'@{domain}').exists():
+            raise CommandError(f'Users on {domain} already exist, pick another --seed')
+
+        created = {}
+        started = time.perf_counter()
+
+        def progress(kind, count):
+            created[kind] = created.get(kind, 0) + count
+            self.stdout.write(f'{created[kind]} {kind} rows after {time.perf_counter() - started:.1f}s')
+
+        seed_database(options['customers'], options['agents'], options['loans'], admins=options['admins'],
+                      seed=options['seed'], end=end, days=options['days'],
+                      password=None if options['unusable_passwords'] else options['password'],
+                      batch_size=options['batch_size'], progress=progress)
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {options['admins']} admins, {options['agents']} agents, {options['customers']} customers and "
+            f"{options['loans']} loans on {domain} in {time.perf_counter() - started:.1f}s"))
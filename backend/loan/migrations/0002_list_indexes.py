@@ -0,0 +1,29 @@
+# Generated by Django 3.2.5 on 2026-10-18 17:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loan', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['-modified_date', '-id'], name='loan_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['status', '-modified_date', '-id'], name='loan_status_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['user', 'status', '-modified_date', '-id'], name='loan_user_status_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(condition=models.Q(('status', 'NEW')), fields=['-modified_date', '-id'], name='loan_new_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 3.2.5 on 2026-10-18 17:24
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('loan', '0002_list_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoanSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(max_length=12)),
+                ('interest', models.FloatField()),
+                ('count', models.IntegerField(default=0)),
+                ('principal', models.FloatField(default=0)),
+                ('amount', models.FloatField(default=0)),
+                ('emi', models.FloatField(default=0)),
+                ('granted_by', models.ForeignKey(default=None, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='loansummary',
+            constraint=models.UniqueConstraint(condition=models.Q(('granted_by__isnull', False)), fields=('status', 'granted_by', 'interest'), name='loan_summary_agent_key'),
+        ),
+        migrations.AddConstraint(
+            model_name='loansummary',
+            constraint=models.UniqueConstraint(condition=models.Q(('granted_by__isnull', True)), fields=('status', 'interest'), name='loan_summary_no_agent_key'),
+        ),
+    ]
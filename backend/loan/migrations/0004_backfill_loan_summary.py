@@ -0,0 +1,26 @@
+from django.db import migrations
+from django.db.models import Count, Sum
+
+
+def backfill_loan_summary(apps, schema_editor):
+    Loan = apps.get_model('loan', 'Loan')
+    LoanSummary = apps.get_model('loan', 'LoanSummary')
+    rows = Loan.objects.values('status', 'granted_by', 'interest').annotate(
+        total=Count('id'), principal_sum=Sum('principal'), amount_sum=Sum('amount'), emi_sum=Sum('emi'))
+    LoanSummary.objects.bulk_create([
+        LoanSummary(status=row['status'], granted_by_id=row['granted_by'], interest=row['interest'],
+                    count=row['total'], principal=row['principal_sum'], amount=row['amount_sum'],
+                    emi=row['emi_sum'])
+        for row in rows
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loan', '0003_loan_summary'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_loan_summary, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 3.2.5 on 2026-10-18 17:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loan', '0004_backfill_loan_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoanHistoryArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('loan_id', models.BigIntegerField()),
+                ('history_date', models.DateTimeField()),
+                ('history_type', models.CharField(max_length=1)),
+                ('history_user_id', models.BigIntegerField(null=True)),
+                ('snapshot', models.BooleanField(default=False)),
+                ('changes', models.JSONField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='loanhistoryarchive',
+            index=models.Index(fields=['loan_id', 'history_date'], name='loan_archive_asof_idx'),
+        ),
+        # The historical model is generated by simple_history, so its as-of index is kept out of the model state
+        migrations.RunSQL(
+            'CREATE INDEX loan_history_asof_idx ON loan_historicalloan (id, history_date)',
+            'DROP INDEX loan_history_asof_idx',
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 3.2.5 on 2026-10-18 17:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loan', '0005_loan_history_archive'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='loansummary',
+            name='amount',
+        ),
+        migrations.RemoveField(
+            model_name='loansummary',
+            name='emi',
+        ),
+        migrations.RemoveField(
+            model_name='loansummary',
+            name='principal',
+        ),
+        migrations.AddField(
+            model_name='historicalloan',
+            name='amount_paise',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='historicalloan',
+            name='emi_paise',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='historicalloan',
+            name='interest_bps',
+            field=models.IntegerField(default=900),
+        ),
+        migrations.AddField(
+            model_name='historicalloan',
+            name='principal_paise',
+            field=models.BigIntegerField(default=1000000),
+        ),
+        migrations.AddField(
+            model_name='loan',
+            name='amount_paise',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='loan',
+            name='emi_paise',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='loan',
+            name='interest_bps',
+            field=models.IntegerField(default=900),
+        ),
+        migrations.AddField(
+            model_name='loan',
+            name='principal_paise',
+            field=models.BigIntegerField(default=1000000),
+        ),
+        migrations.AddField(
+            model_name='loansummary',
+            name='amount_paise',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='loansummary',
+            name='emi_paise',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='loansummary',
+            name='principal_paise',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
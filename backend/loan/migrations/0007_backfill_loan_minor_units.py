@@ -0,0 +1,51 @@
+from django.db import migrations
+from django.db.models import Count, Sum
+
+from loan.money import to_bps, to_paise
+
+BACKFILL_BATCH_SIZE = 2000
+
+
+def backfill_minor_units(apps, schema_editor):
+    for model_name, pk in (('Loan', 'id'), ('HistoricalLoan', 'history_id')):
+        model = apps.get_model('loan', model_name)
+        last = 0
+        while True:
+            rows = list(model.objects.filter(**{f'{pk}__gt': last}).order_by(pk)
+                        .only(pk, 'principal', 'interest', 'amount', 'emi')[:BACKFILL_BATCH_SIZE])
+            if not rows:
+                break
+            for row in rows:
+                row.principal_paise = to_paise(row.principal)
+                row.interest_bps = to_bps(row.interest)
+                row.amount_paise = to_paise(row.amount)
+                row.emi_paise = to_paise(row.emi)
+            model.objects.bulk_update(rows, ['principal_paise', 'interest_bps', 'amount_paise', 'emi_paise'])
+            last = getattr(rows[-1], pk)
+
+
+def rebuild_loan_summary(apps, schema_editor):
+    Loan = apps.get_model('loan', 'Loan')
+    LoanSummary = apps.get_model('loan', 'LoanSummary')
+    rows = Loan.objects.values('status', 'granted_by', 'interest').annotate(
+        total=Count('id'), principal_sum=Sum('principal_paise'), amount_sum=Sum('amount_paise'),
+        emi_sum=Sum('emi_paise'))
+    LoanSummary.objects.all().delete()
+    LoanSummary.objects.bulk_create([
+        LoanSummary(status=row['status'], granted_by_id=row['granted_by'], interest=row['interest'],
+                    count=row['total'], principal_paise=row['principal_sum'], amount_paise=row['amount_sum'],
+                    emi_paise=row['emi_sum'])
+        for row in rows
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loan', '0006_loan_minor_units'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_minor_units, migrations.RunPython.noop),
+        migrations.RunPython(rebuild_loan_summary, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 3.2.5 on 2026-10-18 17:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loan', '0007_backfill_loan_minor_units'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RateTier',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('effective_from', models.DateTimeField()),
+                ('min_principal_paise', models.BigIntegerField()),
+                ('interest_bps', models.IntegerField()),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='ratetier',
+            constraint=models.UniqueConstraint(fields=('effective_from', 'min_principal_paise'), name='rate_tier_key'),
+        ),
+    ]
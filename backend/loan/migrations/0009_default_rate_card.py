@@ -0,0 +1,31 @@
+import datetime
+
+from django.db import migrations
+
+# The rates hard coded before rate cards, as (min principal in paise, interest in basis points)
+DEFAULT_TIERS = ((0, 1200), (1000000, 845), (100000000, 1000), (250000000, 1200))
+EFFECTIVE_FROM = datetime.datetime(2000, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def create_default_rate_card(apps, schema_editor):
+    RateTier = apps.get_model('loan', 'RateTier')
+    RateTier.objects.bulk_create([
+        RateTier(effective_from=EFFECTIVE_FROM, min_principal_paise=minimum, interest_bps=bps)
+        for minimum, bps in DEFAULT_TIERS
+    ])
+
+
+def delete_default_rate_card(apps, schema_editor):
+    RateTier = apps.get_model('loan', 'RateTier')
+    RateTier.objects.filter(effective_from=EFFECTIVE_FROM).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loan', '0008_rate_tier'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_default_rate_card, delete_default_rate_card),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 3.2.5 on 2026-10-18 18:06
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('loan', '0009_default_rate_card'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Payment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount_paise', models.BigIntegerField()),
+                ('paid_at', models.DateTimeField()),
+                ('created_date', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='historicalloan',
+            name='next_due_date',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='historicalloan',
+            name='outstanding_paise',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='historicalloan',
+            name='paid_paise',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='loan',
+            name='next_due_date',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='loan',
+            name='outstanding_paise',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='loan',
+            name='paid_paise',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(condition=models.Q(('outstanding_paise__gt', 0), ('status', 'APPROVED')), fields=['next_due_date', 'id'], name='loan_due_idx'),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='loan',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payments', to='loan.loan'),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='posted_by',
+            field=models.ForeignKey(default=None, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='reversal_of',
+            field=models.OneToOneField(default=None, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='reversal', to='loan.payment'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['loan', 'paid_at', 'id'], name='payment_loan_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations
+from django.db.models import F
+
+from loan.money import INSTALLMENT_PERIOD
+
+
+def backfill_balance(apps, schema_editor):
+    # Nothing has been paid yet, so everything is outstanding and the first installment is next due
+    for model_name in ('Loan', 'HistoricalLoan'):
+        model = apps.get_model('loan', model_name)
+        model.objects.update(outstanding_paise=F('amount_paise'))
+        model.objects.filter(amount_paise__gt=0, emi_paise__gt=0, months__gt=0, start_date__isnull=False).update(
+            next_due_date=F('start_date') + INSTALLMENT_PERIOD)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loan', '0010_repayment_ledger'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_balance, migrations.RunPython.noop),
+    ]
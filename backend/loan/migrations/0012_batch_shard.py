@@ -0,0 +1,33 @@
+# Generated by Django 3.2.5 on 2026-10-18 18:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loan', '0011_backfill_loan_balance'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BatchShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job', models.CharField(max_length=64)),
+                ('run', models.CharField(max_length=64)),
+                ('start_pk', models.BigIntegerField()),
+                ('end_pk', models.BigIntegerField()),
+                ('next_pk', models.BigIntegerField()),
+                ('status', models.CharField(default='PENDING', max_length=8)),
+                ('processed', models.IntegerField(default=0)),
+                ('attempts', models.IntegerField(default=0)),
+                ('error', models.TextField(blank=True, default='')),
+                ('modified_date', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='batchshard',
+            constraint=models.UniqueConstraint(fields=('job', 'run', 'start_pk'), name='batch_shard_key'),
+        ),
+    ]
@@ -1,9 +1,15 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Q
 from django.core.exceptions import ValidationError
 
 from simple_history.models import HistoricalRecords
 
 from user.models import User
+from .money import MINOR_UNIT_FIELDS, next_due_date, to_bps, to_paise
+
+# Columns the repayment balance is derived from, and the balance columns themselves
+BALANCE_SOURCE_FIELDS = ('amount', 'emi', 'months', 'start_date', 'paid_paise')
+BALANCE_FIELDS = ('outstanding_paise', 'next_due_date')
 
 
 def validate_principal(value):
@@ -19,13 +25,200 @@ class Loan(models.Model):
     months = models.IntegerField(default=0)
     amount = models.FloatField(default=0)
     emi = models.FloatField(default=0)
+    # Exact copies of the money columns above, in paise and basis points, kept in sync on save
+    principal_paise = models.BigIntegerField(default=1000000)
+    interest_bps = models.IntegerField(default=900)
+    amount_paise = models.BigIntegerField(default=0)
+    emi_paise = models.BigIntegerField(default=0)
+    # Running balance of the repayment ledger, written in the same transaction as every payment
+    paid_paise = models.BigIntegerField(default=0)
+    outstanding_paise = models.BigIntegerField(default=0)
+    next_due_date = models.DateTimeField(blank=True, null=True)
     status = models.CharField(max_length=12, default="NEW")
     start_date = models.DateTimeField(blank=True, null=True)
     end_date = models.DateTimeField(blank=True, null=True)
     modified_date = models.DateTimeField(auto_now=True)
     history = HistoricalRecords()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-modified_date', '-id'], name='loan_recent_idx'),
+            models.Index(fields=['status', '-modified_date', '-id'], name='loan_status_recent_idx'),
+            models.Index(fields=['user', 'status', '-modified_date', '-id'], name='loan_user_status_recent_idx'),
+            models.Index(fields=['-modified_date', '-id'], name='loan_new_recent_idx', condition=Q(status="NEW")),
+            models.Index(fields=['next_due_date', 'id'], name='loan_due_idx',
+                         condition=Q(status="APPROVED", outstanding_paise__gt=0)),
+        ]
+
     def __str__(self):
         return f"{self.user.first_name} {self.user.last_name} - {self.principal}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if not instance.get_deferred_fields():
+            # Lets the portfolio summary take out what a loan counted for before it changes
+            instance._loaded_summary_state = instance.summary_state()
+        return instance
+
+    def save(self, *args, **kwargs):
+        self.sync_minor_units()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = update_fields = set(update_fields) | self.derived_fields(update_fields)
+        elif not self._state.adding:
+            # The amount paid is written by the ledger only, which may have posted since the loan was read
+            kwargs['update_fields'] = update_fields = {field.name for field in self._meta.concrete_fields
+                                                      if not field.primary_key and field.name != 'paid_paise'}
+        if update_fields is None or 'paid_paise' in update_fields or not update_fields & set(BALANCE_FIELDS):
+            self.sync_balance()
+            super().save(*args, **kwargs)
+            return
+        with transaction.atomic():
+            # The balance written is the one of the amount paid in the database, locked until then
+            self.paid_paise = Loan.objects.select_for_update().values_list('paid_paise', flat=True).get(pk=self.pk)
+            self.sync_balance()
+            super().save(*args, **kwargs)
+
+    @staticmethod
+    def derived_fields(fields):
+        """
+        Columns that have to be written along with fields, as they are computed from them.
+        """
+        derived = {MINOR_UNIT_FIELDS[field] for field in fields if field in MINOR_UNIT_FIELDS}
+        if derived or any(field in BALANCE_SOURCE_FIELDS for field in fields):
+            derived.update(BALANCE_FIELDS)
+        return derived
+
+    def sync_minor_units(self):
+        """
+        Sets the paise and basis point columns from the rupee and percent ones. Bulk inserts must
+        call it themselves.
+        """
+        self.principal_paise = to_paise(self.principal)
+        self.interest_bps = to_bps(self.interest)
+        self.amount_paise = to_paise(self.amount)
+        self.emi_paise = to_paise(self.emi)
+
+    def sync_balance(self):
+        """
+        Sets the outstanding balance and next due date from the terms and the amount paid. Must run
+        after sync_minor_units.
+        """
+        self.outstanding_paise = max(self.amount_paise - self.paid_paise, 0)
+        self.next_due_date = next_due_date(self.start_date, self.months, self.emi_paise, self.paid_paise,
+                                           self.outstanding_paise)
+
+    def summary_state(self):
+        return (self.status, self.granted_by_id, self.interest, self.principal_paise, self.amount_paise,
+                self.emi_paise)
+
+
+class LoanSummary(models.Model):
+    status = models.CharField(max_length=12)
+    granted_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+', null=True, default=None)
+    interest = models.FloatField()
+    count = models.IntegerField(default=0)
+    principal_paise = models.BigIntegerField(default=0)
+    amount_paise = models.BigIntegerField(default=0)
+    emi_paise = models.BigIntegerField(default=0)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['status', 'granted_by', 'interest'], name='loan_summary_agent_key',
+                                    condition=Q(granted_by__isnull=False)),
+            models.UniqueConstraint(fields=['status', 'interest'], name='loan_summary_no_agent_key',
+                                    condition=Q(granted_by__isnull=True)),
+        ]
+
+    def __str__(self):
+        return f"{self.status} - {self.granted_by_id} - {self.interest}"
+
+
+class LoanHistoryArchive(models.Model):
+    """
+    Compacted historical loan records moved out of the history table by archive_loan_history.
+
+    The first archived version of a loan in each run is a full snapshot, later ones only hold the
+    fields that changed.
+    """
+    loan_id = models.BigIntegerField()
+    history_date = models.DateTimeField()
+    history_type = models.CharField(max_length=1)
+    history_user_id = models.BigIntegerField(null=True)
+    snapshot = models.BooleanField(default=False)
+    changes = models.JSONField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['loan_id', 'history_date'], name='loan_archive_asof_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.loan_id} - {self.history_date}"
+
+
+class RateTier(models.Model):
+    """
+    One tier of a rate card. Loans applied for from effective_from on, with a principal of at
+    least min_principal_paise, get interest_bps until a rate card with a later date takes effect.
+    A rate card is every tier sharing one effective_from.
+    """
+    effective_from = models.DateTimeField()
+    min_principal_paise = models.BigIntegerField()
+    interest_bps = models.IntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['effective_from', 'min_principal_paise'], name='rate_tier_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.effective_from} - {self.min_principal_paise} - {self.interest_bps}"
+
+
+class Payment(models.Model):
+    """
+    One entry of the repayment ledger of a loan. Entries are never changed or deleted: a reversal
+    is a new entry of the opposite amount pointing at the payment it reverses.
+    """
+    loan = models.ForeignKey(Loan, on_delete=models.CASCADE, related_name='payments')
+    amount_paise = models.BigIntegerField()
+    paid_at = models.DateTimeField()
+    posted_by = models.ForeignKey(User, on_delete=models.SET_NULL, related_name='+', null=True, default=None)
+    reversal_of = models.OneToOneField('self', on_delete=models.PROTECT, related_name='reversal', null=True,
+                                       default=None)
+    created_date = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['loan', 'paid_at', 'id'], name='payment_loan_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.loan_id} - {self.amount_paise} - {self.paid_at}"
+
+
+class BatchShard(models.Model):
+    """
+    Checkpoint of one primary key range of loans in a run of a batch job. next_pk is committed with
+    the work on every chunk, so a failed or interrupted run resumes each shard where it stopped.
+    """
+    job = models.CharField(max_length=64)
+    run = models.CharField(max_length=64)
+    start_pk = models.BigIntegerField()
+    end_pk = models.BigIntegerField()
+    next_pk = models.BigIntegerField()
+    status = models.CharField(max_length=8, default="PENDING")
+    processed = models.IntegerField(default=0)
+    attempts = models.IntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+    modified_date = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['job', 'run', 'start_pk'], name='batch_shard_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.job} {self.run} - {self.start_pk}:{self.end_pk} - {self.status}"
@@ -0,0 +1,81 @@
+import datetime
+from decimal import Decimal, ROUND_HALF_UP
+from fractions import Fraction
+from functools import lru_cache
+
+# Every tier rate times every tenure a loan is likely to be quoted for
+ANNUITY_FACTOR_CACHE_SIZE = 4096
+
+# Longest tenure of a loan, as the cost of the exact annuity factor grows faster than its months
+MAX_LOAN_MONTHS = 600
+
+# Installments fall due every 730 hours from the start date, and the last one on the end date
+INSTALLMENT_PERIOD = datetime.timedelta(hours=730)
+
+# Rupee and percent columns of Loan -> their integer paise and basis point columns
+MINOR_UNIT_FIELDS = {
+    'principal': 'principal_paise',
+    'interest': 'interest_bps',
+    'amount': 'amount_paise',
+    'emi': 'emi_paise',
+}
+
+
+def to_hundredths(value):
+    # Through the shortest repr of the float, so 8.45 is 845 rather than 844.99...
+    return int((Decimal(str(value)) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def to_paise(rupees):
+    return to_hundredths(rupees)
+
+
+def to_bps(percent):
+    return to_hundredths(percent)
+
+
+def to_rupees(paise):
+    return paise / 100
+
+
+def to_percent(bps):
+    return bps / 100
+
+
+def round_half_up(value):
+    return (2 * value.numerator + value.denominator) // (2 * value.denominator)
+
+
+@lru_cache(maxsize=ANNUITY_FACTOR_CACHE_SIZE)
+def annuity_factor(interest_bps, months):
+    """
+    Exact share of the principal repaid each month, r(1 + r)^n / ((1 + r)^n - 1) for the monthly
+    rate r of an annual interest_bps, memoized so a grid of quotes raises each (rate, months) to
+    its power once.
+    """
+    if not 0 < months <= MAX_LOAN_MONTHS:
+        raise ValueError(f'A loan must run for 1 to {MAX_LOAN_MONTHS} months')
+    if not interest_bps:
+        return Fraction(1, months)
+    rate = Fraction(interest_bps, 12 * 100 * 100)
+    growth = (1 + rate) ** months
+    return rate * growth / (growth - 1)
+
+
+def emi_paise(principal_paise, months, interest_bps):
+    """
+    Monthly installment in whole paise of an annual rate of interest_bps basis points, computed
+    exactly with rationals and rounded half up once at the end.
+    """
+    return round_half_up(principal_paise * annuity_factor(interest_bps, months))
+
+
+def next_due_date(start_date, months, emi_paise, paid_paise, outstanding_paise):
+    """
+    Due date of the first installment that paid_paise does not fully cover, or None when nothing
+    is outstanding or the loan has no schedule.
+    """
+    if outstanding_paise <= 0 or start_date is None or months <= 0 or emi_paise <= 0:
+        return None
+    covered = min(max(paid_paise, 0) // emi_paise, months - 1)
+    return start_date + INSTALLMENT_PERIOD * (covered + 1)
@@ -0,0 +1,9 @@
+from backend.pagination import KeysetPagination
+
+
+class LoanKeysetPagination(KeysetPagination):
+    ordering = ('-modified_date', '-id')
+
+
+class DueLoanKeysetPagination(KeysetPagination):
+    ordering = ('next_due_date', 'id')
@@ -0,0 +1,28 @@
+from .money import MAX_LOAN_MONTHS, emi_paise, to_paise, to_percent, to_rupees
+from .rates import rate_cards
+
+MAX_QUOTE_CELLS = 2500
+MAX_QUOTE_MONTHS = MAX_LOAN_MONTHS
+
+
+def quote_grid(principals, tenures, moment=None):
+    """
+    EMI and amount of every principal over every tenure, on the same terms as loan_terms.
+
+    The rate of each principal is looked up once and the annuity factor of each (rate, months) is
+    memoized, so a cell costs a multiplication and a rounding.
+    """
+    quotes = []
+    for principal in principals:
+        principal_paise = to_paise(principal)
+        interest_bps = rate_cards.interest_bps(principal_paise, moment)
+        options = []
+        for months in tenures:
+            installment = emi_paise(principal_paise, months, interest_bps)
+            options.append({
+                'months': months,
+                'emi': to_rupees(installment),
+                'amount': to_rupees(installment * months)
+            })
+        quotes.append({'principal': principal, 'interest': to_percent(interest_bps), 'options': options})
+    return quotes
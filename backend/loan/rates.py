@@ -0,0 +1,113 @@
+import bisect
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.utils import timezone
+
+from .models import RateTier
+from .money import to_paise, to_percent
+
+RATE_CARD_VERSION_KEY = 'loan:rate-card-version'
+
+# (min principal in paise, interest in basis points) used when no rate card is in effect, the
+# rates of the application before rate cards: 8.45% from 10000, 10% from 10 lakh, 12% from 25 lakh
+# and 12% below 10000
+DEFAULT_RATE_CARD = ((0, 1200), (1000000, 845), (100000000, 1000), (250000000, 1200))
+
+
+def split_tiers(tiers):
+    tiers = sorted(tiers)
+    return [minimum for minimum, _ in tiers], [bps for _, bps in tiers]
+
+
+class RateCardCache:
+    """
+    Per process copy of every rate card, as tiers sorted by minimum principal, so looking up a
+    rate is two bisections in memory.
+
+    Saving or deleting a tier reloads the copy of that process and bumps a version in the Django
+    cache, which the other processes check at most every check_interval seconds. They reload on a
+    background thread and keep answering from the cards they hold meanwhile, so only a process
+    that could not warm its cards on startup reads them during a request. Cards with a later
+    effective date take over without a reload.
+    """
+
+    def __init__(self, check_interval=5):
+        self.check_interval = check_interval
+        # (effective dates, tiers of each date, version), swapped as a whole
+        self._cards = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        self._refresher = None
+
+    def interest_bps(self, principal_paise, moment=None):
+        starts, cards = self.cards()
+        index = bisect.bisect_right(starts, moment or timezone.now()) - 1
+        minimums, rates = cards[index] if index >= 0 else split_tiers(DEFAULT_RATE_CARD)
+        tier = bisect.bisect_right(minimums, principal_paise) - 1
+        return rates[max(tier, 0)]
+
+    def interest(self, principal, moment=None):
+        return to_percent(self.interest_bps(to_paise(principal), moment))
+
+    def cards(self):
+        cards = self._cards
+        now = time.monotonic()
+        if cards is not None and now - self._checked < self.check_interval:
+            return cards[0], cards[1]
+        self._checked = now
+        version = cache.get(RATE_CARD_VERSION_KEY)
+        if cards is None:
+            cards = self.load(version)
+        elif cards[2] != version:
+            self.refresh(version)
+        return cards[0], cards[1]
+
+    def refresh(self, version):
+        with self._lock:
+            if self._refresher is not None and self._refresher.is_alive():
+                return
+            self._refresher = threading.Thread(target=self.reload, args=(version,), name='rate-card-refresh',
+                                               daemon=True)
+            self._refresher.start()
+
+    def reload(self, version):
+        try:
+            self.load(version)
+        except DatabaseError:
+            # The loaded cards stay in use and the next check tries again
+            pass
+        finally:
+            # Connections are per thread, so the one of the refresher would be left open
+            connection.close()
+
+    def load(self, version=None):
+        with self._lock:
+            tiers = {}
+            for effective_from, minimum, bps in RateTier.objects.values_list(
+                    'effective_from', 'min_principal_paise', 'interest_bps'):
+                tiers.setdefault(effective_from, []).append((minimum, bps))
+            starts = sorted(tiers)
+            self._cards = (starts, [split_tiers(tiers[start]) for start in starts], version)
+            return self._cards
+
+    def warm(self):
+        # Loads the cards before the first request, unless the table is not migrated yet
+        try:
+            self.load(cache.get(RATE_CARD_VERSION_KEY))
+        except DatabaseError:
+            pass
+
+    def changed(self):
+        version = time.time_ns()
+        cache.set(RATE_CARD_VERSION_KEY, version, timeout=None)
+        self.load(version)
+
+    def clear(self):
+        self._cards = None
+
+
+rate_cards = RateCardCache(check_interval=settings.RATE_CARD['CHECK_INTERVAL'])
@@ -0,0 +1,144 @@
+import bisect
+import datetime
+import itertools
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+
+from user.models import User
+from .bulk import insert_loans
+from .models import Loan
+from .summary import apply_summary_changes
+from .terms import loan_terms
+
+SEED_BATCH_SIZE = 5000
+DEFAULT_PASSWORD = 'password'
+# Loans start over the days before this, unless given another end, so a seed always gives the same data
+SEED_END = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+
+FIRST_NAMES = ['Aarav', 'Aditi', 'Arjun', 'Diya', 'Ishaan', 'Kavya', 'Meera', 'Neha', 'Rahul', 'Rohan', 'Saanvi',
+               'Sneha', 'Tanmay', 'Vihaan', 'Vivek', 'Zara']
+LAST_NAMES = ['Bhat', 'Deshpande', 'Gupta', 'Iyer', 'Joshi', 'Kulkarni', 'Mehta', 'Nair', 'Pardeshi', 'Patel',
+              'Rao', 'Reddy', 'Shah', 'Sharma', 'Singh', 'Verma']
+# Tenure in months and how often it is picked
+MONTHS = [(6, 4), (12, 18), (18, 6), (24, 20), (36, 20), (48, 10), (60, 14), (84, 5), (120, 3)]
+STATUSES = [("NEW", 20), ("APPROVED", 65), ("REJECTED", 15)]
+# Share of agents still waiting for approval
+PENDING_AGENTS = 0.05
+
+
+def principal(rng):
+    """
+    Log-normal around 3 lakh, so most loans are small with a long tail of large ones, rounded to
+    a thousand and clamped to what the application accepts.
+    """
+    return float(min(max(round(rng.lognormvariate(12.6, 0.9), -3), 10000), 50000000))
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def seed_users(rng, role, count, domain, password, start, end, **flags):
+    span = (end - start).total_seconds()
+    for index in range(count):
+        first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        user = User(email=f'{role}{index}@{domain}', password=password, first_name=first_name, last_name=last_name,
+                    date_joined=start + datetime.timedelta(seconds=rng.uniform(0, span)), **flags)
+        if role == 'agent':
+            user.is_approved = rng.random() >= PENDING_AGENTS
+        yield user
+
+
+def seed_loans(rng, count, customers, agents, start, end):
+    """
+    Yields (loan, applied) pairs, where applied is the loan as it was applied for when the loan
+    has been decided since, else None.
+    """
+    months, month_weights = zip(*MONTHS)
+    statuses, status_weights = zip(*STATUSES)
+    # A few agents bring in most of the loans
+    agent_weights = list(itertools.accumulate(rng.paretovariate(1.5) for _ in agents))
+    span = (end - start).total_seconds()
+    for _ in range(count):
+        started = start + datetime.timedelta(seconds=rng.uniform(0, span))
+        agent = agents[bisect.bisect(agent_weights, rng.uniform(0, agent_weights[-1]))]
+        terms = loan_terms(principal(rng), rng.choices(months, month_weights)[0], started)
+        applied = Loan(user_id=customers[rng.randrange(len(customers))], granted_by_id=agent, status="NEW",
+                       modified_date=started, **terms)
+        status = rng.choices(statuses, status_weights)[0]
+        if status == "NEW":
+            yield applied, None
+            continue
+        # Decided within a couple of weeks, mostly within days
+        decided = min(started + datetime.timedelta(hours=rng.expovariate(1 / 72)), end)
+        yield Loan(user_id=applied.user_id, granted_by_id=agent, status=status, modified_date=decided,
+                   **terms), applied
+
+
+def historical_record(loan, pk, history_type, user_id):
+    return Loan.history.model(history_date=loan.modified_date, history_type=history_type, history_user_id=user_id,
+                              id=pk, **{field.attname: getattr(loan, field.attname)
+                                        for field in Loan._meta.fields if field.attname != 'id'})
+
+
+def seed_database(customers, agents, loans, admins=1, seed=0, end=SEED_END, days=730, password=DEFAULT_PASSWORD,
+                  batch_size=SEED_BATCH_SIZE, progress=None):
+    """
+    Bulk inserts users and loans drawn from realistic distributions, deterministically from seed.
+
+    Every user shares one password hash, or an unusable password when password is None. Loans
+    start over the days before end, SEED_END by default, and decided loans get a historical record for the
+    application by their agent and one for the decision by an admin. Users get emails on a
+    domain named after the seed, such as customer0@seed0.example.com. Returns the primary keys of
+    the admins, agents and customers.
+    """
+    rng = random.Random(seed)
+    start = end - datetime.timedelta(days=days)
+    domain = f'seed{seed}.example.com'
+    password = make_password(password)
+    seeded = {}
+    for role, count, flags in (('admin', admins, {'is_admin': True, 'is_customer': False, 'is_staff': True}),
+                               ('agent', agents, {'is_agent': True, 'is_customer': False}),
+                               ('customer', customers, {})):
+        for batch in batched(seed_users(rng, role, count, domain, password, start, end, **flags), batch_size):
+            User.objects.bulk_create(batch, batch_size=batch_size)
+            if progress:
+                progress(role, len(batch))
+        seeded[role] = list(User.objects.filter(email__startswith=role, email__endswith=f'@{domain}')
+                            .order_by('pk').values_list('pk', flat=True))
+    lenders = list(User.objects.filter(email__startswith='agent', email__endswith=f'@{domain}', is_approved=True)
+                   .order_by('pk').values_list('pk', flat=True))
+    if loans and not (seeded['customer'] and lenders and seeded['admin']):
+        raise ValueError('Seeding loans needs at least one customer, approved agent and admin')
+
+    for batch in batched(seed_loans(rng, loans, seeded['customer'], lenders, start, end), batch_size):
+        with transaction.atomic():
+            modified_dates = [loan.modified_date for loan, _ in batch]
+            created = insert_loans([loan for loan, _ in batch], batch_size)
+            for loan, modified_date in zip(created, modified_dates):
+                loan.modified_date = modified_date
+            records = []
+            for loan, (_, applied) in zip(created, batch):
+                if applied is not None:
+                    records.append(historical_record(applied, loan.pk, '+', loan.granted_by_id))
+                    records.append(historical_record(loan, loan.pk, '~', seeded['admin'][0]))
+                else:
+                    records.append(historical_record(loan, loan.pk, '+', loan.granted_by_id))
+            Loan.history.model.objects.bulk_create(records, batch_size=batch_size)
+            # Inserting set modified_date to now (auto_now), so it is set back to the drawn date, which is
+            # the date of the last historical record, in one UPDATE
+            Loan.objects.filter(pk__in=[loan.pk for loan in created]).update(modified_date=Subquery(
+                Loan.history.filter(id=OuterRef('pk')).order_by('-history_date').values('history_date')[:1]))
+            apply_summary_changes(added=[loan.summary_state() for loan in created])
+        # The loans belong to users created above, so no cached loan list has to be dropped
+        if progress:
+            progress('loan', len(batch))
+    return seeded
@@ -1,8 +1,17 @@
+from django.conf import settings
 from django.core.exceptions import ValidationError
-from rest_framework import serializers
+from django.utils import timezone
+from django.utils.functional import cached_property
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
 from rest_framework.serializers import ModelSerializer, Serializer
 
+from backend.timing import TimedSerializerMixin, timed
+
 from .models import Loan
+from .money import MAX_LOAN_MONTHS, to_rupees
+from .quote import MAX_QUOTE_CELLS, MAX_QUOTE_MONTHS
+from .transitions import DECISIONS, MAX_BULK_DECISIONS
 
 
 def validate_principal(value):
@@ -10,14 +19,33 @@ def validate_principal(value):
         raise ValidationError('Principal Amount Cannot be less than 10000')
 
 
-class AgentRequestSerializer(ModelSerializer):
+class AgentRequestSerializer(TimedSerializerMixin, ModelSerializer):
     class Meta:
         model = Loan
         fields = ['user', 'granted_by', 'principal', 'interest', 'months', 'emi', 'amount', 'status', 'start_date',
                   'end_date']
+        extra_kwargs = {'months': {'min_value': 1, 'max_value': MAX_LOAN_MONTHS}}
+
+
+class BulkLoanApplicationSerializer(Serializer):
+    user = serializers.EmailField(max_length=254)
+    principal = serializers.FloatField(validators=[validate_principal])
+    months = serializers.IntegerField(min_value=1, max_value=MAX_LOAN_MONTHS)
+
+
+class LoanQuoteSerializer(Serializer):
+    principals = serializers.ListField(child=serializers.FloatField(validators=[validate_principal]),
+                                       allow_empty=False)
+    months = serializers.ListField(child=serializers.IntegerField(min_value=1, max_value=MAX_QUOTE_MONTHS),
+                                   allow_empty=False)
 
+    def validate(self, data):
+        if len(data['principals']) * len(data['months']) > MAX_QUOTE_CELLS:
+            raise serializers.ValidationError(f'Cannot quote more than {MAX_QUOTE_CELLS} combinations at once')
+        return data
 
-class ListLoanSerializer(ModelSerializer):
+
+class ListLoanSerializer(TimedSerializerMixin, ModelSerializer):
     email = serializers.CharField(source='user.email', read_only=True)
     granted_by = serializers.CharField(source='granted_by.email', read_only=True)
     first_name = serializers.CharField(source='user.first_name', read_only=True)
@@ -29,8 +57,92 @@ class ListLoanSerializer(ModelSerializer):
                   'emi', 'status', 'start_date', 'end_date', 'modified_date']
 
 
+def datetime_representation(field, current_timezone):
+    """
+    DateTimeField.to_representation with the current timezone looked up once, for ISO 8601
+    output of aware datetimes. Other cases are left to the field.
+    """
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if current_timezone is None or getattr(field, 'timezone', None) is not None \
+            or not isinstance(output_format, str) or output_format.lower() != ISO_8601:
+        return field.to_representation
+
+    def to_representation(value):
+        if timezone.is_naive(value):
+            return field.to_representation(value)
+        value = value.astimezone(current_timezone).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return to_representation
+
+
+class ListLoanProjection:
+    """
+    Read only fast path of ListLoanSerializer over values() rows.
+
+    queryset() selects only the columns behind the serializer fields, joined to the customer and
+    the agent, and data() turns the rows into the exact output of the serializer without building
+    model instances. Like the serializer, it leaves granted_by out for loans without an agent.
+    """
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+
+    @cached_property
+    def columns(self):
+        # (output name, lookup, field, whether the value comes through a relation)
+        return [(name, field.source.replace('.', '__'), field, '.' in field.source)
+                for name, field in self.serializer_class().fields.items()]
+
+    def queryset(self, queryset):
+        return queryset.values(*[lookup for _, lookup, _, _ in self.columns])
+
+    def converters(self):
+        current_timezone = timezone.get_current_timezone() if settings.USE_TZ else None
+        return [(name, lookup, datetime_representation(field, current_timezone)
+                 if isinstance(field, serializers.DateTimeField) else field.to_representation, related)
+                for name, lookup, field, related in self.columns]
+
+    def to_representation(self, row, converters=None):
+        data = {}
+        for name, lookup, to_representation, related in converters or self.converters():
+            value = row[lookup]
+            if value is not None:
+                data[name] = to_representation(value)
+            elif not related:
+                data[name] = None
+        return data
+
+    def data(self, rows):
+        with timed('serialize'):
+            converters = self.converters()
+            return [self.to_representation(row, converters) for row in rows]
+
+
+list_loan_projection = ListLoanProjection(ListLoanSerializer)
+
+
+class OverdueLoanSerializer(ModelSerializer):
+    email = serializers.CharField(source='user.email', read_only=True)
+    granted_by = serializers.CharField(source='granted_by.email', read_only=True)
+    first_name = serializers.CharField(source='user.first_name', read_only=True)
+    last_name = serializers.CharField(source='user.last_name', read_only=True)
+    outstanding = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Loan
+        fields = ['id', 'email', 'first_name', 'last_name', 'granted_by', 'emi', 'outstanding', 'next_due_date']
+
+    def get_outstanding(self, instance):
+        return to_rupees(instance.outstanding_paise)
+
+
+class PaymentSerializer(Serializer):
+    amount = serializers.FloatField(min_value=0.01)
+    paid_at = serializers.DateTimeField(required=False)
+
+
 class ApproveOrRejectLoanSerializer(Serializer):
-    status = serializers.CharField(max_length=12)
+    status = serializers.ChoiceField(choices=DECISIONS)
 
     def update(self, instance, validated_data):
         instance.status = validated_data.get('status', instance.status)
@@ -38,10 +150,15 @@ class ApproveOrRejectLoanSerializer(Serializer):
         return instance
 
 
+class BulkApproveOrRejectLoanSerializer(Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=MAX_BULK_DECISIONS)
+    status = serializers.ChoiceField(choices=DECISIONS)
+
+
 class EditLoanSerializer(Serializer):
     principal = serializers.FloatField(default=10000, validators=[validate_principal])
     interest = serializers.FloatField(default=9)
-    months = serializers.IntegerField(default=0)
+    months = serializers.IntegerField(default=0, max_value=MAX_LOAN_MONTHS)
     amount = serializers.FloatField(default=0)
     emi = serializers.FloatField(default=0)
     start_date = serializers.DateTimeField()
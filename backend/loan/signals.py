@@ -0,0 +1,40 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from user.models import User
+
+from .cache import invalidate_customer_lists
+from .models import Loan, RateTier
+from .rates import rate_cards
+from .summary import apply_summary_changes
+
+
+@receiver(post_save, sender=Loan)
+def update_summary_on_save(sender, instance, **kwargs):
+    previous = getattr(instance, '_loaded_summary_state', None)
+    current = instance.summary_state()
+    if previous != current:
+        apply_summary_changes(removed=[previous] if previous else [], added=[current])
+    instance._loaded_summary_state = current
+    invalidate_customer_lists(instance.user_id)
+
+
+@receiver(post_delete, sender=Loan)
+def update_summary_on_delete(sender, instance, **kwargs):
+    previous = getattr(instance, '_loaded_summary_state', None) or instance.summary_state()
+    apply_summary_changes(removed=[previous])
+    invalidate_customer_lists(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_loan_lists(sender, instance, **kwargs):
+    # Ids of deleted users can be reused, so a new user must not see the lists cached for an old one
+    invalidate_customer_lists(instance.pk)
+
+
+@receiver(post_save, sender=RateTier)
+@receiver(post_delete, sender=RateTier)
+def reload_rate_cards(sender, instance, **kwargs):
+    transaction.on_commit(rate_cards.changed)
@@ -0,0 +1,57 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+
+from .models import Loan, LoanSummary
+
+
+def apply_summary_changes(removed=(), added=()):
+    """
+    Moves loans out of and into the portfolio summary.
+
+    removed and added are Loan.summary_state() tuples, with money in paise so the sums stay
+    exact. Changes are netted per summary row, so a batch of loans costs one UPDATE per
+    (status, agent, interest) it touches.
+    """
+    deltas = {}
+    for sign, states in ((-1, removed), (1, added)):
+        for status, granted_by_id, interest, principal, amount, emi in states:
+            delta = deltas.setdefault((status, granted_by_id, interest), [0, 0, 0, 0])
+            delta[0] += sign
+            delta[1] += sign * principal
+            delta[2] += sign * amount
+            delta[3] += sign * emi
+    for (status, granted_by_id, interest), (count, principal, amount, emi) in deltas.items():
+        if not (count or principal or amount or emi):
+            continue
+        key = {'status': status, 'granted_by_id': granted_by_id, 'interest': interest}
+        changes = {
+            'count': F('count') + count,
+            'principal_paise': F('principal_paise') + principal,
+            'amount_paise': F('amount_paise') + amount,
+            'emi_paise': F('emi_paise') + emi
+        }
+        if LoanSummary.objects.filter(**key).update(**changes) or count <= 0:
+            # Removals never create a row: one that is gone was deleted along with its agent, whose
+            # loans are deleted after it
+            continue
+        try:
+            with transaction.atomic():
+                LoanSummary.objects.create(count=count, principal_paise=principal, amount_paise=amount,
+                                           emi_paise=emi, **key)
+        except IntegrityError:
+            # Created concurrently since the update above
+            LoanSummary.objects.filter(**key).update(**changes)
+
+
+def rebuild_summary():
+    rows = Loan.objects.values('status', 'granted_by', 'interest').annotate(
+        total=Count('id'), principal_sum=Sum('principal_paise'), amount_sum=Sum('amount_paise'),
+        emi_sum=Sum('emi_paise'))
+    with transaction.atomic():
+        LoanSummary.objects.all().delete()
+        LoanSummary.objects.bulk_create([
+            LoanSummary(status=row['status'], granted_by_id=row['granted_by'], interest=row['interest'],
+                        count=row['total'], principal_paise=row['principal_sum'],
+                        amount_paise=row['amount_sum'], emi_paise=row['emi_sum'])
+            for row in rows
+        ])
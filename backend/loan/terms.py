@@ -0,0 +1,35 @@
+from django.utils import timezone
+
+from .money import INSTALLMENT_PERIOD, MAX_LOAN_MONTHS, emi_paise, to_bps, to_paise, to_rupees
+from .rates import rate_cards
+
+
+def calculate_interest(principal, moment=None):
+    return rate_cards.interest(principal, moment)
+
+
+def loan_terms(principal, months, start_date=None):
+    """
+    Terms of a loan of principal over months from start_date. Raises ValueError when months is not
+    within 1 to MAX_LOAN_MONTHS, before any interest is computed.
+    """
+    if not 0 < months <= MAX_LOAN_MONTHS:
+        raise ValueError(f'A loan must run for 1 to {MAX_LOAN_MONTHS} months')
+    interest = calculate_interest(principal, start_date)
+    principal_paise, interest_bps = to_paise(principal), to_bps(interest)
+    # Installments are whole paise, so the amount repaid is exactly months of them
+    installment = emi_paise(principal_paise, months, interest_bps)
+    start_date = start_date or timezone.localtime()
+    return {
+        'principal': principal,
+        'principal_paise': principal_paise,
+        'interest': interest,
+        'interest_bps': interest_bps,
+        'months': months,
+        'emi': to_rupees(installment),
+        'emi_paise': installment,
+        'amount': to_rupees(installment * months),
+        'amount_paise': installment * months,
+        'start_date': start_date,
+        'end_date': start_date + INSTALLMENT_PERIOD * months
+    }
@@ -0,0 +1,31 @@
+from django.test import SimpleTestCase
+
+from loan.amortization import amortize
+from loan.views import calculate_emi
+
+
+class AmortizationTest(SimpleTestCase):
+
+    def test_single_loan_matches_calculate_emi(self):
+        schedule = amortize(1000000.00, 60, 10)
+        self.assertAlmostEqual(schedule.emi[0], calculate_emi(1000000.00, 60, 10), places=6)
+        self.assertAlmostEqual(schedule.principal[0].sum(), 1000000.00, places=4)
+        self.assertEqual(schedule.balance[0, -1], 0)
+
+    def test_batch_pads_shorter_tenures(self):
+        schedule = amortize([10000, 500000, 3000000], [12, 36, 24], [8.45, 8.45, 12])
+        self.assertEqual(schedule.principal.shape, (3, 36))
+        self.assertEqual(schedule.principal[0, 12:].sum(), 0)
+        for index, principal in enumerate([10000, 500000, 3000000]):
+            self.assertAlmostEqual(schedule.principal[index].sum(), principal, places=4)
+            total = schedule.principal[index].sum() + schedule.interest[index].sum()
+            self.assertAlmostEqual(total, schedule.emi[index] * schedule.months[index], places=4)
+
+    def test_zero_rate(self):
+        schedule = amortize(12000, 12, 0)
+        self.assertAlmostEqual(schedule.emi[0], 1000)
+        self.assertEqual(schedule.interest.sum(), 0)
+
+    def test_invalid_months(self):
+        with self.assertRaises(ValueError):
+            amortize(12000, 0, 8.45)
@@ -0,0 +1,66 @@
+import datetime
+
+from django.test import TestCase
+from django.utils import timezone
+
+from loan.archive import archive_history, loan_as_of
+from loan.models import Loan, LoanHistoryArchive
+from user.models import User
+
+
+class LoanHistoryArchiveTest(TestCase):
+
+    def setUp(self):
+        self.customer = User.objects.create_user(email="customer@gmail.com", password="django1234",
+                                                 is_customer=True, is_agent=False)
+        self.start = timezone.now() - datetime.timedelta(days=400)
+        self.loan = self.save(Loan(user=self.customer, principal=50000.00, interest=8.45, months=12), 0)
+        self.save(self.loan, 10, principal=60000.00)
+        self.save(self.loan, 20, status="APPROVED")
+        self.save(self.loan, 300, status="REJECTED")
+
+    def save(self, loan, days, **changes):
+        for field, value in changes.items():
+            setattr(loan, field, value)
+        loan._history_date = self.start + datetime.timedelta(days=days)
+        loan.save()
+        return loan
+
+    def moments(self):
+        return [self.start + datetime.timedelta(days=days) for days in (-1, 0, 5, 10, 15, 25, 299, 300, 301)]
+
+    def test_as_of_is_unchanged_by_archiving(self):
+        before = [loan_as_of(self.loan.pk, moment) for moment in self.moments()]
+        archived = archive_history(self.start + datetime.timedelta(days=100))
+        self.assertEqual(archived, 3)
+        self.assertEqual(Loan.history.filter(id=self.loan.pk).count(), 1)
+        self.assertEqual([loan_as_of(self.loan.pk, moment) for moment in self.moments()], before)
+        self.assertIsNone(before[0])
+        self.assertEqual(before[3]['principal'], 60000.00)
+        self.assertEqual(before[5]['status'], "APPROVED")
+
+    def test_compaction_keeps_changed_fields(self):
+        archive_history(self.start + datetime.timedelta(days=100))
+        records = list(LoanHistoryArchive.objects.order_by('id'))
+        self.assertTrue(records[0].snapshot)
+        self.assertEqual(records[0].changes['principal'], 50000.00)
+        self.assertEqual(set(records[1].changes), {'principal', 'principal_paise', 'modified_date'})
+        self.assertEqual(set(records[2].changes), {'status', 'modified_date'})
+
+    def test_archiving_again_starts_a_new_snapshot(self):
+        archive_history(self.start + datetime.timedelta(days=15))
+        archive_history(self.start + datetime.timedelta(days=350))
+        self.assertEqual(LoanHistoryArchive.objects.filter(snapshot=True).count(), 2)
+        self.assertEqual(loan_as_of(self.loan.pk, self.start + datetime.timedelta(days=25))['status'], "APPROVED")
+        self.assertEqual(loan_as_of(self.loan.pk, timezone.now())['status'], "REJECTED")
+
+    def test_as_of_snapshot_archived_before_new_columns(self):
+        archive_history(self.start + datetime.timedelta(days=15))
+        before = loan_as_of(self.loan.pk, self.start + datetime.timedelta(days=10))
+        # As archived before the minor unit and repayment ledger columns were added
+        for record in LoanHistoryArchive.objects.all():
+            for column in ('principal_paise', 'interest_bps', 'amount_paise', 'emi_paise', 'paid_paise',
+                           'outstanding_paise', 'next_due_date'):
+                record.changes.pop(column, None)
+            record.save()
+        self.assertEqual(loan_as_of(self.loan.pk, self.start + datetime.timedelta(days=10)), before)
@@ -0,0 +1,73 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from loan.batch import ReconcileBalancesJob, plan_shards, run_job
+from loan.ledger import post_payment
+from loan.models import BatchShard, Loan
+from .test_setup import RepaymentLedgerTestSetUp
+
+
+class BatchJobTest(RepaymentLedgerTestSetUp):
+
+    def setUp(self):
+        super().setUp()
+        self.loans = sorted([self.overdue.pk, self.current.pk, self.new.pk])
+
+    # Shards cover every loan id once and are kept when the run is planned again
+    def test_plan_shards(self):
+        shards = plan_shards('reconcile_balances', 'night', shard_size=2)
+        self.assertEqual([(shard.start_pk, shard.end_pk) for shard in shards],
+                         [(self.loans[0], self.loans[0] + 2), (self.loans[0] + 2, self.loans[0] + 4)])
+        self.assertEqual(plan_shards('reconcile_balances', 'night', shard_size=1), shards)
+
+    # Balances that drifted from the ledger are recomputed from the payments
+    def test_reconcile_balances(self):
+        post_payment(self.overdue.pk, self.overdue.emi_paise)
+        Loan.objects.filter(pk__in=self.loans).update(paid_paise=100, outstanding_paise=0)
+        shards = run_job('reconcile_balances', 'night', shard_size=2, chunk_size=1)
+        self.assertEqual([(shard.status, shard.processed) for shard in shards], [("DONE", 2), ("DONE", 1)])
+        self.assertEqual(Loan.objects.get(pk=self.overdue.pk).paid_paise, self.overdue.emi_paise)
+        for loan in [self.overdue, self.current, self.new]:
+            paid, outstanding = Loan.objects.values_list('paid_paise', 'outstanding_paise').get(pk=loan.pk)
+            self.assertEqual(paid + outstanding, loan.amount_paise)
+
+    # A failed shard keeps its checkpoint and is the only one a rerun processes
+    def test_resume(self):
+        process = ReconcileBalancesJob.process
+        calls = []
+
+        def failing(job, loans):
+            calls.append(loans[0].pk)
+            if loans[0].pk == self.loans[1]:
+                raise RuntimeError('no more time')
+            process(job, loans)
+
+        with mock.patch.object(ReconcileBalancesJob, 'process', failing), self.assertLogs('loan.batch', 'ERROR'):
+            shards = run_job('reconcile_balances', 'night', shard_size=2, chunk_size=1)
+        self.assertEqual([(shard.status, shard.next_pk) for shard in shards],
+                         [("FAILED", self.loans[1]), ("DONE", self.loans[2] + 1)])
+        self.assertEqual(shards[0].error, 'RuntimeError: no more time')
+        calls.clear()
+
+        def counting(job, loans):
+            calls.append(loans[0].pk)
+            process(job, loans)
+
+        with mock.patch.object(ReconcileBalancesJob, 'process', counting):
+            shards = run_job('reconcile_balances', 'night', shard_size=2, chunk_size=1)
+        self.assertEqual(calls, [self.loans[1]])
+        self.assertEqual([(shard.status, shard.attempts) for shard in shards], [("DONE", 2), ("DONE", 1)])
+
+    # The command fails while shards are left, telling how to resume
+    def test_command(self):
+        out = StringIO()
+        call_command('run_batch_job', 'reconcile_balances', '--run', 'night', '--workers', '1', stdout=out)
+        self.assertIn('1 shards, 3 loans', out.getvalue())
+        self.assertEqual(BatchShard.objects.get().status, "DONE")
+        with mock.patch.object(ReconcileBalancesJob, 'process', side_effect=RuntimeError('no more time')), \
+                self.assertLogs('loan.batch', 'ERROR'):
+            with self.assertRaisesMessage(CommandError, '--run retry'):
+                call_command('run_batch_job', 'reconcile_balances', '--run', 'retry', stdout=out, stderr=StringIO())
@@ -0,0 +1,24 @@
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Query plans are checked against SQLite')
+class ListQueryPlanTest(TestCase):
+
+    def test_list_endpoints_use_indexes(self):
+        out = StringIO()
+        call_command('explain_list_queries', stdout=out)
+        plans = {}
+        for block in out.getvalue().strip().split('\n\n'):
+            name, plan = block.split('\n', 1)
+            plans[name] = plan
+        self.assertIn('loan_recent_idx', plans['list-loans-admin-agent'])
+        self.assertIn('loan_recent_idx (modified_date<?)', plans['list-loans-admin-agent?cursor='])
+        self.assertIn('loan_status_recent_idx (status=?)', plans['list-loans-admin-agent?status=APPROVED'])
+        self.assertIn('loan_user_status_recent_idx (user_id=? AND status=?)', plans['list-loans-customer?status=NEW'])
+        self.assertIn('user_customer_idx', plans['list-agent'])
+        self.assertIn('user_pending_agent_idx', plans['list-approvals'])
@@ -0,0 +1,84 @@
+from django.utils import timezone
+
+from loan.ledger import PaymentConflict, PaymentRejected, apply_to_balance, post_payment, reverse_payment
+from loan.models import Loan, Payment
+from loan.money import INSTALLMENT_PERIOD
+from loan.terms import loan_terms
+from loan.transitions import edit
+from .test_setup import RepaymentLedgerTestSetUp
+
+
+class RepaymentLedgerTest(RepaymentLedgerTestSetUp):
+
+    def balance(self, loan):
+        loan = Loan.objects.get(pk=loan.pk)
+        return loan.paid_paise, loan.outstanding_paise, loan.next_due_date
+
+    # A new loan owes its whole amount from its first installment
+    def test_initial_balance(self):
+        self.assertEqual(self.balance(self.overdue), (0, self.overdue.amount_paise,
+                                                      self.overdue.start_date + INSTALLMENT_PERIOD))
+
+    # Each posting moves the balance and the due date past the installments it covers
+    def test_post_payment(self):
+        post_payment(self.overdue.pk, self.overdue.emi_paise * 2 + 100, posted_by=self.agent)
+        self.assertEqual(self.balance(self.overdue), (self.overdue.emi_paise * 2 + 100,
+                                                      self.overdue.amount_paise - self.overdue.emi_paise * 2 - 100,
+                                                      self.overdue.start_date + INSTALLMENT_PERIOD * 3))
+        post_payment(self.overdue.pk, self.overdue.amount_paise - self.overdue.emi_paise * 2 - 100)
+        self.assertEqual(self.balance(self.overdue), (self.overdue.amount_paise, 0, None))
+        self.assertEqual(Payment.objects.filter(loan=self.overdue).count(), 2)
+
+    # Payments on loans that are not approved, over the balance or not positive are refused
+    def test_rejected_payments(self):
+        for pk, amount_paise in [(self.new.pk, 100), (self.overdue.pk, self.overdue.amount_paise + 1),
+                                 (self.overdue.pk, 0)]:
+            with self.assertRaises(PaymentRejected):
+                post_payment(pk, amount_paise)
+        self.assertFalse(Payment.objects.exists())
+        self.assertEqual(self.balance(self.overdue)[0], 0)
+
+    # A reversal is a new entry and can only be made once, on a payment
+    def test_reverse_payment(self):
+        _, payment = post_payment(self.overdue.pk, self.overdue.emi_paise)
+        _, reversal = reverse_payment(payment.pk, posted_by=self.admin)
+        self.assertEqual((reversal.amount_paise, reversal.reversal_of_id), (-payment.amount_paise, payment.pk))
+        self.assertEqual(self.balance(self.overdue), (0, self.overdue.amount_paise,
+                                                      self.overdue.start_date + INSTALLMENT_PERIOD))
+        for pk in (payment.pk, reversal.pk):
+            with self.assertRaises(PaymentRejected):
+                reverse_payment(pk)
+
+    # A posting that lost a race with another one is not written
+    def test_conflict(self):
+        loan = Loan.objects.get(pk=self.overdue.pk)
+        post_payment(self.overdue.pk, 100)
+        with self.assertRaises(PaymentConflict):
+            apply_to_balance(loan, 100)
+        self.assertEqual(self.balance(self.overdue)[0], 100)
+
+    # Edits keep the paise and balance columns in step with the new terms
+    def test_edit_syncs_derived_columns(self):
+        terms = loan_terms(20000.00, 6, timezone.now())
+        edit(self.new.pk, {field: terms[field] for field in ('principal', 'interest', 'months', 'amount', 'emi',
+                                                             'start_date', 'end_date')})
+        loan = Loan.objects.get(pk=self.new.pk)
+        self.assertEqual((loan.principal_paise, loan.emi_paise, loan.outstanding_paise, loan.next_due_date),
+                         (terms['principal_paise'], terms['emi_paise'], terms['amount_paise'],
+                          terms['start_date'] + INSTALLMENT_PERIOD))
+
+    # Saving a loan read before a posting keeps what the ledger wrote, and derives the balance from it
+    def test_save_keeps_ledger_balance(self):
+        loan = Loan.objects.get(pk=self.overdue.pk)
+        post_payment(self.overdue.pk, self.overdue.emi_paise)
+        loan.save()
+        self.assertEqual(self.balance(self.overdue), (self.overdue.emi_paise,
+                                                      self.overdue.amount_paise - self.overdue.emi_paise,
+                                                      self.overdue.start_date + INSTALLMENT_PERIOD * 2))
+        loan = Loan.objects.get(pk=self.overdue.pk)
+        post_payment(self.overdue.pk, self.overdue.emi_paise)
+        loan.amount += 100
+        loan.save(update_fields=['amount'])
+        self.assertEqual(self.balance(self.overdue), (self.overdue.emi_paise * 2,
+                                                      self.overdue.amount_paise + 10000 - self.overdue.emi_paise * 2,
+                                                      self.overdue.start_date + INSTALLMENT_PERIOD * 3))
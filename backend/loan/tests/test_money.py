@@ -0,0 +1,82 @@
+from fractions import Fraction
+
+from django.test import SimpleTestCase, TestCase
+
+from loan.models import Loan, LoanSummary
+from loan.money import MAX_LOAN_MONTHS, annuity_factor, emi_paise, to_bps, to_paise, to_rupees
+from loan.terms import loan_terms
+from loan.transitions import edit
+from loan.views import calculate_emi
+from user.models import User
+
+
+class MoneyTest(SimpleTestCase):
+
+    def test_conversions_round_half_up(self):
+        self.assertEqual(to_bps(8.45), 845)
+        self.assertEqual(to_paise(1.005), 101)
+        self.assertEqual(to_paise(0.1 + 0.2), 30)
+        self.assertEqual(to_paise(1000000.00), 100000000)
+        self.assertEqual(to_rupees(435983), 4359.83)
+
+    def test_emi_matches_calculate_emi(self):
+        for principal, months, rate in [(1000000.00, 60, 10), (50000.00, 12, 8.45), (3000000.00, 360, 12)]:
+            installment = emi_paise(to_paise(principal), months, to_bps(rate))
+            self.assertLessEqual(abs(installment - calculate_emi(principal, months, rate) * 100), 0.5)
+
+    def test_zero_rate(self):
+        self.assertEqual(emi_paise(1200000, 12, 0), 100000)
+        self.assertEqual(emi_paise(1000000, 3, 0), 333333)
+
+    def test_invalid_months(self):
+        for months in (0, MAX_LOAN_MONTHS + 1, 100000):
+            with self.assertRaises(ValueError):
+                emi_paise(1000000, months, 845)
+
+    def test_annuity_factor_is_memoized(self):
+        annuity_factor.cache_clear()
+        self.assertEqual(annuity_factor(0, 4), Fraction(1, 4))
+        self.assertEqual(annuity_factor(1200, 1), Fraction(101, 100))
+        emi_paise(1000000, 60, 1000)
+        emi_paise(2000000, 60, 1000)
+        self.assertEqual(annuity_factor.cache_info().misses, 3)
+
+
+class LoanMinorUnitsTest(TestCase):
+
+    def setUp(self):
+        self.customer = User.objects.create_user(email="customer@gmail.com", password="django1234")
+
+    def test_loan_terms_repay_whole_installments(self):
+        terms = loan_terms(50000.00, 12)
+        self.assertEqual((terms['principal_paise'], terms['interest_bps']), (5000000, 845))
+        self.assertEqual(terms['amount_paise'], terms['emi_paise'] * 12)
+        self.assertEqual(terms['emi'], terms['emi_paise'] / 100)
+
+    def test_save_syncs_minor_units(self):
+        loan = Loan.objects.create(user=self.customer, principal=20000.50, interest=8.45, emi=1750.125, amount=21001.5)
+        loan.refresh_from_db()
+        self.assertEqual((loan.principal_paise, loan.interest_bps, loan.emi_paise, loan.amount_paise),
+                         (2000050, 845, 175013, 2100150))
+
+    def test_update_fields_include_minor_units(self):
+        loan = Loan.objects.create(user=self.customer, principal=20000.00)
+        loan.principal = 30000.00
+        loan.save(update_fields=['principal'])
+        loan.refresh_from_db()
+        self.assertEqual(loan.principal_paise, 3000000)
+
+    # Edits write the paise columns of the new terms, and move the loan between summary rows with them
+    def test_edit_syncs_minor_units(self):
+        terms = loan_terms(50000.00, 12)
+        loan = Loan.objects.create(user=self.customer, **{field: terms[field] for field in (
+            'principal', 'interest', 'months', 'emi', 'amount', 'start_date', 'end_date')})
+        terms = loan_terms(2000000.00, 12)
+        edit(loan.pk, {field: terms[field] for field in ('principal', 'interest', 'months', 'emi', 'amount',
+                                                         'start_date', 'end_date')})
+        loan.refresh_from_db()
+        self.assertEqual((loan.principal_paise, loan.interest_bps, loan.emi_paise, loan.amount_paise),
+                         (200000000, 1000, terms['emi_paise'], terms['amount_paise']))
+        self.assertEqual(list(LoanSummary.objects.filter(count__gt=0).values_list(
+            'status', 'interest', 'count', 'principal_paise', 'amount_paise', 'emi_paise')),
+            [("NEW", 10, 1, 200000000, terms['amount_paise'], terms['emi_paise'])])
@@ -0,0 +1,82 @@
+import datetime
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from loan.models import RateTier
+from loan.rates import RATE_CARD_VERSION_KEY, RateCardCache, rate_cards
+from loan.terms import calculate_interest, loan_terms
+
+
+class RateCardTest(TestCase):
+
+    def setUp(self):
+        self.rates = RateCardCache(check_interval=60)
+        self.now = timezone.now()
+
+    def add_card(self, effective_from, tiers):
+        for minimum, bps in tiers:
+            RateTier.objects.create(effective_from=effective_from, min_principal_paise=minimum, interest_bps=bps)
+
+    # The default card keeps the rates the application always had
+    def test_default_card(self):
+        self.assertEqual([self.rates.interest(principal) for principal in (5000, 10000, 999999.99, 1000000,
+                                                                           2499999, 2500000, 90000000)],
+                         [12, 8.45, 8.45, 10, 10, 12, 12])
+
+    # Without any card the built in rates apply
+    def test_no_card(self):
+        RateTier.objects.all().delete()
+        self.assertEqual(self.rates.interest(50000), 8.45)
+
+    # A card applies from its effective date on, without reloading
+    def test_effective_dates(self):
+        self.add_card(self.now + datetime.timedelta(days=1), [(0, 900), (5000000, 800)])
+        self.assertEqual(self.rates.interest(50000), 8.45)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.rates.interest(50000, self.now + datetime.timedelta(days=2)), 8)
+            self.assertEqual(self.rates.interest(49999, self.now + datetime.timedelta(days=2)), 9)
+            self.assertEqual(self.rates.interest(50000, self.now), 8.45)
+
+    # Saving a tier reloads the rate cards once the transaction commits
+    def test_reload_on_save(self):
+        with mock.patch.object(rate_cards, 'changed') as changed:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.add_card(self.now, [(0, 700)])
+        changed.assert_called_once_with()
+
+    # Loan terms use the card in effect on the start date
+    def test_loan_terms(self):
+        self.add_card(self.now - datetime.timedelta(days=1), [(0, 700)])
+        with mock.patch('loan.terms.rate_cards', self.rates):
+            self.assertEqual(calculate_interest(50000), 7)
+            terms = loan_terms(50000, 12, self.now - datetime.timedelta(days=2))
+        self.assertEqual((terms['interest'], terms['interest_bps']), (8.45, 845))
+
+
+class RateCardRefreshTest(TransactionTestCase):
+    # Keeps the default rate card of the data migrations for the tests after this one
+    serialized_rollback = True
+
+    def setUp(self):
+        self.rates = RateCardCache(check_interval=60)
+        self.now = timezone.now()
+
+    def tearDown(self):
+        cache.delete(RATE_CARD_VERSION_KEY)
+
+    # Lookups are answered from memory until the rate card version changes, and then from the
+    # loaded cards until a background thread has reloaded them
+    def test_reload_on_version_change(self):
+        self.rates.interest(50000)
+        RateTier.objects.create(effective_from=self.now - datetime.timedelta(days=1), min_principal_paise=0,
+                                interest_bps=700)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.rates.interest(50000), 8.45)
+            self.rates.check_interval = 0
+            cache.set(RATE_CARD_VERSION_KEY, 1)
+            self.assertEqual(self.rates.interest(50000), 8.45)
+            self.rates._refresher.join()
+            self.assertEqual(self.rates.interest(50000), 7)
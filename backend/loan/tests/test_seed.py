@@ -0,0 +1,78 @@
+import datetime
+
+from django.contrib.auth.hashers import check_password
+from django.test import TestCase
+from django.utils import timezone
+
+from loan.models import Loan, LoanSummary
+from loan.seed import SEED_END, seed_database
+from loan.summary import rebuild_summary
+from user.models import User
+
+
+class SeedDatabaseTest(TestCase):
+
+    def setUp(self):
+        self.end = timezone.make_aware(datetime.datetime(2026, 1, 1))
+
+    def seed(self, **options):
+        return seed_database(40, 4, 300, seed=3, end=self.end, batch_size=70, **options)
+
+    def snapshot(self):
+        users = list(User.objects.order_by('email').values_list(
+            'email', 'first_name', 'last_name', 'date_joined', 'is_agent', 'is_approved'))
+        loans = list(Loan.objects.order_by('start_date').values_list(
+            'user__email', 'granted_by__email', 'principal', 'months', 'status', 'start_date', 'modified_date'))
+        return users, loans
+
+    def test_seeding_is_deterministic(self):
+        self.seed()
+        first = self.snapshot()
+        Loan.history.all().delete()
+        Loan.objects.all().delete()
+        User.objects.all().delete()
+        seed_database(40, 4, 300, seed=3, end=self.end, batch_size=500)
+        self.assertEqual(self.snapshot(), first)
+
+    def test_seeded_rows(self):
+        seeded = self.seed()
+        self.assertEqual(len(seeded['customer']), 40)
+        self.assertEqual(len(seeded['agent']), 4)
+        self.assertEqual(Loan.objects.count(), 300)
+        customer = User.objects.get(pk=seeded['customer'][0])
+        self.assertEqual(customer.email, "customer0@seed3.example.com")
+        self.assertTrue(check_password("password", customer.password))
+        self.assertEqual(set(Loan.objects.values_list('status', flat=True)), {"NEW", "APPROVED", "REJECTED"})
+        self.assertFalse(Loan.objects.filter(start_date__lt=self.end - datetime.timedelta(days=730)).exists())
+        self.assertFalse(Loan.objects.filter(modified_date__gt=self.end).exists())
+        self.assertFalse(Loan.objects.filter(principal__lt=10000).exists())
+
+    def test_history_has_application_and_decision(self):
+        self.seed()
+        decided = Loan.objects.exclude(status="NEW")
+        self.assertEqual(Loan.history.filter(history_type='+').count(), 300)
+        self.assertEqual(Loan.history.filter(history_type='~').count(), decided.count())
+        loan = decided.first()
+        applied, changed = Loan.history.filter(id=loan.pk).order_by('history_date')
+        self.assertEqual((applied.status, applied.history_date), ("NEW", loan.start_date))
+        self.assertEqual((changed.status, changed.history_date), (loan.status, loan.modified_date))
+
+    def test_summary_matches_loans(self):
+        self.seed()
+        seeded = list(LoanSummary.objects.order_by('status', 'granted_by', 'interest').values_list(
+            'status', 'granted_by', 'interest', 'count'))
+        rebuild_summary()
+        self.assertEqual(seeded, list(LoanSummary.objects.order_by('status', 'granted_by', 'interest').values_list(
+            'status', 'granted_by', 'interest', 'count')))
+        self.assertEqual(sum(row[3] for row in seeded), 300)
+
+    def test_unusable_passwords(self):
+        self.seed(password=None)
+        self.assertFalse(any(user.has_usable_password() for user in User.objects.all()))
+
+    # Without an end the loans start before a fixed date, and modified_date keeps its auto_now
+    def test_default_end(self):
+        seed_database(10, 2, 50, seed=4)
+        self.assertTrue(Loan._meta.get_field('modified_date').auto_now)
+        self.assertFalse(Loan.objects.filter(modified_date__gt=SEED_END).exists())
+        self.assertFalse(Loan.objects.filter(start_date__lt=SEED_END - datetime.timedelta(days=730)).exists())
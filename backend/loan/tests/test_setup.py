@@ -7,27 +7,15 @@ from rest_framework_jwt.settings import api_settings
 
 from user.models import User
 from loan.models import Loan
+from loan.rates import rate_cards
+from loan.money import INSTALLMENT_PERIOD
+from loan.terms import calculate_interest, loan_terms
+from loan.views import calculate_emi
 
 jwt_payload_handler = api_settings.JWT_PAYLOAD_HANDLER
 jwt_encode_handler = api_settings.JWT_ENCODE_HANDLER
 
 
-def calculate_interest(principal):
-    if 10000 <= principal < 1000000:
-        return 8.45
-    elif 1000000 <= principal < 2500000:
-        return 10
-    else:
-        return 12
-
-
-def calculate_emi(principal, months, rate):
-    rate_per_month = float(rate) / 1200
-    numerator = float((1 + rate_per_month) ** months)
-    denominator = numerator - 1
-    return principal * rate_per_month * (numerator / denominator)
-
-
 class AgentRequestLoanTestSetUp(APITestCase):
     def setUp(self):
         self.customer = User.objects.create_user(email="cust@gmail.com", password="temp_pass", is_customer=True,
@@ -110,6 +98,25 @@ class ApproveOrRejectLoanTestSetup(APITestCase):
         return super().tearDown()
 
 
+class BulkApproveOrRejectLoanTestSetUp(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(email="admin@gmail.com", password="django1234")
+        self.agent = User.objects.create_user(email="temp@gmail.com", password="temp_pass", is_customer=False,
+                                              is_agent=True,
+                                              is_approved=True)
+        self.customer = User.objects.create_user(email="customer@gmail.com", password="django1234",
+                                                 is_customer=True, is_agent=False)
+        self.loans = [Loan.objects.create(user=self.customer, granted_by=self.agent, status=status,
+                                          **loan_terms(principal, 12))
+                      for principal, status in [(50000.00, "NEW"), (1000000.00, "NEW"), (50000.00, "APPROVED"),
+                                                (3000000.00, "NEW")]]
+        self.url = reverse('bulk-approve-reject-loan')
+        return super().setUp()
+
+    def tearDown(self):
+        return super().tearDown()
+
+
 class EditLoanTestSetUp(APITestCase):
     def setUp(self):
         customer_data = {
@@ -199,6 +206,15 @@ class ListLoanAdminAgentTestSetUp(APITestCase):
         self.customer = User.objects.create_user(email=customer_data['email'], password=customer_data['password'],
                                                  is_customer=customer_data['is_customer'],
                                                  is_agent=customer_data['is_agent'])
+        self.agent = User.objects.create_user(email="temp@gmail.com", password="temp_pass", is_customer=False,
+                                              is_agent=True,
+                                              is_approved=True)
+        self.loans = []
+        for status in ["NEW", "APPROVED", "NEW", "REJECTED", "NEW"]:
+            self.loans.append(Loan.objects.create(user=self.customer, granted_by=self.agent, principal=1000000.00,
+                                                  interest=calculate_interest(1000000.00), months=60,
+                                                  emi=calculate_emi(1000000.00, 60, calculate_interest(1000000.00)),
+                                                  status=status, start_date=timezone.localtime()))
         return super().setUp()
 
     def tearDown(self):
@@ -223,4 +239,181 @@ class ListLoansCustomerTestSetUp(APITestCase):
         return super().setUp()
 
     def tearDown(self):
-        return super().tearDown()
\ No newline at end of file
+        return super().tearDown()
+
+
+class LoanScheduleTestSetUp(APITestCase):
+    def setUp(self):
+        self.agent = User.objects.create_user(email="temp@gmail.com", password="temp_pass", is_customer=False,
+                                              is_agent=True,
+                                              is_approved=True)
+        self.customer = User.objects.create_user(email="customer@gmail.com", password="django1234",
+                                                 is_customer=True, is_agent=False)
+        self.other_customer = User.objects.create_user(email="other@gmail.com", password="django1234",
+                                                       is_customer=True, is_agent=False)
+        data = {
+            "user": self.customer,
+            "granted_by": self.agent,
+            "principal": 1000000.00,
+            "interest": calculate_interest(1000000.00),
+            "months": 60,
+            "emi": calculate_emi(1000000.00, 60, calculate_interest(1000000.00)),
+            "amount": calculate_emi(1000000.00, 60, calculate_interest(1000000.00)) * 60,
+            "status": "NEW",
+            "start_date": timezone.localtime(),
+            "end_date": timezone.localtime() + datetime.timedelta(hours=60 * 730)
+        }
+        self.loan = Loan.objects.create(**data)
+        self.url = reverse('loan-schedule', kwargs={'pk': self.loan.pk})
+        return super().setUp()
+
+    def tearDown(self):
+        return super().tearDown()
+
+
+class RepaymentLedgerTestSetUp(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(email="admin@gmail.com", password="django1234")
+        self.agent = User.objects.create_user(email="temp@gmail.com", password="temp_pass", is_customer=False,
+                                              is_agent=True,
+                                              is_approved=True)
+        self.customer = User.objects.create_user(email="customer@gmail.com", password="django1234",
+                                                 is_customer=True, is_agent=False)
+        self.other_customer = User.objects.create_user(email="other@gmail.com", password="django1234",
+                                                       is_customer=True, is_agent=False)
+        now = timezone.now()
+        started = now - INSTALLMENT_PERIOD * 3 - datetime.timedelta(hours=1)
+        # Three installments have fallen due on the first loan, none on the second
+        self.overdue = Loan.objects.create(user=self.customer, granted_by=self.agent, status="APPROVED",
+                                           **loan_terms(50000.00, 12, started))
+        self.current = Loan.objects.create(user=self.other_customer, granted_by=self.agent, status="APPROVED",
+                                           **loan_terms(1000000.00, 60, now))
+        self.new = Loan.objects.create(user=self.customer, granted_by=self.agent, status="NEW",
+                                       **loan_terms(50000.00, 12, started))
+        self.payments_url = reverse('loan-payments', kwargs={'pk': self.overdue.pk})
+        self.balance_url = reverse('loan-balance', kwargs={'pk': self.overdue.pk})
+        self.overdue_url = reverse('overdue-loans')
+        return super().setUp()
+
+    def tearDown(self):
+        return super().tearDown()
+
+
+class AgentBulkRequestLoanTestSetUp(APITestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user(email="cust@gmail.com", password="temp_pass", is_customer=True,
+                                                 is_agent=False,
+                                                 is_approved=True)
+        self.other_customer = User.objects.create_user(email="cust1@gmail.com", password="temp_pass",
+                                                       is_customer=True, is_agent=False, is_approved=True)
+        self.agent = User.objects.create_user(email="temp@gmail.com", password="temp_pass", is_customer=False,
+                                              is_agent=True,
+                                              is_approved=True)
+        self.data = {
+            "loans": [
+                {"user": self.customer.email, "principal": 1000000.00, "months": 60},
+                {"user": self.other_customer.email, "principal": 50000.00, "months": 12},
+                {"user": "missing@gmail.com", "principal": 50000.00, "months": 12},
+                {"user": self.customer.email, "principal": 500.00, "months": 12},
+            ]
+        }
+        payload = jwt_payload_handler(self.agent)
+        token = jwt_encode_handler(payload)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.request_url = reverse('bulk-customer-loan')
+        # As the WSGI and ASGI applications do on startup
+        rate_cards.warm()
+        return super().setUp()
+
+    def tearDown(self):
+        return super().tearDown()
+
+
+class PortfolioSummaryTestSetUp(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(email="admin@gmail.com", password="django1234")
+        self.customer = User.objects.create_user(email="customer@gmail.com", password="django1234",
+                                                 is_customer=True, is_agent=False)
+        self.agent = User.objects.create_user(email="temp@gmail.com", password="temp_pass", is_customer=False,
+                                              is_agent=True,
+                                              is_approved=True)
+        self.loans = []
+        for principal, status in [(1000000.00, "NEW"), (1000000.00, "APPROVED"), (50000.00, "NEW")]:
+            self.loans.append(Loan.objects.create(user=self.customer, granted_by=self.agent, principal=principal,
+                                                  interest=calculate_interest(principal), months=60,
+                                                  emi=calculate_emi(principal, 60, calculate_interest(principal)),
+                                                  amount=calculate_emi(principal, 60,
+                                                                       calculate_interest(principal)) * 60,
+                                                  status=status, start_date=timezone.localtime()))
+        self.url = reverse('portfolio-summary')
+        return super().setUp()
+
+    def tearDown(self):
+        return super().tearDown()
+
+
+class LoanQuoteTestSetUp(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(email="admin@gmail.com", password="django1234")
+        self.customer = User.objects.create_user(email="customer@gmail.com", password="django1234",
+                                                 is_customer=True, is_agent=False)
+        self.agent = User.objects.create_user(email="temp@gmail.com", password="temp_pass", is_customer=False,
+                                              is_agent=True,
+                                              is_approved=True)
+        self.data = {
+            "principals": [50000.00, 1000000.00, 3000000.00],
+            "months": [12, 60, 360]
+        }
+        rate_cards.warm()
+        self.url = reverse('loan-quote')
+        return super().setUp()
+
+    def tearDown(self):
+        return super().tearDown()
+
+
+class ExportLoanTestSetUp(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(email="admin@gmail.com", password="django1234")
+        self.customer = User.objects.create_user(email="customer@gmail.com", password="django1234",
+                                                 first_name="Customer", last_name="0", is_customer=True,
+                                                 is_agent=False)
+        self.agent = User.objects.create_user(email="temp@gmail.com", password="temp_pass", is_customer=False,
+                                              is_agent=True,
+                                              is_approved=True)
+        self.loans = []
+        start_date = timezone.make_aware(datetime.datetime(2021, 1, 10, 12, 0))
+        for days, status in [(0, "NEW"), (31, "APPROVED"), (62, "NEW")]:
+            self.loans.append(Loan.objects.create(user=self.customer, granted_by=self.agent, principal=1000000.00,
+                                                  interest=calculate_interest(1000000.00), months=60,
+                                                  emi=calculate_emi(1000000.00, 60, calculate_interest(1000000.00)),
+                                                  status=status,
+                                                  start_date=start_date + datetime.timedelta(days=days)))
+        self.url = reverse('export-loans')
+        return super().setUp()
+
+    def tearDown(self):
+        return super().tearDown()
+
+
+class CustomerLoanCacheTestSetUp(APITestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user(email="customer@gmail.com", password="django1234",
+                                                 is_customer=True, is_agent=False)
+        self.agent = User.objects.create_user(email="temp@gmail.com", password="temp_pass", is_customer=False,
+                                              is_agent=True,
+                                              is_approved=True)
+        self.loans = []
+        for status in ["NEW", "APPROVED"]:
+            self.loans.append(Loan.objects.create(user=self.customer, granted_by=self.agent, principal=1000000.00,
+                                                  interest=calculate_interest(1000000.00), months=60,
+                                                  emi=calculate_emi(1000000.00, 60, calculate_interest(1000000.00)),
+                                                  status=status, start_date=timezone.localtime()))
+        payload = jwt_payload_handler(self.customer)
+        token = jwt_encode_handler(payload)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.url = reverse('list-loans-customer')
+        return super().setUp()
+
+    def tearDown(self):
+        return super().tearDown()
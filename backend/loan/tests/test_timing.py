@@ -0,0 +1,86 @@
+import asyncio
+import json
+
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.test import AsyncClient, override_settings
+from django.urls import reverse
+from rest_framework_jwt.settings import api_settings
+
+from backend.timing import RequestTimingMiddleware, logger, time_queries
+from .test_setup import ListLoanAdminAgentTestSetUp
+
+jwt_payload_handler = api_settings.JWT_PAYLOAD_HANDLER
+jwt_encode_handler = api_settings.JWT_ENCODE_HANDLER
+
+
+@async_to_sync
+async def async_get(client, url, **extra):
+    return await client.get(url, **extra)
+
+
+def server_timing(response):
+    metrics = {}
+    for metric in response['Server-Timing'].split(', '):
+        name, *params = metric.split(';')
+        metrics[name] = dict(param.split('=', 1) for param in params)
+    return metrics
+
+
+@override_settings(REQUEST_TIMING={'SAMPLE_RATE': 1.0, 'HEADER': True, 'LOG': True})
+class RequestTimingTest(ListLoanAdminAgentTestSetUp):
+
+    def setUp(self):
+        super().setUp()
+        self.token = jwt_encode_handler(jwt_payload_handler(self.admin))
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token}")
+
+    # Sampled requests report every phase in the header and in one log line
+    def test_sampled_request(self):
+        with self.assertLogs('backend.timing', 'INFO') as logs:
+            response = self.client.get(self.url, format="json")
+        self.assertEqual(response.status_code, 200)
+        metrics = server_timing(response)
+        self.assertEqual(set(metrics), {'total', 'view', 'auth', 'db', 'serialize', 'render'})
+        self.assertEqual(metrics['db']['desc'], '"1 queries"')
+        self.assertGreaterEqual(float(metrics['total']['dur']), float(metrics['view']['dur']))
+        self.assertEqual(len(logs.records), 1)
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual((line['view'], line['status'], line['queries']), ('list-loans-admin-agent', 200, 1))
+        self.assertIn('serialize_ms', line)
+
+    # Requests left out of the sample are not reported
+    @override_settings(REQUEST_TIMING={'SAMPLE_RATE': 0.0})
+    def test_unsampled_request(self):
+        with self.assertLogs('backend.timing', 'INFO') as logs:
+            logger.info('marker')
+            response = self.client.get(self.url, format="json")
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.assertEqual([record.getMessage() for record in logs.records], ['marker'])
+
+    # Query budgets installed after the timer do not displace it
+    def test_query_timer_stays_installed(self):
+        with self.assertLogs('backend.timing', 'INFO'):
+            self.client.get(self.url, format="json")
+            self.client.get(self.url, format="json")
+        self.assertEqual(connection.execute_wrappers, [time_queries])
+
+    # Async views are timed too
+    def test_async_view(self):
+        with self.assertLogs('backend.timing', 'INFO'):
+            response = async_get(AsyncClient(), reverse('async-list-loans-admin-agent'),
+                                 authorization=f"Bearer {self.token}")
+        self.assertEqual(response.status_code, 200)
+        metrics = server_timing(response)
+        self.assertTrue({'total', 'view', 'auth', 'db', 'render'} <= set(metrics))
+
+    # Under ASGI the middleware runs on the event loop rather than being adapted to a thread
+    def test_async_mode(self):
+        async def get_response(request):
+            pass
+        middleware = RequestTimingMiddleware(get_response)
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        self.assertTrue(asyncio.iscoroutinefunction(middleware.process_view))
+        middleware = RequestTimingMiddleware(lambda request: None)
+        self.assertFalse(asyncio.iscoroutinefunction(middleware))
+        self.assertFalse(asyncio.iscoroutinefunction(middleware.process_view))
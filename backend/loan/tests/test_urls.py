@@ -1,7 +1,10 @@
 from django.urls import reverse, resolve
 from django.test import  SimpleTestCase
-from loan.views import AgentRequestLoanView, ApproveOrRejectLoanView, EditLoanView, ListAdminAgentLoanView, \
-                        ListCustomerLoanView
+from loan.views import AgentRequestLoanView, AgentBulkRequestLoanView, ApproveOrRejectLoanView, EditLoanView, \
+                        ListAdminAgentLoanView, ListCustomerLoanView, LoanScheduleView, PortfolioSummaryView, \
+                        ExportLoanView, LoanAsOfView, AsyncListAdminAgentLoanView, AsyncListCustomerLoanView, \
+                        LoanQuoteView, LoanPaymentView, ReversePaymentView, LoanBalanceView, ListOverdueLoanView, \
+                        BulkApproveOrRejectLoanView
 
 
 class TestURLs(SimpleTestCase):
@@ -10,6 +13,10 @@ class TestURLs(SimpleTestCase):
         url = reverse('customer-loan')
         self.assertEqual(resolve(url).func.view_class, AgentRequestLoanView)
 
+    def test_bulk_loan_request(self):
+        url = reverse('bulk-customer-loan')
+        self.assertEqual(resolve(url).func.view_class, AgentBulkRequestLoanView)
+
     def test_approve_or_reject_loan(self):
         url = reverse('approve-reject-loan', kwargs={'pk': 1})
         self.assertEqual(resolve(url).func.view_class, ApproveOrRejectLoanView)
@@ -25,3 +32,43 @@ class TestURLs(SimpleTestCase):
     def test_list_loans_customer(self):
         url = reverse('list-loans-customer')
         self.assertEqual(resolve(url).func.view_class, ListCustomerLoanView)
+
+    def test_loan_schedule(self):
+        url = reverse('loan-schedule', kwargs={'pk': 1})
+        self.assertEqual(resolve(url).func.view_class, LoanScheduleView)
+
+    def test_portfolio_summary(self):
+        url = reverse('portfolio-summary')
+        self.assertEqual(resolve(url).func.view_class, PortfolioSummaryView)
+
+    def test_export_loans(self):
+        url = reverse('export-loans')
+        self.assertEqual(resolve(url).func.view_class, ExportLoanView)
+
+    def test_loan_as_of(self):
+        url = reverse('loan-as-of', kwargs={'pk': 1})
+        self.assertEqual(resolve(url).func.view_class, LoanAsOfView)
+
+    def test_async_loan_lists(self):
+        url = reverse('async-list-loans-admin-agent')
+        self.assertEqual(resolve(url).func.view_class, AsyncListAdminAgentLoanView)
+        url = reverse('async-list-loans-customer')
+        self.assertEqual(resolve(url).func.view_class, AsyncListCustomerLoanView)
+
+    def test_loan_quote(self):
+        url = reverse('loan-quote')
+        self.assertEqual(resolve(url).func.view_class, LoanQuoteView)
+
+    def test_repayment_ledger(self):
+        url = reverse('loan-payments', kwargs={'pk': 1})
+        self.assertEqual(resolve(url).func.view_class, LoanPaymentView)
+        url = reverse('reverse-payment', kwargs={'pk': 1})
+        self.assertEqual(resolve(url).func.view_class, ReversePaymentView)
+        url = reverse('loan-balance', kwargs={'pk': 1})
+        self.assertEqual(resolve(url).func.view_class, LoanBalanceView)
+        url = reverse('overdue-loans')
+        self.assertEqual(resolve(url).func.view_class, ListOverdueLoanView)
+
+    def test_bulk_approve_reject_loan(self):
+        url = reverse('bulk-approve-reject-loan')
+        self.assertEqual(resolve(url).func.view_class, BulkApproveOrRejectLoanView)
@@ -1,20 +1,54 @@
+import csv
+import json
+from unittest import mock
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from .test_setup import AgentRequestLoanTestSetUp, ApproveOrRejectLoanTestSetup, EditLoanTestSetUp, \
-    ListLoanAdminAgentTestSetUp, ListLoansCustomerTestSetUp
+    ListLoanAdminAgentTestSetUp, ListLoansCustomerTestSetUp, LoanScheduleTestSetUp, AgentBulkRequestLoanTestSetUp, \
+    PortfolioSummaryTestSetUp, ExportLoanTestSetUp, CustomerLoanCacheTestSetUp, LoanQuoteTestSetUp, \
+    RepaymentLedgerTestSetUp, BulkApproveOrRejectLoanTestSetUp
+from rest_framework.renderers import JSONRenderer
 from rest_framework_jwt.settings import api_settings
 
+from backend.query_budget import QueryBudgetExceeded
+from loan.ledger import post_payment
+from loan.models import Loan, LoanSummary, Payment
+from loan.money import MAX_LOAN_MONTHS, to_paise
+from loan.quote import MAX_QUOTE_CELLS
+from loan.serializers import ListLoanSerializer, list_loan_projection
+from loan.summary import rebuild_summary
+from loan.terms import loan_terms
+from loan.transitions import bulk_decide, decide
+from loan.views import ListAdminAgentLoanView
 from user.models import User
 
 jwt_payload_handler = api_settings.JWT_PAYLOAD_HANDLER
 jwt_encode_handler = api_settings.JWT_ENCODE_HANDLER
 
 
+@async_to_sync
+async def async_get(client, url, **extra):
+    return await client.get(url, **extra)
+
+
 class AgentRequestLoanTestViews(AgentRequestLoanTestSetUp):
     # If no data is sent
     def test_no_data_passed(self):
         response = self.client.post(self.request_url)
         self.assertEqual(response.status_code, 400)
 
+    # Tenures longer than the longest loan are refused before any EMI is computed
+    def test_too_many_months(self):
+        for months in (MAX_LOAN_MONTHS + 1, 100000):
+            response = self.client.post(self.request_url, {**self.data, 'months': months}, format="json")
+            self.assertEqual(response.status_code, 400)
+        self.assertFalse(Loan.objects.exists())
+
     # If user is an agent and is approved
     def test_agent_approved_request(self):
         users = User.objects.all()
@@ -34,6 +68,51 @@ class AgentRequestLoanTestViews(AgentRequestLoanTestSetUp):
         self.assertEqual(response.status_code, 401)
 
 
+class AgentBulkRequestLoanTestViews(AgentBulkRequestLoanTestSetUp):
+    # If no data is sent
+    def test_no_data_passed(self):
+        response = self.client.post(self.request_url)
+        self.assertEqual(response.status_code, 400)
+
+    # Valid rows are created with history, invalid rows are reported
+    def test_agent_bulk_request(self):
+        response = self.client.post(self.request_url, self.data, format="json")
+        self.assertEqual(response.status_code, 200)
+        results = response.data['results']
+        self.assertEqual([result['success'] for result in results], [True, True, False, False])
+        loan = Loan.objects.get(pk=results[1]['id'])
+        self.assertEqual(loan.user, self.other_customer)
+        self.assertEqual(loan.granted_by, self.agent)
+        self.assertEqual(loan.status, "NEW")
+        self.assertEqual(Loan.objects.count(), 2)
+        self.assertEqual(Loan.history.filter(history_type="+").count(), 2)
+        self.assertEqual(Loan.history.get(id=results[0]['id']).principal, 1000000.00)
+
+    # Customer emails are resolved and the portfolio summary is updated once whatever the batch size
+    def test_agent_bulk_request_queries(self):
+        loans = [{"user": self.customer.email, "principal": 50000.00, "months": 12}] * 50
+        # SQLite takes 49 historical loans per INSERT, so they need two
+        with self.assertNumQueries(12):
+            response = self.client.post(self.request_url, {"loans": loans}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Loan.objects.filter(user=self.customer).count(), 50)
+
+    # Rows asking for more months than a loan may run are refused
+    def test_too_many_months(self):
+        loans = [{"user": self.customer.email, "principal": 50000.00, "months": 12},
+                 {"user": self.customer.email, "principal": 50000.00, "months": 100000}]
+        response = self.client.post(self.request_url, {"loans": loans}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['success'] for result in response.data['results']], [True, False])
+        self.assertEqual(Loan.objects.count(), 1)
+
+    # If user is not authenticated
+    def test_not_authenticated(self):
+        self.client.force_authenticate(user=None, token=None)
+        response = self.client.post(self.request_url, self.data, format="json")
+        self.assertEqual(response.status_code, 401)
+
+
 class ApproveOrRejectLoanTestViews(ApproveOrRejectLoanTestSetup):
 
     # If no data is sent
@@ -57,6 +136,28 @@ class ApproveOrRejectLoanTestViews(ApproveOrRejectLoanTestSetup):
         response = self.client.put(self.request_url, {'status': "REJECTED"}, format="json")
         self.assertEqual(response.status_code, 200)
 
+    # A loan can only be decided once, the second decision is a conflict
+    def test_admin_decides_twice(self):
+        payload = jwt_payload_handler(self.admin)
+        token = jwt_encode_handler(payload)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.client.put(self.request_url, {'status': "APPROVED"}, format="json")
+        response = self.client.put(self.request_url, {'status': "REJECTED"}, format="json")
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Loan.objects.get(pk=self.loan.pk).status, "APPROVED")
+        latest = Loan.history.filter(id=self.loan.pk).latest()
+        self.assertEqual((latest.history_type, latest.status, latest.history_user), ("~", "APPROVED", self.admin))
+        self.assertEqual(LoanSummary.objects.get(status="APPROVED").count, 1)
+        self.assertEqual(LoanSummary.objects.get(status="NEW").count, 0)
+
+    # Only approving and rejecting are allowed
+    def test_admin_invalid_decision(self):
+        payload = jwt_payload_handler(self.admin)
+        token = jwt_encode_handler(payload)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        response = self.client.put(self.request_url, {'status': "NEW"}, format="json")
+        self.assertEqual(response.status_code, 400)
+
     # Authenticated request by non admin role - Will not work
     def test_agent_approve_loan_by_admin(self):
         payload = jwt_payload_handler(self.customer)
@@ -72,6 +173,68 @@ class ApproveOrRejectLoanTestViews(ApproveOrRejectLoanTestSetup):
         self.assertEqual(response.status_code, 401)
 
 
+class BulkApproveOrRejectLoanTestViews(BulkApproveOrRejectLoanTestSetUp):
+
+    def authenticate(self, user):
+        payload = jwt_payload_handler(user)
+        token = jwt_encode_handler(payload)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def summary_rows(self):
+        return sorted(LoanSummary.objects.filter(count__gt=0).values_list('status', 'granted_by', 'interest', 'count',
+                                                                          'principal_paise'))
+
+    # Every id gets an outcome, in the order sent, and duplicates are decided once
+    def test_bulk_approve(self):
+        self.authenticate(self.admin)
+        ids = [self.loans[0].pk, self.loans[2].pk, 0, self.loans[1].pk, self.loans[0].pk]
+        response = self.client.put(self.url, {"ids": ids, "status": "APPROVED"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(row['id'], row['success'], row['message']) for row in response.data['results']], [
+            (self.loans[0].pk, True, f"Loan id {self.loans[0].pk} has been approved"),
+            (self.loans[2].pk, False, f"Loan id {self.loans[2].pk} is already APPROVED"),
+            (0, False, "Loan id 0 does not exist"),
+            (self.loans[1].pk, True, f"Loan id {self.loans[1].pk} has been approved"),
+        ])
+        self.assertEqual(list(Loan.objects.order_by('pk').values_list('status', flat=True)),
+                         ["APPROVED", "APPROVED", "APPROVED", "NEW"])
+
+    # History rows and the portfolio summary match what one by one decisions give
+    def test_history_and_summary(self):
+        self.authenticate(self.admin)
+        self.client.put(self.url, {"ids": [loan.pk for loan in self.loans], "status": "REJECTED"}, format="json")
+        history = Loan.history.filter(history_type='~').order_by('id')
+        self.assertEqual([(row.id, row.status, row.history_user_id) for row in history],
+                         [(loan.pk, "REJECTED", self.admin.pk) for loan in self.loans if loan.status == "NEW"])
+        incremental = self.summary_rows()
+        rebuild_summary()
+        self.assertEqual(incremental, self.summary_rows())
+
+    # The queries per batch do not depend on how many loans it holds
+    def test_set_based(self):
+        with CaptureQueriesContext(connection) as few:
+            bulk_decide([self.loans[0].pk], "APPROVED")
+        pks = [Loan.objects.create(user=self.customer, granted_by=self.agent, **loan_terms(50000.00, 12)).pk
+               for _ in range(40)]
+        with CaptureQueriesContext(connection) as many:
+            decided, _ = bulk_decide(pks, "APPROVED")
+        self.assertEqual(len(decided), 40)
+        self.assertEqual(len(many), len(few))
+
+    # Ids and status are required, and only admins can decide
+    def test_invalid_request(self):
+        self.authenticate(self.admin)
+        for data in [{"ids": [], "status": "APPROVED"}, {"ids": [self.loans[0].pk], "status": "NEW"},
+                     {"status": "APPROVED"}]:
+            response = self.client.put(self.url, data, format="json")
+            self.assertEqual(response.status_code, 400)
+        for user in (self.agent, self.customer):
+            self.authenticate(user)
+            response = self.client.put(self.url, {"ids": [self.loans[0].pk], "status": "APPROVED"}, format="json")
+            self.assertEqual(response.status_code, 403)
+        self.assertEqual(Loan.objects.get(pk=self.loans[0].pk).status, "NEW")
+
+
 class EditLoanTestViews(EditLoanTestSetUp):
     # If no data is sent
     def test_no_data_passed(self):
@@ -85,6 +248,12 @@ class EditLoanTestViews(EditLoanTestSetUp):
                                    format="json")
         self.assertEqual(response.status_code, 403)
 
+    # Tenures longer than the longest loan are refused
+    def test_too_many_months(self):
+        response = self.client.put(reverse('edit-loan', kwargs={'pk': self.loan1.pk}),
+                                   {**self.edit_data, 'months': 100000}, format="json")
+        self.assertEqual(response.status_code, 400)
+
     # Authenticated request by an agent who is approved
     def test_agent_success_edit_loan(self):
         response = self.client.put(reverse('edit-loan', kwargs={'pk': self.loan1.pk}), self.edit_data, format="json")
@@ -93,7 +262,36 @@ class EditLoanTestViews(EditLoanTestSetUp):
     # Authenticated request by an agent on an already approved loan
     def test_agent_fail_edit_loan_already_approved(self):
         response = self.client.put(reverse('edit-loan', kwargs={'pk': self.loan2.pk}), self.edit_data, format="json")
-        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.status_code, 409)
+
+    # Edits only write the new terms and record a history entry by the agent
+    def test_agent_edit_history(self):
+        self.client.put(reverse('edit-loan', kwargs={'pk': self.loan1.pk}), self.edit_data, format="json")
+        loan = Loan.objects.get(pk=self.loan1.pk)
+        self.assertEqual(loan.principal, 200000.00)
+        self.assertEqual(loan.interest, 8.45)
+        latest = Loan.history.filter(id=self.loan1.pk).latest()
+        self.assertEqual((latest.history_type, latest.principal, latest.history_user), ("~", 200000.00, self.agent))
+
+    # An approval landing between the read and the write of an edit is reported as a conflict
+    def test_agent_edit_races_approval(self):
+        get = Loan.objects.get
+
+        def get_then_approve(*args, **kwargs):
+            loan = get(*args, **kwargs)
+            Loan.objects.filter(pk=loan.pk).update(status="APPROVED")
+            return loan
+
+        with mock.patch.object(Loan.objects, 'get', get_then_approve):
+            response = self.client.put(reverse('edit-loan', kwargs={'pk': self.loan1.pk}), self.edit_data,
+                                       format="json")
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Loan.objects.get(pk=self.loan1.pk).principal, 1000000.00)
+
+    # Missing loan
+    def test_agent_edit_missing_loan(self):
+        response = self.client.put(reverse('edit-loan', kwargs={'pk': 0}), self.edit_data, format="json")
+        self.assertEqual(response.status_code, 404)
 
     # If user is not authenticated
     def test_not_authenticated(self):
@@ -102,6 +300,101 @@ class EditLoanTestViews(EditLoanTestSetUp):
         self.assertEqual(response.status_code, 401)
 
 
+class ListLoansAdminAgentTestViews(ListLoanAdminAgentTestSetUp):
+
+    def authenticate(self, user):
+        payload = jwt_payload_handler(user)
+        token = jwt_encode_handler(payload)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    # Walking the cursors returns every loan once, most recently modified first
+    def test_pages(self):
+        self.authenticate(self.admin)
+        ids = []
+        url = f"{self.url}?page_size=2"
+        while url is not None:
+            response = self.client.get(url, format="json")
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data['results']), 2)
+            ids += [loan['id'] for loan in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(ids, [loan.pk for loan in reversed(self.loans)])
+
+    # Status filter is kept across pages
+    def test_pages_with_status(self):
+        self.authenticate(self.agent)
+        response = self.client.get(self.url, {'status': 'NEW', 'page_size': 2}, format="json")
+        self.assertEqual([loan['id'] for loan in response.data['results']], [self.loans[4].pk, self.loans[2].pk])
+        response = self.client.get(response.data['next'], format="json")
+        self.assertEqual([loan['id'] for loan in response.data['results']], [self.loans[0].pk])
+        self.assertIsNone(response.data['next'])
+
+    # Page size is capped
+    def test_page_size_cap(self):
+        self.authenticate(self.admin)
+        response = self.client.get(self.url, {'page_size': 100000}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 5)
+
+    # Related users are joined and roles come from the token, so listing is a single query
+    def test_fixed_queries(self):
+        self.authenticate(self.admin)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, format="json")
+        self.assertEqual(response.data['results'][0]['email'], self.customer.email)
+        self.assertEqual(response.data['results'][0]['granted_by'], self.agent.email)
+
+    # Going over the declared query budget fails in tests
+    def test_query_budget_exceeded(self):
+        self.authenticate(self.admin)
+        with mock.patch.object(ListAdminAgentLoanView, 'query_budget', 0):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(self.url, format="json")
+
+    # The async list walks the same pages with the same cursors in a single query per page
+    def test_async_pages(self):
+        self.authenticate(self.admin)
+        token = self.client._credentials['HTTP_AUTHORIZATION']
+        params = {'status': 'NEW', 'page_size': 2}
+        while True:
+            response = self.client.get(self.url, params, format="json").json()
+            with self.assertNumQueries(1):
+                # The async client of Django 3.2 does not encode query parameters itself
+                url = f"{reverse('async-list-loans-admin-agent')}?{urlencode(params)}"
+                async_response = async_get(self.async_client, url, authorization=token).json()
+            self.assertEqual(async_response['results'], response['results'])
+            if response['next'] is None:
+                self.assertIsNone(async_response['next'])
+                break
+            self.assertEqual(async_response['next'].split('?')[1], response['next'].split('?')[1])
+            params['cursor'] = parse_qs(urlsplit(response['next']).query)['cursor'][0]
+
+    # Tampered cursor
+    def test_invalid_cursor(self):
+        self.authenticate(self.admin)
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'}, format="json")
+        self.assertEqual(response.status_code, 404)
+
+    # Customers cannot list every loan
+    def test_customer_authenticated(self):
+        self.authenticate(self.customer)
+        response = self.client.get(self.url, format="json")
+        self.assertEqual(response.status_code, 403)
+
+    # The projection renders the same bytes as ListLoanSerializer, in any timezone
+    def test_projection_matches_serializer(self):
+        Loan.objects.create(user=self.customer, principal=20000.00, status="NEW")
+        loans = Loan.objects.select_related('user', 'granted_by').order_by('-modified_date', '-id')
+        for zone in ('Asia/Kolkata', 'UTC'):
+            with timezone.override(zone):
+                self.assertEqual(JSONRenderer().render(list_loan_projection.data(list_loan_projection.queryset(loans))),
+                                 JSONRenderer().render(ListLoanSerializer(loans, many=True).data))
+        self.authenticate(self.admin)
+        response = self.client.get(self.url, format="json")
+        self.assertNotIn('granted_by', response.data['results'][0])
+        self.assertIsNone(response.data['results'][0]['end_date'])
+
+
 class ListLoansCustomerTestViews(ListLoansCustomerTestSetUp):
 
     # Authenticated request by customer
@@ -117,3 +410,391 @@ class ListLoansCustomerTestViews(ListLoansCustomerTestSetUp):
         self.client.force_authenticate(user=None, token=None)
         response = self.client.get(self.url, format="json")
         self.assertEqual(response.status_code, 401)
+
+
+class CustomerLoanCacheTestViews(CustomerLoanCacheTestSetUp):
+
+    def ids(self, params=None):
+        return [loan['id'] for loan in self.client.get(self.url, params or {}, format="json").data['results']]
+
+    # Repeated polls are answered from the cache
+    def test_cached_response(self):
+        response = self.client.get(self.url, format="json")
+        with self.assertNumQueries(0):
+            cached = self.client.get(self.url, format="json")
+        self.assertEqual(cached.data, response.data)
+
+    # Each status filter has its own entry
+    def test_status_filter(self):
+        self.assertEqual(self.ids({'status': 'NEW'}), [self.loans[0].pk])
+        self.assertEqual(self.ids({'status': 'APPROVED'}), [self.loans[1].pk])
+        self.assertEqual(self.ids(), [self.loans[1].pk, self.loans[0].pk])
+
+    # Saving or deleting a loan of the customer drops the cached lists
+    def test_invalidated_by_loan_changes(self):
+        self.assertEqual(self.ids({'status': 'NEW'}), [self.loans[0].pk])
+        self.loans[0].status = "REJECTED"
+        self.loans[0].save()
+        self.assertEqual(self.ids({'status': 'NEW'}), [])
+        loan = Loan.objects.create(user=self.customer, principal=50000.00, status="NEW")
+        self.assertEqual(self.ids({'status': 'NEW'}), [loan.pk])
+        loan.delete()
+        self.assertEqual(self.ids({'status': 'NEW'}), [])
+
+    # Approvals through the conditional update path drop the cached lists too
+    def test_invalidated_by_transition(self):
+        loan = Loan.objects.create(user=self.customer, principal=50000.00, status="NEW")
+        self.assertEqual(self.ids({'status': 'APPROVED'}), [self.loans[1].pk])
+        decide(loan.pk, "APPROVED")
+        self.assertEqual(self.ids({'status': 'APPROVED'}), [loan.pk, self.loans[1].pk])
+
+    # Other customers keep their cached lists
+    def test_other_customer_untouched(self):
+        other = User.objects.create_user(email="other@gmail.com", password="django1234", is_customer=True,
+                                         is_agent=False)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {jwt_encode_handler(jwt_payload_handler(other))}")
+        self.client.get(self.url, format="json")
+        Loan.objects.create(user=self.customer, principal=50000.00, status="NEW")
+        with self.assertNumQueries(0):
+            self.client.get(self.url, format="json")
+
+
+class LoanScheduleTestViews(LoanScheduleTestSetUp):
+
+    # Authenticated request by the customer who owns the loan
+    def test_customer_own_loan(self):
+        payload = jwt_payload_handler(self.customer)
+        token = jwt_encode_handler(payload)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        response = self.client.get(self.url, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['schedule']), 60)
+        self.assertEqual(response.data['schedule'][-1]['balance'], 0)
+        self.assertAlmostEqual(response.data['emi'], self.loan.emi, places=2)
+
+    # Authenticated request by an agent
+    def test_agent_authenticated(self):
+        payload = jwt_payload_handler(self.agent)
+        token = jwt_encode_handler(payload)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        response = self.client.get(self.url, format="json")
+        self.assertEqual(response.status_code, 200)
+
+    # Customers cannot see the schedule of another customer's loan
+    def test_customer_other_loan(self):
+        payload = jwt_payload_handler(self.other_customer)
+        token = jwt_encode_handler(payload)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        response = self.client.get(self.url, format="json")
+        self.assertEqual(response.status_code, 404)
+
+    # Unauthenticated request
+    def test_not_authenticated(self):
+        self.client.force_authenticate(user=None, token=None)
+        response = self.client.get(self.url, format="json")
+        self.assertEqual(response.status_code, 401)
+
+
+class PortfolioSummaryTestViews(PortfolioSummaryTestSetUp):
+
+    def authenticate(self, user):
+        payload = jwt_payload_handler(user)
+        token = jwt_encode_handler(payload)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def summary_rows(self):
+        return sorted(LoanSummary.objects.filter(count__gt=0).values_list('status', 'granted_by', 'interest', 'count'))
+
+    # Totals are grouped by status, agent and interest tier from a single summary query
+    def test_summary(self):
+        self.authenticate(self.admin)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total']['count'], 3)
+        self.assertAlmostEqual(response.data['total']['principal'], 2050000.00)
+        # Summed exactly in paise
+        self.assertEqual(response.data['total']['amount'], sum(to_paise(loan.amount) for loan in self.loans) / 100)
+        self.assertEqual([(row['status'], row['count']) for row in response.data['by_status']],
+                         [("APPROVED", 1), ("NEW", 2)])
+        self.assertEqual([(row['agent'], row['count']) for row in response.data['by_agent']], [(self.agent.email, 3)])
+        self.assertEqual([(row['interest'], row['count']) for row in response.data['by_interest']],
+                         [(8.45, 1), (10, 2)])
+
+    # Status changes, edits and deletes move loans between summary rows
+    def test_incremental_updates(self):
+        loan = Loan.objects.get(pk=self.loans[0].pk)
+        loan.status = "REJECTED"
+        loan.save()
+        loan = Loan.objects.get(pk=self.loans[2].pk)
+        loan.principal = 20000.00
+        loan.save()
+        Loan.objects.get(pk=self.loans[1].pk).delete()
+        incremental = self.summary_rows()
+        rebuild_summary()
+        self.assertEqual(incremental, self.summary_rows())
+        self.authenticate(self.agent)
+        response = self.client.get(self.url, format="json")
+        self.assertEqual(response.data['total']['count'], 2)
+        self.assertAlmostEqual(response.data['total']['principal'], 1020000.00)
+
+    # Customers cannot see the portfolio
+    def test_customer_authenticated(self):
+        self.authenticate(self.customer)
+        response = self.client.get(self.url, format="json")
+        self.assertEqual(response.status_code, 403)
+
+    # Unauthenticated request
+    def test_not_authenticated(self):
+        self.client.force_authenticate(user=None, token=None)
+        response = self.client.get(self.url, format="json")
+        self.assertEqual(response.status_code, 401)
+
+
+class LoanQuoteTestViews(LoanQuoteTestSetUp):
+
+    def authenticate(self, user):
+        payload = jwt_payload_handler(user)
+        token = jwt_encode_handler(payload)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    # Every principal is quoted over every tenure on the terms a loan request would get
+    def test_grid(self):
+        self.authenticate(self.agent)
+        with self.assertNumQueries(0):
+            response = self.client.post(self.url, self.data, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([quote['principal'] for quote in response.data['quotes']], self.data['principals'])
+        for quote in response.data['quotes']:
+            self.assertEqual([option['months'] for option in quote['options']], self.data['months'])
+            for option in quote['options']:
+                terms = loan_terms(quote['principal'], option['months'])
+                self.assertEqual((quote['interest'], option['emi'], option['amount']),
+                                 (terms['interest'], terms['emi'], terms['amount']))
+
+    # Invalid principals, tenures and oversized grids
+    def test_invalid_request(self):
+        self.authenticate(self.admin)
+        for data in [{"principals": [5000.00], "months": [12]}, {"principals": [50000.00], "months": [0]},
+                     {"principals": [], "months": [12]}, {"principals": [50000.00]},
+                     {"principals": [50000.00] * 2, "months": list(range(1, MAX_QUOTE_CELLS // 2 + 2))}]:
+            response = self.client.post(self.url, data, format="json")
+            self.assertEqual(response.status_code, 400)
+            self.assertFalse(response.data['success'])
+
+    # Customers cannot request quotes
+    def test_customer_authenticated(self):
+        self.authenticate(self.customer)
+        response = self.client.post(self.url, self.data, format="json")
+        self.assertEqual(response.status_code, 403)
+
+    # Unauthenticated request
+    def test_not_authenticated(self):
+        self.client.force_authenticate(user=None, token=None)
+        response = self.client.post(self.url, self.data, format="json")
+        self.assertEqual(response.status_code, 401)
+
+
+class RepaymentLedgerTestViews(RepaymentLedgerTestSetUp):
+
+    def authenticate(self, user):
+        payload = jwt_payload_handler(user)
+        token = jwt_encode_handler(payload)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    # Agents post payments and get the new balance back
+    def test_post_payment(self):
+        self.authenticate(self.agent)
+        response = self.client.post(self.payments_url, {"amount": self.overdue.emi}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['balance']['paid'], self.overdue.emi)
+        self.assertEqual(response.data['balance']['outstanding'],
+                         (self.overdue.amount_paise - self.overdue.emi_paise) / 100)
+        self.assertEqual(Payment.objects.get(pk=response.data['payment']).posted_by, self.agent)
+
+    # Invalid amounts, payments over the balance, unapproved and missing loans
+    def test_invalid_payment(self):
+        self.authenticate(self.agent)
+        for url, data, status_code in [(self.payments_url, {"amount": 0}, 400),
+                                       (self.payments_url, {"amount": self.overdue.amount + 1}, 400),
+                                       (reverse('loan-payments', kwargs={'pk': self.new.pk}), {"amount": 100}, 400),
+                                       (reverse('loan-payments', kwargs={'pk': 0}), {"amount": 100}, 404)]:
+            response = self.client.post(url, data, format="json")
+            self.assertEqual(response.status_code, status_code)
+        self.assertFalse(Payment.objects.exists())
+
+    # A payment can be reversed once
+    def test_reverse_payment(self):
+        _, payment = post_payment(self.overdue.pk, self.overdue.emi_paise)
+        self.authenticate(self.admin)
+        url = reverse('reverse-payment', kwargs={'pk': payment.pk})
+        response = self.client.post(url, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['balance']['paid'], 0)
+        response = self.client.post(url, format="json")
+        self.assertEqual(response.status_code, 400)
+
+    # Customers see the balance of their own loans only, from a single query
+    def test_balance(self):
+        post_payment(self.overdue.pk, self.overdue.emi_paise)
+        self.authenticate(self.customer)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.balance_url, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['paid'], response.data['overdue']), (self.overdue.emi, True))
+        response = self.client.get(reverse('loan-balance', kwargs={'pk': self.current.pk}), format="json")
+        self.assertEqual(response.status_code, 404)
+
+    # Approved loans with an installment past due, earliest first
+    def test_overdue_loans(self):
+        self.authenticate(self.agent)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.overdue_url, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.data['results']], [self.overdue.pk])
+        post_payment(self.overdue.pk, self.overdue.emi_paise * 3)
+        response = self.client.get(self.overdue_url, format="json")
+        self.assertEqual(response.data['results'], [])
+
+    # Customers can neither post payments nor list overdue loans
+    def test_customer_authenticated(self):
+        self.authenticate(self.customer)
+        response = self.client.post(self.payments_url, {"amount": 100}, format="json")
+        self.assertEqual(response.status_code, 403)
+        response = self.client.get(self.overdue_url, format="json")
+        self.assertEqual(response.status_code, 403)
+
+    # Unauthenticated request
+    def test_not_authenticated(self):
+        self.client.force_authenticate(user=None, token=None)
+        response = self.client.get(self.balance_url, format="json")
+        self.assertEqual(response.status_code, 401)
+
+
+class ExportLoanTestViews(ExportLoanTestSetUp):
+
+    def authenticate(self, user):
+        payload = jwt_payload_handler(user)
+        token = jwt_encode_handler(payload)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def export(self, params, **extra):
+        response = self.client.get(self.url, params, **extra)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    # NDJSON rows match the loans of the list endpoint
+    def test_ndjson(self):
+        self.authenticate(self.admin)
+        rows = [json.loads(line) for line in self.export({'type': 'ndjson'}).splitlines()]
+        listed = self.client.get(reverse('list-loans-admin-agent'), format="json").json()['results']
+        self.assertEqual(rows, sorted(listed, key=lambda loan: loan['id']))
+
+    # CSV has a header and one line per loan
+    def test_csv(self):
+        self.authenticate(self.agent)
+        rows = list(csv.DictReader(self.export({}).splitlines()))
+        self.assertEqual([int(row['id']) for row in rows], [loan.pk for loan in self.loans])
+        self.assertEqual(rows[0]['email'], self.customer.email)
+        self.assertEqual(rows[0]['granted_by'], self.agent.email)
+
+    # The export type can be negotiated through the Accept header
+    def test_accept(self):
+        self.authenticate(self.admin)
+        rows = list(csv.DictReader(self.export({}, HTTP_ACCEPT='text/csv').splitlines()))
+        self.assertEqual(len(rows), 3)
+        rows = [json.loads(line) for line in self.export({}, HTTP_ACCEPT='application/x-ndjson').splitlines()]
+        self.assertEqual(len(rows), 3)
+        response = self.client.get(self.url, {'start_date_from': 'yesterday'}, HTTP_ACCEPT='application/x-ndjson')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(json.loads(response.content)['success'])
+        response = self.client.get(self.url, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    # CSV cells that spreadsheets would run as formulas are escaped
+    def test_csv_formulas(self):
+        self.customer.first_name = '=HYPERLINK("http://example.com")'
+        self.customer.last_name = '-1+1'
+        self.customer.save()
+        self.authenticate(self.admin)
+        row = next(csv.DictReader(self.export({}).splitlines()))
+        self.assertEqual(row['first_name'], '\'=HYPERLINK("http://example.com")')
+        self.assertEqual(row['last_name'], "'-1+1")
+        self.assertEqual(row['principal'], '1000000.0')
+
+    # Status and date range filters
+    def test_filters(self):
+        self.authenticate(self.admin)
+        rows = list(csv.DictReader(self.export({'status': 'NEW', 'start_date_from': '2021-01-11'}).splitlines()))
+        self.assertEqual([int(row['id']) for row in rows], [self.loans[2].pk])
+        rows = list(csv.DictReader(self.export({'start_date_to': '2021-02-10'}).splitlines()))
+        self.assertEqual([int(row['id']) for row in rows], [self.loans[0].pk, self.loans[1].pk])
+        rows = list(csv.DictReader(self.export({'modified_date_from': '2000-01-01T00:00:00'}).splitlines()))
+        self.assertEqual(len(rows), 3)
+
+    # Bad dates and export types are rejected
+    def test_invalid_parameters(self):
+        self.authenticate(self.admin)
+        response = self.client.get(self.url, {'start_date_from': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(self.url, {'type': 'xml'})
+        self.assertEqual(response.status_code, 400)
+
+    # Customers cannot export the loan book
+    def test_customer_authenticated(self):
+        self.authenticate(self.customer)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 403)
+
+    # Unauthenticated request
+    def test_not_authenticated(self):
+        self.client.force_authenticate(user=None, token=None)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 401)
+
+
+class LoanAsOfTestViews(LoanScheduleTestSetUp):
+
+    def authenticate(self, user):
+        payload = jwt_payload_handler(user)
+        token = jwt_encode_handler(payload)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    # The version of the loan current at the given time
+    def test_agent_authenticated(self):
+        created = Loan.history.get(id=self.loan.pk).history_date
+        self.loan.status = "APPROVED"
+        self.loan.save()
+        self.authenticate(self.agent)
+        url = reverse('loan-as-of', kwargs={'pk': self.loan.pk})
+        response = self.client.get(url, {'at': created.isoformat()}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['loan']['status'], "NEW")
+        self.assertEqual(response.data['history_type'], "+")
+        response = self.client.get(url, {'at': timezone.now().isoformat()}, format="json")
+        self.assertEqual(response.data['loan']['status'], "APPROVED")
+
+    # Before the loan was created
+    def test_before_creation(self):
+        self.authenticate(self.agent)
+        url = reverse('loan-as-of', kwargs={'pk': self.loan.pk})
+        response = self.client.get(url, {'at': '2000-01-01T00:00:00'}, format="json")
+        self.assertEqual(response.status_code, 404)
+
+    # Missing or invalid time
+    def test_invalid_time(self):
+        self.authenticate(self.agent)
+        url = reverse('loan-as-of', kwargs={'pk': self.loan.pk})
+        for at in ['yesterday', '2021-02-30T00:00:00', '2021-01-01T25:00:00']:
+            response = self.client.get(url, {'at': at}, format="json")
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.data['message'], 'at must be an ISO datetime')
+        response = self.client.get(url, format="json")
+        self.assertEqual(response.status_code, 400)
+
+    # Customers cannot read loan history
+    def test_customer_authenticated(self):
+        self.authenticate(self.customer)
+        url = reverse('loan-as-of', kwargs={'pk': self.loan.pk})
+        response = self.client.get(url, {'at': timezone.now().isoformat()}, format="json")
+        self.assertEqual(response.status_code, 403)
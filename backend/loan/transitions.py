@@ -0,0 +1,97 @@
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import invalidate_customer_lists
+from .models import Loan
+from .summary import apply_summary_changes
+
+DECIDABLE = ('NEW',)
+EDITABLE = ('NEW', 'REJECTED')
+DECISIONS = ('APPROVED', 'REJECTED')
+DECISION_BATCH_SIZE = 500
+MAX_BULK_DECISIONS = 5000
+
+
+class TransitionConflict(Exception):
+    def __init__(self, status):
+        self.status = status
+        super().__init__(f'Loan is {status}')
+
+
+def transition(pk, allowed_from, changes, history_user=None):
+    """
+    Writes changes to a loan with a single conditional UPDATE.
+
+    The UPDATE only matches while the loan is still in the status and at the modified_date it was
+    read with, so a concurrent approval, rejection or edit makes it miss instead of being
+    overwritten. Only the changed columns, and the paise and balance columns derived from them, are
+    written, and the historical record, portfolio summary and cached loan lists of the customer are
+    updated from the values in memory.
+
+    The loan is read before the UPDATE, not only when it misses: the portfolio summary takes out
+    what the loan counted for before the change, the historical record is the whole row, and the
+    balance of an edit depends on what was paid, none of which an UPDATE can return.
+
+    Raises Loan.DoesNotExist, or TransitionConflict when the loan is not in one of the
+    allowed_from statuses or moved since it was read.
+    """
+    with transaction.atomic():
+        loan = Loan.objects.get(pk=pk)
+        if loan.status not in allowed_from:
+            raise TransitionConflict(loan.status)
+        previous, read_status, read_modified_date = loan.summary_state(), loan.status, loan.modified_date
+        changes = {**changes, 'modified_date': timezone.now()}
+        for field, value in changes.items():
+            setattr(loan, field, value)
+        loan.sync_minor_units()
+        loan.sync_balance()
+        changes.update({field: getattr(loan, field) for field in Loan.derived_fields(changes)})
+        if not Loan.objects.filter(pk=pk, status=read_status, modified_date=read_modified_date).update(**changes):
+            raise TransitionConflict(Loan.objects.filter(pk=pk).values_list('status', flat=True).first())
+        loan._loaded_summary_state = loan.summary_state()
+        Loan.history.bulk_history_create([loan], update=True, default_user=history_user)
+        apply_summary_changes(removed=[previous], added=[loan._loaded_summary_state])
+    invalidate_customer_lists(loan.user_id)
+    return loan
+
+
+def decide(pk, decision, history_user=None):
+    return transition(pk, DECIDABLE, {'status': decision}, history_user=history_user)
+
+
+def bulk_decide(pks, decision, history_user=None, batch_size=DECISION_BATCH_SIZE):
+    """
+    Approves or rejects many loans in one transaction, with one locking SELECT and one UPDATE per
+    batch of ids, and their historical records and portfolio summary changes written in bulk.
+
+    Returns the decided loans and the status of every loan that could not be decided. Ids that
+    are in neither do not exist.
+    """
+    decided, conflicts, previous = [], {}, []
+    with transaction.atomic():
+        for start in range(0, len(pks), batch_size):
+            pending = []
+            for loan in Loan.objects.select_for_update().filter(pk__in=pks[start:start + batch_size]):
+                if loan.status in DECIDABLE:
+                    pending.append(loan)
+                else:
+                    conflicts[loan.pk] = loan.status
+            if not pending:
+                continue
+            now = timezone.now()
+            # The rows are locked, so none of them can have left the decidable statuses since
+            Loan.objects.filter(pk__in=[loan.pk for loan in pending], status__in=DECIDABLE).update(
+                status=decision, modified_date=now)
+            for loan in pending:
+                previous.append(loan.summary_state())
+                loan.status, loan.modified_date = decision, now
+                loan._loaded_summary_state = loan.summary_state()
+            Loan.history.bulk_history_create(pending, update=True, default_user=history_user)
+            decided.extend(pending)
+        apply_summary_changes(removed=previous, added=[loan._loaded_summary_state for loan in decided])
+    invalidate_customer_lists(*[loan.user_id for loan in decided])
+    return decided, conflicts
+
+
+def edit(pk, terms, history_user=None):
+    return transition(pk, EDITABLE, {**terms, 'status': "NEW"}, history_user=history_user)
@@ -1,12 +1,29 @@
 from django.urls import path
-from .views import AgentRequestLoanView, ApproveOrRejectLoanView, EditLoanView, ListAdminAgentLoanView, \
-                   ListCustomerLoanView
+from .views import AgentRequestLoanView, AgentBulkRequestLoanView, ApproveOrRejectLoanView, EditLoanView, \
+                   ListAdminAgentLoanView, ListCustomerLoanView, LoanScheduleView, \
+                   PortfolioSummaryView, ExportLoanView, LoanAsOfView, \
+                   AsyncListAdminAgentLoanView, AsyncListCustomerLoanView, LoanQuoteView, \
+                   LoanPaymentView, ReversePaymentView, LoanBalanceView, ListOverdueLoanView, \
+                   BulkApproveOrRejectLoanView
 
 urlpatterns = [
     path('customer-loan/', AgentRequestLoanView.as_view(), name='customer-loan'),
+    path('bulk-customer-loan/', AgentBulkRequestLoanView.as_view(), name='bulk-customer-loan'),
+    path('loan-quote/', LoanQuoteView.as_view(), name='loan-quote'),
     path('approve-reject-loan/<int:pk>/', ApproveOrRejectLoanView.as_view(), name='approve-reject-loan'),
+    path('bulk-approve-reject-loan/', BulkApproveOrRejectLoanView.as_view(), name='bulk-approve-reject-loan'),
     path('edit-loan/<int:pk>/', EditLoanView.as_view(), name='edit-loan'),
     path('list-loans-admin-agent/', ListAdminAgentLoanView.as_view(), name='list-loans-admin-agent'),
     path('list-loans-customer/', ListCustomerLoanView.as_view(), name='list-loans-customer'),
+    path('async/list-loans-admin-agent/', AsyncListAdminAgentLoanView.as_view(), name='async-list-loans-admin-agent'),
+    path('async/list-loans-customer/', AsyncListCustomerLoanView.as_view(), name='async-list-loans-customer'),
+    path('loan/<int:pk>/schedule/', LoanScheduleView.as_view(), name='loan-schedule'),
+    path('loan/<int:pk>/as-of/', LoanAsOfView.as_view(), name='loan-as-of'),
+    path('loan/<int:pk>/payments/', LoanPaymentView.as_view(), name='loan-payments'),
+    path('loan/<int:pk>/balance/', LoanBalanceView.as_view(), name='loan-balance'),
+    path('payment/<int:pk>/reverse/', ReversePaymentView.as_view(), name='reverse-payment'),
+    path('overdue-loans/', ListOverdueLoanView.as_view(), name='overdue-loans'),
+    path('portfolio-summary/', PortfolioSummaryView.as_view(), name='portfolio-summary'),
+    path('export-loans/', ExportLoanView.as_view(), name='export-loans'),
 
 ]
@@ -1,6 +1,5 @@
-import datetime
-
-from django.http import Http404
+from django.http import Http404, StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
 from django.utils import timezone
 
 from rest_framework import status
@@ -8,28 +7,35 @@ from rest_framework import generics
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
-from rest_framework_jwt.authentication import JSONWebTokenAuthentication
 from rest_framework_jwt.settings import api_settings
 
+from backend.async_views import AsyncAPIViewMixin
+from backend.query_budget import QueryBudgetMixin
+from backend.timing import TimedJSONRenderer
+from user.authentication import CachedJSONWebTokenAuthentication, RoleClaimsJSONWebTokenAuthentication
 from user.permissions import IsAdmin, IsAgent, IsCustomer, IsAdminOrAgent
 from user.models import User
 
-from .models import Loan
-from .serializers import AgentRequestSerializer, ApproveOrRejectLoanSerializer, EditLoanSerializer, ListLoanSerializer
+from .amortization import amortize, schedule_rows
+from .archive import loan_as_of
+from .bulk import MAX_BULK_APPLICATIONS, bulk_create_loans
+from .cache import get_customer_list, set_customer_list
+from .export import CSVRenderer, NDJSONRenderer, export_rows, parse_bound, stream_csv, stream_ndjson
+from .ledger import PaymentConflict, PaymentRejected, loan_balance, post_payment, reverse_payment
+from .models import Loan, LoanSummary, Payment
+from .money import to_paise, to_rupees
+from .pagination import DueLoanKeysetPagination, LoanKeysetPagination
+from .quote import quote_grid
+from .serializers import AgentRequestSerializer, ApproveOrRejectLoanSerializer, BulkApproveOrRejectLoanSerializer, \
+    BulkLoanApplicationSerializer, EditLoanSerializer, ListLoanSerializer, LoanQuoteSerializer, OverdueLoanSerializer, \
+    PaymentSerializer, list_loan_projection
+from .terms import loan_terms
+from .transitions import TransitionConflict, bulk_decide, decide, edit
 
 jwt_payload_handler = api_settings.JWT_PAYLOAD_HANDLER
 jwt_encode_handler = api_settings.JWT_ENCODE_HANDLER
 
 
-def calculate_interest(principal):
-    if 10000 <= principal < 1000000:
-        return 8.45
-    elif 1000000 <= principal < 2500000:
-        return 10
-    else:
-        return 12
-
-
 def calculate_emi(principal, months, rate):
     rate_per_month = float(rate) / 1200
     numerator = float((1 + rate_per_month) ** months)
@@ -39,23 +45,16 @@ def calculate_emi(principal, months, rate):
 
 class AgentRequestLoanView(APIView):
     permission_classes = (IsAuthenticated, IsAgent,)
-    authentication_classes = (JSONWebTokenAuthentication,)
+    authentication_classes = (CachedJSONWebTokenAuthentication,)
 
     def post(self, request):
         try:
-            data = dict()
-            granted_by = User.objects.get(email=request.user)
+            granted_by = request.user
             user = User.objects.get(email=request.data['user'])
+            data = loan_terms(request.data['principal'], request.data['months'])
             data['user'] = user.pk
             data['granted_by'] = granted_by.pk
-            data['principal'] = request.data['principal']
-            data['interest'] = calculate_interest(request.data['principal'])
-            data['months'] = request.data['months']
-            data['emi'] = calculate_emi(request.data['principal'], request.data['months'], data['interest'])
-            data['amount'] = data['emi'] * request.data['months']
             data['status'] = "NEW"
-            data['start_date'] = timezone.localtime()
-            data['end_date'] = timezone.localtime() + datetime.timedelta(hours=request.data['months'] * 730)
             serializer = AgentRequestSerializer(data=data)
             serializer.is_valid(raise_exception=True)
             serializer.save()
@@ -72,26 +71,92 @@ class AgentRequestLoanView(APIView):
             return Response(response, status=status.HTTP_400_BAD_REQUEST)
 
 
+class AgentBulkRequestLoanView(APIView):
+    permission_classes = (IsAuthenticated, IsAgent,)
+    authentication_classes = (CachedJSONWebTokenAuthentication,)
+
+    def post(self, request):
+        applications = request.data.get('loans') if isinstance(request.data, dict) else None
+        if not isinstance(applications, list) or not applications:
+            response = {
+                'success': False,
+                'message': 'A non empty list of loans is required'
+            }
+            return Response(response, status=status.HTTP_400_BAD_REQUEST)
+        if len(applications) > MAX_BULK_APPLICATIONS:
+            response = {
+                'success': False,
+                'message': f'Cannot request more than {MAX_BULK_APPLICATIONS} loans at once'
+            }
+            return Response(response, status=status.HTTP_400_BAD_REQUEST)
+
+        results = [None] * len(applications)
+        valid = []
+        for index, application in enumerate(applications):
+            serializer = BulkLoanApplicationSerializer(data=application)
+            if serializer.is_valid():
+                valid.append((index, serializer.validated_data))
+            else:
+                results[index] = {'index': index, 'success': False, 'message': serializer.errors}
+
+        emails = {data['user'] for _, data in valid}
+        customers = {user.email: user for user in User.objects.filter(email__in=emails)}
+        loans = []
+        indexes = []
+        for index, data in valid:
+            customer = customers.get(data['user'])
+            if customer is None:
+                results[index] = {'index': index, 'success': False, 'message': 'User does not exist'}
+                continue
+            loans.append(Loan(user=customer, granted_by=request.user, status="NEW",
+                              **loan_terms(data['principal'], data['months'])))
+            indexes.append(index)
+
+        for index, loan in zip(indexes, bulk_create_loans(loans, history_user=request.user)):
+            results[index] = {'index': index, 'success': True, 'id': loan.pk}
+        response = {
+            'success': True,
+            'message': f'{len(loans)} of {len(applications)} loan requests have been submitted',
+            'results': results
+        }
+        return Response(response, status=status.HTTP_200_OK)
+
+
+class LoanQuoteView(QueryBudgetMixin, APIView):
+    permission_classes = (IsAuthenticated, IsAdminOrAgent,)
+    authentication_classes = (RoleClaimsJSONWebTokenAuthentication,)
+    # Only a rate card cache that could not be warmed on startup reads the database
+    query_budget = 1
+
+    def post(self, request):
+        serializer = LoanQuoteSerializer(data=request.data)
+        if not serializer.is_valid():
+            response = {
+                'success': False,
+                'message': serializer.errors
+            }
+            return Response(response, status=status.HTTP_400_BAD_REQUEST)
+        response = {
+            'success': True,
+            'message': 'Quote generated',
+            'quotes': quote_grid(serializer.validated_data['principals'], serializer.validated_data['months'])
+        }
+        return Response(response, status=status.HTTP_200_OK)
+
+
 class ApproveOrRejectLoanView(APIView):
     permission_classes = (IsAuthenticated, IsAdmin,)
-    authentication_classes = (JSONWebTokenAuthentication,)
-
-    def get_object(self, pk):
-        try:
-            return Loan.objects.get(pk=pk)
-        except User.DoesNotExist:
-            return Http404
+    authentication_classes = (CachedJSONWebTokenAuthentication,)
 
     def put(self, request, pk):
         try:
-            message = ""
-            instance = self.get_object(pk)
-            serializer = ApproveOrRejectLoanSerializer(instance, data=request.data)
+            serializer = ApproveOrRejectLoanSerializer(data=request.data)
             if serializer.is_valid():
-                serializer.save()
-                if request.data['status'] == "APPROVED":
+                decision = serializer.validated_data['status']
+                decide(pk, decision, history_user=request.user)
+                if decision == "APPROVED":
                     message = f"Loan id {pk} has been approved"
-                elif request.data['status'] == "REJECTED":
+                else:
                     message = f"Loan id {pk} has been rejected"
                 response = {
                     "success": True,
@@ -103,6 +168,14 @@ class ApproveOrRejectLoanView(APIView):
                 "message": "Could Not Approve or Reject Loan"
             }
             return Response(response, status=status.HTTP_400_BAD_REQUEST)
+        except Loan.DoesNotExist:
+            raise Http404
+        except TransitionConflict as e:
+            response = {
+                "success": False,
+                "message": f"Loan id {pk} is already {e.status}"
+            }
+            return Response(response, status=status.HTTP_409_CONFLICT)
         except Exception as e:
             response = {
                 "success": False,
@@ -111,37 +184,51 @@ class ApproveOrRejectLoanView(APIView):
             return Response(response, status=status.HTTP_400_BAD_REQUEST)
 
 
+class BulkApproveOrRejectLoanView(APIView):
+    permission_classes = (IsAuthenticated, IsAdmin,)
+    authentication_classes = (CachedJSONWebTokenAuthentication,)
+
+    def put(self, request):
+        serializer = BulkApproveOrRejectLoanSerializer(data=request.data)
+        if not serializer.is_valid():
+            response = {
+                'success': False,
+                'message': serializer.errors
+            }
+            return Response(response, status=status.HTTP_400_BAD_REQUEST)
+        pks = list(dict.fromkeys(serializer.validated_data['ids']))
+        decision = serializer.validated_data['status']
+        outcome = 'approved' if decision == "APPROVED" else 'rejected'
+        decided, conflicts = bulk_decide(pks, decision, history_user=request.user)
+        decided = {loan.pk for loan in decided}
+        results = []
+        for pk in pks:
+            if pk in decided:
+                message = f"Loan id {pk} has been {outcome}"
+            elif pk in conflicts:
+                message = f"Loan id {pk} is already {conflicts[pk]}"
+            else:
+                message = f"Loan id {pk} does not exist"
+            results.append({'id': pk, 'success': pk in decided, 'message': message})
+        response = {
+            'success': True,
+            'message': f"{len(decided)} of {len(pks)} loans have been {outcome}",
+            'results': results
+        }
+        return Response(response, status=status.HTTP_200_OK)
+
+
 class EditLoanView(APIView):
     permission_classes = (IsAuthenticated, IsAgent,)
-    authentication_classes = (JSONWebTokenAuthentication,)
-
-    def get_object(self, pk):
-        try:
-            return Loan.objects.get(pk=pk)
-        except User.DoesNotExist:
-            return Http404
+    authentication_classes = (CachedJSONWebTokenAuthentication,)
 
     def put(self, request, pk):
         try:
-            instance = self.get_object(pk)
-            if instance.status == "APPROVED":
-                response = {
-                    'success': False,
-                    'message': 'Cannot Edit Approved Loan'
-                }
-                return Response(response, status=status.HTTP_400_BAD_REQUEST)
-            data = dict()
-            data['principal'] = request.data['principal']
-            data['interest'] = calculate_interest(request.data['principal'])
-            data['months'] = request.data['months']
-            data['emi'] = calculate_emi(request.data['principal'], request.data['months'], data['interest'])
-            data['amount'] = data['emi'] * request.data['months']
+            data = loan_terms(request.data['principal'], request.data['months'])
             data['status'] = "NEW"
-            data['start_date'] = timezone.localtime()
-            data['end_date'] = timezone.localtime() + datetime.timedelta(hours=request.data['months'] * 730)
-            serializer = EditLoanSerializer(instance, data=data)
+            serializer = EditLoanSerializer(data=data)
             if serializer.is_valid():
-                serializer.save()
+                edit(pk, serializer.validated_data, history_user=request.user)
                 response = {
                     "success": True,
                     "message": "Edited Loan Detail Successfully"
@@ -152,6 +239,18 @@ class EditLoanView(APIView):
                 "message": "Could Not Edit Loan"
             }
             return Response(response, status=status.HTTP_400_BAD_REQUEST)
+        except Loan.DoesNotExist:
+            raise Http404
+        except TransitionConflict as e:
+            if e.status == "APPROVED":
+                message = 'Cannot Edit Approved Loan'
+            else:
+                message = f"Loan id {pk} is {e.status}, it changed while being edited"
+            response = {
+                'success': False,
+                'message': message
+            }
+            return Response(response, status=status.HTTP_409_CONFLICT)
         except Exception as e:
             response = {
                 "success": False,
@@ -160,37 +259,309 @@ class EditLoanView(APIView):
             return Response(response, status=status.HTTP_400_BAD_REQUEST)
 
 
-class ListAdminAgentLoanView(generics.ListAPIView):
+class ListAdminAgentLoanView(QueryBudgetMixin, generics.ListAPIView):
     permission_classes = (IsAuthenticated, IsAdminOrAgent,)
-    authentication_classes = (JSONWebTokenAuthentication,)
+    authentication_classes = (RoleClaimsJSONWebTokenAuthentication,)
     serializer_class = ListLoanSerializer
+    pagination_class = LoanKeysetPagination
+    query_budget = 2
 
     def get_queryset(self):
         status = self.request.query_params.get('status')
-        qs = Loan.objects.all()
+        qs = Loan.objects.select_related('user', 'granted_by')
         if status is not None:
             qs = qs.filter(status=status)
         return qs
 
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.serializer_class(queryset, many=True)
-        return Response(serializer.data)
+        # Serialized from a projection of the columns, answering exactly like ListLoanSerializer
+        page = self.paginate_queryset(list_loan_projection.queryset(self.get_queryset()))
+        return self.get_paginated_response(list_loan_projection.data(page))
 
 
-class ListCustomerLoanView(generics.ListAPIView):
+class ListCustomerLoanView(QueryBudgetMixin, generics.ListAPIView):
     permission_classes = (IsAuthenticated, IsCustomer,)
-    authentication_classes = (JSONWebTokenAuthentication,)
+    authentication_classes = (RoleClaimsJSONWebTokenAuthentication,)
     serializer_class = ListLoanSerializer
+    pagination_class = LoanKeysetPagination
+    query_budget = 2
 
     def get_queryset(self):
         status = self.request.query_params.get('status')
-        qs = Loan.objects.filter(user=self.request.user)
+        qs = Loan.objects.select_related('user', 'granted_by').filter(user_id=self.request.user.pk)
         if status is not None:
             qs = qs.filter(status=status)
         return qs
 
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.serializer_class(queryset, many=True)
-        return Response(serializer.data)
+        # Keyed on the whole URL, so the status filter, cursor and page size each get their own entry
+        key, data = get_customer_list(request.user.pk, request.build_absolute_uri())
+        if data is None:
+            page = self.paginate_queryset(list_loan_projection.queryset(self.get_queryset()))
+            data = self.get_paginated_response(list_loan_projection.data(page)).data
+            set_customer_list(key, data)
+        return Response(data)
+
+
+class AsyncListAdminAgentLoanView(AsyncAPIViewMixin, ListAdminAgentLoanView):
+    pass
+
+
+class AsyncListCustomerLoanView(AsyncAPIViewMixin, ListCustomerLoanView):
+    pass
+
+
+class LoanScheduleView(APIView):
+    permission_classes = (IsAuthenticated,)
+    authentication_classes = (RoleClaimsJSONWebTokenAuthentication,)
+
+    def get_object(self, pk):
+        qs = Loan.objects.all()
+        if not (self.request.user.is_admin or self.request.user.is_agent):
+            qs = qs.filter(user_id=self.request.user.pk)
+        try:
+            return qs.get(pk=pk)
+        except Loan.DoesNotExist:
+            raise Http404
+
+    def get(self, request, pk):
+        instance = self.get_object(pk)
+        if instance.months <= 0:
+            response = {
+                'success': False,
+                'message': 'Loan has no tenure to schedule'
+            }
+            return Response(response, status=status.HTTP_400_BAD_REQUEST)
+        schedule = amortize(instance.principal, instance.months, instance.interest)
+        response = {
+            'success': True,
+            'message': 'Schedule fetched',
+            'id': instance.pk,
+            'emi': round(float(schedule.emi[0]), 2),
+            'schedule': schedule_rows(schedule)
+        }
+        return Response(response, status=status.HTTP_200_OK)
+
+
+class PortfolioSummaryView(QueryBudgetMixin, APIView):
+    permission_classes = (IsAuthenticated, IsAdminOrAgent,)
+    authentication_classes = (RoleClaimsJSONWebTokenAuthentication,)
+    query_budget = 1
+
+    @staticmethod
+    def add_to(groups, key, row):
+        # Money is summed in paise, exactly
+        group = groups.setdefault(key, {'count': 0, 'principal': 0, 'amount': 0, 'emi': 0})
+        group['count'] += row['count']
+        for field in ('principal', 'amount', 'emi'):
+            group[field] += row[f'{field}_paise']
+        return group
+
+    def get(self, request):
+        rows = LoanSummary.objects.filter(count__gt=0).values('status', 'granted_by__email', 'interest', 'count',
+                                                                'principal_paise', 'amount_paise', 'emi_paise')
+        total, by_status, by_agent, by_interest = {}, {}, {}, {}
+        for row in rows:
+            self.add_to(total, None, row)
+            self.add_to(by_status, row['status'], row)
+            self.add_to(by_agent, row['granted_by__email'], row)
+            self.add_to(by_interest, row['interest'], row)
+
+        def rounded(group):
+            return {field: value if field == 'count' else to_rupees(value) for field, value in group.items()}
+
+        response = {
+            'success': True,
+            'message': 'Summary fetched',
+            'total': rounded(total.get(None, {'count': 0, 'principal': 0, 'amount': 0, 'emi': 0})),
+            'by_status': [{'status': key, **rounded(group)} for key, group in sorted(by_status.items())],
+            'by_agent': [{'agent': key, **rounded(group)}
+                         for key, group in sorted(by_agent.items(), key=lambda item: item[0] or '')],
+            'by_interest': [{'interest': key, **rounded(group)} for key, group in sorted(by_interest.items())]
+        }
+        return Response(response, status=status.HTTP_200_OK)
+
+
+class ExportLoanView(APIView):
+    permission_classes = (IsAuthenticated, IsAdminOrAgent,)
+    authentication_classes = (RoleClaimsJSONWebTokenAuthentication,)
+    # CSV comes first, so it stays the export type of clients that do not ask for one
+    renderer_classes = (CSVRenderer, NDJSONRenderer, TimedJSONRenderer)
+    export_types = {
+        'csv': (stream_csv, 'text/csv'),
+        'ndjson': (stream_ndjson, 'application/x-ndjson'),
+    }
+    range_fields = ('start_date', 'modified_date')
+
+    def get_queryset(self):
+        params = self.request.query_params
+        qs = Loan.objects.order_by('id')
+        if params.get('status') is not None:
+            qs = qs.filter(status=params['status'])
+        for field in self.range_fields:
+            for suffix, end in (('from', False), ('to', True)):
+                value = params.get(f'{field}_{suffix}')
+                if value is not None:
+                    lookup, moment = parse_bound(value, end=end)
+                    qs = qs.filter(**{f'{field}__{lookup}': moment})
+        return qs
+
+    def get(self, request):
+        # The type query parameter wins over the Accept header and the format query parameter
+        export_type = request.query_params.get('type', request.accepted_renderer.format)
+        if export_type not in self.export_types:
+            response = {
+                'success': False,
+                'message': f"Export type must be one of {', '.join(self.export_types)}"
+            }
+            return Response(response, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            queryset = self.get_queryset()
+        except ValueError as e:
+            response = {
+                'success': False,
+                'message': str(e)
+            }
+            return Response(response, status=status.HTTP_400_BAD_REQUEST)
+        stream, content_type = self.export_types[export_type]
+        response = StreamingHttpResponse(stream(export_rows(queryset)), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="loans.{export_type}"'
+        return response
+
+
+class LoanAsOfView(APIView):
+    permission_classes = (IsAuthenticated, IsAdminOrAgent,)
+    authentication_classes = (RoleClaimsJSONWebTokenAuthentication,)
+
+    def get(self, request, pk):
+        try:
+            moment = parse_datetime(request.query_params.get('at', ''))
+        except ValueError:
+            # Well formed but not a real date or time, like February 30
+            moment = None
+        if moment is None:
+            response = {
+                'success': False,
+                'message': 'at must be an ISO datetime'
+            }
+            return Response(response, status=status.HTTP_400_BAD_REQUEST)
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        version = loan_as_of(pk, moment)
+        if version is None or version['history_type'] == '-':
+            response = {
+                'success': False,
+                'message': 'Loan did not exist at that time'
+            }
+            return Response(response, status=status.HTTP_404_NOT_FOUND)
+        history_date, history_type = version.pop('history_date'), version.pop('history_type')
+        response = {
+            'success': True,
+            'message': 'Loan fetched',
+            'history_date': history_date,
+            'history_type': history_type,
+            'loan': version
+        }
+        return Response(response, status=status.HTTP_200_OK)
+
+
+class LoanPaymentView(APIView):
+    permission_classes = (IsAuthenticated, IsAdminOrAgent,)
+    authentication_classes = (CachedJSONWebTokenAuthentication,)
+
+    def post(self, request, pk):
+        serializer = PaymentSerializer(data=request.data)
+        if not serializer.is_valid():
+            response = {
+                'success': False,
+                'message': serializer.errors
+            }
+            return Response(response, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            loan, payment = post_payment(pk, to_paise(serializer.validated_data['amount']),
+                                         paid_at=serializer.validated_data.get('paid_at'), posted_by=request.user)
+        except Loan.DoesNotExist:
+            raise Http404
+        except PaymentRejected as e:
+            response = {
+                'success': False,
+                'message': str(e)
+            }
+            return Response(response, status=status.HTTP_400_BAD_REQUEST)
+        except PaymentConflict as e:
+            response = {
+                'success': False,
+                'message': str(e)
+            }
+            return Response(response, status=status.HTTP_409_CONFLICT)
+        response = {
+            'success': True,
+            'message': f'Payment of {to_rupees(payment.amount_paise)} posted to loan id {pk}',
+            'payment': payment.pk,
+            'balance': loan_balance(loan)
+        }
+        return Response(response, status=status.HTTP_200_OK)
+
+
+class ReversePaymentView(APIView):
+    permission_classes = (IsAuthenticated, IsAdminOrAgent,)
+    authentication_classes = (CachedJSONWebTokenAuthentication,)
+
+    def post(self, request, pk):
+        try:
+            loan, reversal = reverse_payment(pk, posted_by=request.user)
+        except Payment.DoesNotExist:
+            raise Http404
+        except PaymentRejected as e:
+            response = {
+                'success': False,
+                'message': str(e)
+            }
+            return Response(response, status=status.HTTP_400_BAD_REQUEST)
+        except PaymentConflict as e:
+            response = {
+                'success': False,
+                'message': str(e)
+            }
+            return Response(response, status=status.HTTP_409_CONFLICT)
+        response = {
+            'success': True,
+            'message': f'Payment id {pk} reversed',
+            'payment': reversal.pk,
+            'balance': loan_balance(loan)
+        }
+        return Response(response, status=status.HTTP_200_OK)
+
+
+class LoanBalanceView(QueryBudgetMixin, APIView):
+    permission_classes = (IsAuthenticated,)
+    authentication_classes = (RoleClaimsJSONWebTokenAuthentication,)
+    query_budget = 1
+
+    def get(self, request, pk):
+        qs = Loan.objects.only('status', 'amount_paise', 'paid_paise', 'outstanding_paise', 'next_due_date')
+        if not (request.user.is_admin or request.user.is_agent):
+            qs = qs.filter(user_id=request.user.pk)
+        try:
+            instance = qs.get(pk=pk)
+        except Loan.DoesNotExist:
+            raise Http404
+        response = {
+            'success': True,
+            'message': 'Balance fetched',
+            **loan_balance(instance)
+        }
+        return Response(response, status=status.HTTP_200_OK)
+
+
+class ListOverdueLoanView(QueryBudgetMixin, generics.ListAPIView):
+    permission_classes = (IsAuthenticated, IsAdminOrAgent,)
+    authentication_classes = (RoleClaimsJSONWebTokenAuthentication,)
+    serializer_class = OverdueLoanSerializer
+    pagination_class = DueLoanKeysetPagination
+    query_budget = 1
+
+    def get_queryset(self):
+        # Matches the condition of loan_due_idx, so the list is a range scan of that index
+        return Loan.objects.select_related('user', 'granted_by').filter(
+            status="APPROVED", outstanding_paise__gt=0, next_due_date__lt=timezone.now())
@@ -0,0 +1,150 @@
+import jwt
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import ugettext as _
+from rest_framework import exceptions
+from rest_framework_jwt.authentication import JSONWebTokenAuthentication
+from rest_framework_jwt.settings import api_settings
+
+from backend.timing import timed
+
+from .cache import user_cache
+from .models import User
+from .utils import ROLE_CLAIMS
+
+jwt_decode_handler = api_settings.JWT_DECODE_HANDLER
+jwt_get_username_from_payload = api_settings.JWT_PAYLOAD_GET_USERNAME_HANDLER
+
+# Stands for "every token of this user is revoked", used once the user is deleted
+REVOKED_ROLE_VERSION = 2 ** 31
+
+
+def role_version_key(user_id, email):
+    # Keyed on the email too, as a new user can be given the id of a deleted one
+    return f'user:role-version:{user_id}:{email}'
+
+
+def publish_role_version(user, role_version):
+    # Tokens live at most JWT_EXPIRATION_DELTA, so older versions need not be remembered longer
+    timeout = api_settings.JWT_EXPIRATION_DELTA.total_seconds()
+    cache.set(role_version_key(user.pk, user.email), role_version, timeout=timeout)
+
+
+class RoleClaimsUser:
+    """
+    User built from the role claims of a token, for permission checks and read only views.
+
+    It is not a model instance: filter on `user_id=request.user.pk` rather than on the user itself.
+    """
+    is_authenticated = True
+    is_anonymous = False
+    is_active = True
+
+    def __init__(self, payload):
+        self.pk = self.id = payload['user_id']
+        self.email = payload['email']
+        self.role_version = payload['role_version']
+        for claim in ROLE_CLAIMS:
+            setattr(self, claim, payload[claim])
+
+    def __str__(self):
+        return self.email
+
+
+class CachedJSONWebTokenAuthentication(JSONWebTokenAuthentication):
+    def authenticate(self, request):
+        with timed('auth'):
+            return super().authenticate(request)
+
+    def authenticate_credentials(self, payload):
+        username = self.get_username(payload)
+        try:
+            user = user_cache.get(username, User.objects.get_by_natural_key)
+        except User.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid signature.'))
+        return self.check_user(user)
+
+    async def aauthenticate(self, request):
+        """
+        Async counterpart of authenticate, used by the async views.
+        """
+        with timed('auth'):
+            jwt_value = self.get_jwt_value(request)
+            if jwt_value is None:
+                return None
+            try:
+                payload = jwt_decode_handler(jwt_value)
+            except jwt.ExpiredSignature:
+                raise exceptions.AuthenticationFailed(_('Signature has expired.'))
+            except jwt.DecodeError:
+                raise exceptions.AuthenticationFailed(_('Error decoding signature.'))
+            except jwt.InvalidTokenError:
+                raise exceptions.AuthenticationFailed()
+            return await self.aauthenticate_credentials(payload), jwt_value
+
+    async def aauthenticate_credentials(self, payload):
+        username = self.get_username(payload)
+        try:
+            user = await user_cache.aget(username, User.objects.get_by_natural_key)
+        except User.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid signature.'))
+        return self.check_user(user)
+
+    def get_username(self, payload):
+        username = jwt_get_username_from_payload(payload)
+        if not username:
+            raise exceptions.AuthenticationFailed(_('Invalid payload.'))
+        return username
+
+    def check_user(self, user):
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User account is disabled.'))
+        return user
+
+
+class RoleClaimsJSONWebTokenAuthentication(CachedJSONWebTokenAuthentication):
+    """
+    Authenticates from the role claims of the token without reading the user table.
+
+    A token is refused once the role version published for its user is newer than the one it
+    carries, or, when the cache has no version for the user, the one in the database. Tokens
+    issued before role claims existed fall back to the cached user lookup.
+    """
+
+    def authenticate_credentials(self, payload):
+        if not settings.JWT_ROLE_CLAIMS or 'role_version' not in payload:
+            return super().authenticate_credentials(payload)
+        return self.claims_user(payload, self.get_role_version(payload))
+
+    async def aauthenticate_credentials(self, payload):
+        if not settings.JWT_ROLE_CLAIMS or 'role_version' not in payload:
+            return await super().aauthenticate_credentials(payload)
+        # The cache and the database both block, so they share one hop to a worker thread
+        role_version = await sync_to_async(self.get_role_version)(payload)
+        return self.claims_user(payload, role_version)
+
+    def get_role_version(self, payload):
+        role_version = cache.get(role_version_key(payload['user_id'], payload['email']))
+        if role_version is None:
+            role_version = self.load_role_version(payload)
+        return role_version
+
+    def load_role_version(self, payload):
+        """
+        Role version of the user of a token when the cache lost it, read from the database and
+        published again. A user that no longer exists has all of its tokens revoked.
+        """
+        role_version = User.objects.filter(pk=payload['user_id'], email=payload['email']) \
+            .values_list('role_version', flat=True).first()
+        if role_version is None:
+            role_version = REVOKED_ROLE_VERSION
+        # Added rather than set, so a newer version published by a save in the meantime is kept
+        cache.add(role_version_key(payload['user_id'], payload['email']), role_version,
+                  timeout=api_settings.JWT_EXPIRATION_DELTA.total_seconds())
+        return role_version
+
+    def claims_user(self, payload, role_version):
+        if payload['role_version'] < role_version:
+            raise exceptions.AuthenticationFailed(_('Token has been revoked.'))
+        return RoleClaimsUser(payload)
@@ -0,0 +1,111 @@
+import copy
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+def stamp_key(user_id):
+    return f'user:cache-stamp:{user_id}'
+
+
+class UserCache:
+    """
+    Per process LRU cache of users keyed by email, with entries expiring after ttl seconds.
+
+    Callers get a copy of the cached user, so a request changing its user never leaks into another
+    request. Entries are dropped on every save or delete of a user (see user.signals). Other
+    processes learn of it through a stamp of the user in the shared Django cache, changed on every
+    invalidation and compared on every lookup, so they reload the user instead of serving the
+    entry they hold.
+    """
+
+    def __init__(self, max_size=1024, ttl=60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, email, loader):
+        user, generation = self._lookup(email)
+        if user is None:
+            user = loader(email)
+            user = self._store(email, user, generation, self._stamp(user.pk))
+        return copy.copy(user)
+
+    async def aget(self, email, loader):
+        """
+        Same as get for async views, run on a worker thread as both the stamp lookup in the shared
+        cache and the loader block.
+        """
+        return await sync_to_async(self.get)(email, loader)
+
+    def _stamp(self, user_id):
+        return cache.get(stamp_key(user_id))
+
+    def _publish(self, user_id):
+        # Entries loaded before the stamp changed expire within ttl, so it need not outlive them
+        cache.set(stamp_key(user_id), uuid.uuid4().hex, timeout=self.ttl)
+
+    def _lookup(self, email):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(email)
+            generation = self._generation
+        if entry is not None and entry[0] > now and self._stamp(entry[1].pk) == entry[2]:
+            with self._lock:
+                if email in self._entries:
+                    self._entries.move_to_end(email)
+                self.hits += 1
+            return entry[1], None
+        with self._lock:
+            self.misses += 1
+        return None, generation
+
+    def _store(self, email, user, generation, stamp):
+        with self._lock:
+            # Do not store a user loaded before an invalidation that happened while loading
+            if generation == self._generation:
+                self._entries[email] = (time.monotonic() + self.ttl, user, stamp)
+                self._entries.move_to_end(email)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return user
+
+    def invalidate(self, user):
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(user.email, None)
+            for email, (_, cached, _) in list(self._entries.items()):
+                if cached.pk == user.pk:
+                    del self._entries[email]
+        self._publish(user.pk)
+        if transaction.get_connection().in_atomic_block:
+            # Again once committed, as other processes may reload the user before the change is visible
+            transaction.on_commit(lambda: self._publish(user.pk))
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl
+            }
+
+
+user_cache = UserCache(max_size=settings.USER_CACHE['MAX_SIZE'], ttl=settings.USER_CACHE['TTL'])
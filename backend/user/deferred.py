@@ -0,0 +1,30 @@
+import threading
+
+from django.utils import timezone
+
+from .cache import user_cache
+from .models import User
+
+_pending = {}
+_lock = threading.Lock()
+
+
+def defer_last_login(user):
+    with _lock:
+        _pending[user.pk] = user
+
+
+def flush_last_logins():
+    """
+    Writes the last login of every user that logged in since the previous flush in one UPDATE.
+
+    Called once a response has been sent (request_finished), so logins never wait on this write.
+    """
+    with _lock:
+        if not _pending:
+            return
+        users = list(_pending.values())
+        _pending.clear()
+    User.objects.filter(pk__in=[user.pk for user in users]).update(last_login=timezone.now())
+    for user in users:
+        user_cache.invalidate(user)
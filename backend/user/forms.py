@@ -35,4 +35,13 @@ class UserChangeForm(forms.ModelForm):
         fields = ['email', 'password', 'first_name', 'last_name', 'is_customer', 'is_agent', 'is_admin']
 
     def clean_password(self):
-        return self.initial["password"]
\ No newline at end of file
+        return self.initial["password"]
+
+    def save(self, commit=True):
+        user = super().save(commit=False)
+        # Role changes revoke the tokens carrying the previous roles
+        if set(self.changed_data) & {'is_admin', 'is_agent', 'is_customer', 'is_approved', 'is_active'}:
+            user.role_version += 1
+        if commit:
+            user.save()
+        return user
\ No newline at end of file
@@ -0,0 +1,45 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, identify_hasher, make_password
+
+from .models import User
+
+
+class HasherBusy(Exception):
+    pass
+
+
+_executor = ThreadPoolExecutor(max_workers=settings.LOGIN_HASHER['WORKERS'], thread_name_prefix='password-hasher')
+_slots = threading.BoundedSemaphore(settings.LOGIN_HASHER['WORKERS'] + settings.LOGIN_HASHER['QUEUE'])
+
+
+def run_hasher(function, *args):
+    """
+    Runs a password hashing function on the bounded hasher pool and waits for its result.
+
+    The hashers release the GIL, so the pool spreads them over the cores while capping how many
+    run at once. Raises HasherBusy instead of queueing when the pool and its queue are full.
+    """
+    if not _slots.acquire(timeout=settings.LOGIN_HASHER['TIMEOUT']):
+        raise HasherBusy('Password hasher pool is saturated')
+    try:
+        return _executor.submit(function, *args).result()
+    finally:
+        _slots.release()
+
+
+def check_credentials(email, password):
+    try:
+        user = User.objects.get_by_natural_key(email)
+    except User.DoesNotExist:
+        # Hash anyway so unknown emails take as long as wrong passwords
+        run_hasher(make_password, password)
+        return None
+    if not run_hasher(check_password, password, user.password) or not user.is_active:
+        return None
+    if identify_hasher(user.password).must_update(user.password):
+        user.password = run_hasher(make_password, password)
+        user.save(update_fields=['password'])
+    return user
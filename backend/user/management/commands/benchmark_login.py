@@ -0,0 +1,72 @@
+import json
+from contextlib import nullcontext
+from unittest import mock
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+from django.utils.module_loading import import_string
+
+from backend.benchmark import benchmark_database, measure
+from user import hashing
+from user.models import User
+
+PASSWORD = 'benchmark-password'
+
+
+def run_inline(function, *args):
+    return function(*args)
+
+
+class Command(BaseCommand):
+    help = ('Measures login throughput and latency through the login view, against a temporary test database, '
+            'for every configured password hasher')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=200, help='Logins sent per hasher')
+        parser.add_argument('--concurrency', type=int, default=16, help='Concurrent login requests')
+        parser.add_argument('--inline', action='store_true',
+                            help='Verify on the request threads instead of the hasher pool, for comparison')
+        parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+
+    def handle(self, *args, **options):
+        concurrency = options['concurrency']
+        if connection.vendor == 'sqlite':
+            # Last logins are written after every response, and writers on a shared SQLite database fail
+            # with "table is locked" instead of waiting
+            concurrency = 1
+        results = []
+        with benchmark_database():
+            for index, path in enumerate(settings.PASSWORD_HASHERS):
+                algorithm = path.rsplit('.', 1)[-1]
+                try:
+                    hasher = import_string(path)()
+                    encoded = hasher.encode(PASSWORD, hasher.salt())
+                except ValueError as e:
+                    self.stderr.write(f'Skipping {algorithm}: {e}')
+                    continue
+                user = User.objects.create(email=f'login{index}@benchmark.local', password=encoded)
+                result = {'hasher': algorithm, 'mode': 'inline' if options['inline'] else 'pool',
+                          'concurrency': concurrency}
+                result.update(self.run(user.email, options['logins'], concurrency, options['inline']))
+                results.append(result)
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(f"{'hasher':<32}{'mode':<8}{'logins/sec':>12}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+        for result in results:
+            self.stdout.write(f"{result['hasher']:<32}{result['mode']:<8}{result['throughput']:>12}"
+                              f"{result['p50_ms']:>10}{result['p99_ms']:>10}{result['errors']:>8}")
+
+    def run(self, email, logins, concurrency, inline):
+        url = reverse('login')
+
+        def login(_):
+            response = Client().post(url, {'email': email, 'password': PASSWORD}, content_type='application/json')
+            return response.status_code == 200
+
+        with mock.patch.object(hashing, 'run_hasher', run_inline) if inline else nullcontext():
+            return measure(login, logins, concurrency)
@@ -0,0 +1,25 @@
+# Generated by Django 3.2.5 on 2026-10-18 17:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(('is_customer', True)), fields=['id'], name='user_customer_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(('is_agent', True)), fields=['id'], name='user_agent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(('is_agent', True), ('is_approved', False)), fields=['id'], name='user_pending_agent_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+from django.db import migrations
+
+# Index name -> column searched by prefix
+SEARCH_INDEXES = {
+    'user_email_search_idx': 'email',
+    'user_first_name_search_idx': 'first_name',
+    'user_last_name_search_idx': 'last_name',
+}
+# The case insensitive, byte ordered search keys of user.search.search_key
+SEARCH_KEYS = {
+    'postgresql': 'UPPER({column}) COLLATE "C"',
+    'sqlite': '{column} COLLATE NOCASE',
+}
+
+
+def create_search_indexes(apps, schema_editor):
+    quote = schema_editor.quote_name
+    vendor = schema_editor.connection.vendor
+    table = quote(apps.get_model('user', 'User')._meta.db_table)
+    # Built without blocking writes on PostgreSQL, hence the non atomic migration
+    create = 'CREATE INDEX CONCURRENTLY' if vendor == 'postgresql' else 'CREATE INDEX'
+    for name, column in SEARCH_INDEXES.items():
+        key = SEARCH_KEYS.get(vendor, '{column}').format(column=quote(column))
+        schema_editor.execute(f'{create} {quote(name)} ON {table} ({key}, {quote("id")})')
+
+
+def drop_search_indexes(apps, schema_editor):
+    quote = schema_editor.quote_name
+    table = quote(apps.get_model('user', 'User')._meta.db_table)
+    for name in SEARCH_INDEXES:
+        if schema_editor.connection.vendor == 'mysql':
+            schema_editor.execute(f'DROP INDEX {quote(name)} ON {table}')
+        else:
+            schema_editor.execute(f'DROP INDEX {quote(name)}')
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('user', '0003_role_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Q
 from django.contrib.auth.models import AbstractUser
 from django.utils.translation import ugettext_lazy as _
 from .managers import CustomUserManager
@@ -11,11 +12,19 @@ class User(AbstractUser):
     is_agent = models.BooleanField(default=False)
     is_admin = models.BooleanField(default=False)
     is_approved = models.BooleanField(default=True)
+    role_version = models.PositiveIntegerField(default=0)
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = []
 
     objects = CustomUserManager()
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(fields=['id'], name='user_customer_idx', condition=Q(is_customer=True)),
+            models.Index(fields=['id'], name='user_agent_idx', condition=Q(is_agent=True)),
+            models.Index(fields=['id'], name='user_pending_agent_idx', condition=Q(is_agent=True, is_approved=False)),
+        ]
+
     def __str__(self):
         return self.email
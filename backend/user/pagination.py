@@ -0,0 +1,15 @@
+from django.db import models
+
+from backend.pagination import KeysetPagination
+
+
+class UserSearchPagination(KeysetPagination):
+    ordering = ('search_key', 'id')
+    page_size = 20
+    max_page_size = 50
+
+    def get_cursor_field(self, model, name):
+        # search_key is annotated by search_users
+        if name == 'search_key':
+            return models.CharField()
+        return super().get_cursor_field(model, name)
@@ -0,0 +1,30 @@
+from django.db.models import F, Value
+from django.db.models.functions import Collate, Concat, Upper
+
+SEARCH_FIELDS = ('email', 'first_name', 'last_name')
+# Sorts after any other character, so [prefix, prefix + LAST_CHARACTER) holds every value starting with prefix
+LAST_CHARACTER = chr(0x10FFFF)
+
+
+def search_key(field, vendor):
+    """
+    Case insensitive, byte ordered sort key of field, as indexed by migration 0004 of the user app.
+    """
+    if vendor == 'postgresql':
+        return Collate(Upper(field), 'C')
+    if vendor == 'sqlite':
+        return Collate(field, 'NOCASE')
+    return F(field)
+
+
+def search_users(queryset, field, prefix, vendor):
+    """
+    Users whose field starts with prefix, ignoring case, as a range of search_key. Ordered by
+    (search_key, id), the query is one scan of the search index that stops at the page size.
+    """
+    if vendor == 'postgresql':
+        low = Upper(Value(prefix))
+        high = Concat(low, Value(LAST_CHARACTER))
+    else:
+        low, high = prefix, prefix + LAST_CHARACTER
+    return queryset.annotate(search_key=search_key(field, vendor)).filter(search_key__gte=low, search_key__lt=high)
@@ -1,15 +1,17 @@
-from django.contrib.auth import authenticate
-from django.contrib.auth.models import update_last_login
 from rest_framework import serializers
 from rest_framework.serializers import ModelSerializer, Serializer
 from rest_framework_jwt.settings import api_settings
+
+from backend.timing import TimedSerializerMixin
+from .deferred import defer_last_login
+from .hashing import check_credentials
 from .models import User
 
 jwt_payload_handler = api_settings.JWT_PAYLOAD_HANDLER
 jwt_encode_handler = api_settings.JWT_ENCODE_HANDLER
 
 
-class UserSerializer(ModelSerializer):
+class UserSerializer(TimedSerializerMixin, ModelSerializer):
     class Meta:
         model = User
         fields = ['email', 'password', 'first_name',
@@ -30,7 +32,7 @@ class UserSerializer(ModelSerializer):
         return user
 
 
-class CreateAdminSerializer(ModelSerializer):
+class CreateAdminSerializer(TimedSerializerMixin, ModelSerializer):
     class Meta:
         model = User
         fields = ['email', 'password', 'first_name', 'last_name']
@@ -47,7 +49,7 @@ class CreateAdminSerializer(ModelSerializer):
         return user
 
 
-class LoginSerializer(Serializer):
+class LoginSerializer(TimedSerializerMixin, Serializer):
     email = serializers.EmailField(max_length=255)
     password = serializers.CharField(max_length=128, write_only=True)
     is_admin = serializers.BooleanField(default=False)
@@ -58,7 +60,7 @@ class LoginSerializer(Serializer):
     def validate(self, data):
         email = data.get("email", None)
         password = data.get("password", None)
-        user = authenticate(email=email, password=password)
+        user = check_credentials(email, password)
         if user is None:
             raise serializers.ValidationError(
                 'Invalid Credentials'
@@ -69,7 +71,7 @@ class LoginSerializer(Serializer):
             )
         payload = jwt_payload_handler(user)
         token = jwt_encode_handler(payload)
-        update_last_login(None, user)
+        defer_last_login(user)
         user_obj = {
             'email': user.email,
             'token': token,
@@ -80,7 +82,7 @@ class LoginSerializer(Serializer):
         return user_obj
 
 
-class ListUserSerializer(ModelSerializer):
+class ListUserSerializer(TimedSerializerMixin, ModelSerializer):
     class Meta:
         model = User
         exclude = ['password', 'groups', 'user_permissions', 'is_superuser', 'is_staff', 'is_active']
@@ -90,6 +92,10 @@ class ApproveAgentSerializer(Serializer):
     is_approved = serializers.BooleanField(required=True)
 
     def update(self, instance, validated_data):
-        instance.is_approved = validated_data.get('is_approved', instance.is_approved)
+        is_approved = validated_data.get('is_approved', instance.is_approved)
+        if is_approved != instance.is_approved:
+            # Revokes the tokens carrying the previous approval
+            instance.role_version += 1
+        instance.is_approved = is_approved
         instance.save()
         return instance
@@ -0,0 +1,36 @@
+from django.core.signals import request_finished
+from django.db import close_old_connections
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import REVOKED_ROLE_VERSION, publish_role_version
+from .cache import user_cache
+from .deferred import flush_last_logins
+from .models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    user_cache.invalidate(instance)
+
+
+@receiver(post_save, sender=User)
+def publish_user_role_version(sender, instance, **kwargs):
+    publish_role_version(instance, instance.role_version)
+
+
+@receiver(post_delete, sender=User)
+def revoke_deleted_user(sender, instance, **kwargs):
+    publish_role_version(instance, REVOKED_ROLE_VERSION)
+
+
+def write_deferred_last_logins(sender, **kwargs):
+    flush_last_logins()
+
+
+# Connected ahead of close_old_connections, so the flush writes on the connection of the request
+# instead of opening another one once it has been closed
+request_finished.disconnect(close_old_connections)
+request_finished.connect(write_deferred_last_logins)
+request_finished.connect(close_old_connections)
@@ -0,0 +1,61 @@
+from django.test import TestCase
+
+from user.cache import UserCache, user_cache
+from user.models import User
+
+
+class UserCacheTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="temp@gmail.com", password="django1234")
+        self.cache = UserCache(max_size=2, ttl=60)
+        return super().setUp()
+
+    def test_hit_and_miss(self):
+        self.cache.get(self.user.email, User.objects.get_by_natural_key)
+        with self.assertNumQueries(0):
+            cached = self.cache.get(self.user.email, User.objects.get_by_natural_key)
+        self.assertEqual(cached, self.user)
+        self.assertEqual(self.cache.stats()['hits'], 1)
+        self.assertEqual(self.cache.stats()['misses'], 1)
+
+    def test_returns_copies(self):
+        first = self.cache.get(self.user.email, User.objects.get_by_natural_key)
+        first.first_name = "changed"
+        self.assertEqual(self.cache.get(self.user.email, User.objects.get_by_natural_key).first_name, "")
+
+    def test_bounded(self):
+        for email in ["a@gmail.com", "b@gmail.com", "c@gmail.com"]:
+            self.cache.get(email, lambda email: User(email=email))
+        self.assertEqual(self.cache.stats()['size'], 2)
+
+    def test_expiry(self):
+        cache = UserCache(max_size=2, ttl=0)
+        cache.get(self.user.email, User.objects.get_by_natural_key)
+        cache.get(self.user.email, User.objects.get_by_natural_key)
+        self.assertEqual(cache.stats()['misses'], 2)
+
+    def test_missing_user_not_cached(self):
+        with self.assertRaises(User.DoesNotExist):
+            self.cache.get("missing@gmail.com", User.objects.get_by_natural_key)
+        self.assertEqual(self.cache.stats()['size'], 0)
+
+    def test_invalidated_on_save_and_delete(self):
+        user_cache.get(self.user.email, User.objects.get_by_natural_key)
+        self.user.is_approved = False
+        self.user.save()
+        self.assertFalse(user_cache.get(self.user.email, User.objects.get_by_natural_key).is_approved)
+        self.user.delete()
+        with self.assertRaises(User.DoesNotExist):
+            user_cache.get(self.user.email, User.objects.get_by_natural_key)
+
+    # A user changed in another process is reloaded rather than served from this one
+    def test_invalidated_across_processes(self):
+        other = UserCache(max_size=2, ttl=60)
+        self.cache.get(self.user.email, User.objects.get_by_natural_key)
+        User.objects.filter(pk=self.user.pk).update(is_approved=False)
+        with self.captureOnCommitCallbacks(execute=True):
+            other.invalidate(self.user)
+        with self.assertNumQueries(1):
+            self.assertFalse(self.cache.get(self.user.email, User.objects.get_by_natural_key).is_approved)
+        with self.assertNumQueries(0):
+            self.cache.get(self.user.email, User.objects.get_by_natural_key)
@@ -219,8 +219,9 @@ class ApproveDeleteTestSetup(APITestCase):
             "is_customer": True,
             "is_agent": False
         }
-        agent = User.objects.create_user(email="temp@gmail.com", password="temp_pass", is_customer=False, is_agent=True)
-        self.url = reverse('approve-delete', kwargs={'pk': agent.pk})
+        self.agent = User.objects.create_user(email="temp@gmail.com", password="temp_pass", is_customer=False,
+                                              is_agent=True)
+        self.url = reverse('approve-delete', kwargs={'pk': self.agent.pk})
         self.admin = User.objects.create_superuser(email=admin_data['email'], password=admin_data['password'])
         self.customer = User.objects.create_user(email=customer_data['email'], password=customer_data['password'],
                                                  is_customer=customer_data['is_customer'],
@@ -228,4 +229,27 @@ class ApproveDeleteTestSetup(APITestCase):
         return super().setUp()
 
     def tearDown(self):
-        return super().tearDown()
\ No newline at end of file
+        return super().tearDown()
+
+class UserSearchTestSetup(APITestCase):
+    def setUp(self):
+        self.url = reverse('user-search')
+        self.admin = User.objects.create_superuser(email="admin@gmail.com", password="django1234",
+                                                   is_customer=False)
+        self.agent = User.objects.create_user(email="agent@gmail.com", password="django1234", first_name="Anita",
+                                              last_name="Rao", is_customer=False, is_agent=True, is_approved=True)
+        self.customers = [
+            User.objects.create_user(email=email, password="django1234", first_name=first_name, last_name=last_name,
+                                     is_customer=True, is_agent=False)
+            for email, first_name, last_name in [
+                ("ravi@gmail.com", "Ravi", "Kumar"),
+                ("Raj@gmail.com", "Raj", "Anand"),
+                ("rahul@yahoo.com", "Rahul", "Rao"),
+                ("arjun@gmail.com", "Arjun", "Rathi"),
+                ("customer@gmail.com", "Customer", "0"),
+            ]
+        ]
+        return super().setUp()
+
+    def tearDown(self):
+        return super().tearDown()
@@ -1,7 +1,8 @@
 from django.urls import reverse, resolve
 from django.test import  SimpleTestCase
 from user.views import UserView, CreateAdminView, LoginView, ProfileView, ListAdminUserView, ListAgentUserView, \
-                        ListApprovalsView, ApproveDeleteAgentView
+                        ListApprovalsView, ApproveDeleteAgentView, UserCacheStatsView, AsyncProfileView, \
+                        AsyncListAgentUserView, AsyncListAdminUserView, AsyncListApprovalsView, UserSearchView
 
 
 class TestURLs(SimpleTestCase):
@@ -38,3 +39,16 @@ class TestURLs(SimpleTestCase):
         url = reverse('approve-delete', kwargs={'pk': 1})
         self.assertEqual(resolve(url).func.view_class, ApproveDeleteAgentView)
 
+    def test_user_search(self):
+        url = reverse('user-search')
+        self.assertEqual(resolve(url).func.view_class, UserSearchView)
+
+    def test_cache_stats(self):
+        url = reverse('cache-stats')
+        self.assertEqual(resolve(url).func.view_class, UserCacheStatsView)
+
+    def test_async_views(self):
+        for name, view in [('async-profile', AsyncProfileView), ('async-list-agent', AsyncListAgentUserView),
+                           ('async-list-admin', AsyncListAdminUserView),
+                           ('async-list-approvals', AsyncListApprovalsView)]:
+            self.assertEqual(resolve(reverse(name)).func.view_class, view)
@@ -1,13 +1,29 @@
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.signals import request_finished
+from django.db import close_old_connections
+from django.urls import reverse
 from .test_setup import SignupTestSetUp, CreateAdminTestSetup, LoginTestSetup, ProfileTestSetUp, ListAgentTestSetup, \
-                        ListApprovalsTestSetup, ApproveDeleteTestSetup
+                        ListApprovalsTestSetup, ApproveDeleteTestSetup, UserSearchTestSetup
 from rest_framework_jwt.settings import api_settings
 
+from loan.models import Loan, LoanSummary
+from user.authentication import role_version_key
+from user.hashing import HasherBusy
 from user.models import User
+from user.signals import write_deferred_last_logins
 
 jwt_payload_handler = api_settings.JWT_PAYLOAD_HANDLER
 jwt_encode_handler = api_settings.JWT_ENCODE_HANDLER
 
 
+@async_to_sync
+async def async_get(client, url, **extra):
+    return await client.get(url, **extra)
+
+
 class SignupTestViews(SignupTestSetUp):
     # If signup is tried without data
     def test_signup_with_no_data(self):
@@ -110,6 +126,26 @@ class LoginTestViews(LoginTestSetup):
         response = self.client.post(self.login_url, self.incorrect_login, format="json")
         self.assertEqual(response.status_code, 400)
 
+    # Last login is written once the response has been sent
+    def test_login_last_login(self):
+        user = User.objects.create_user(email=self.login['email'], password=self.login['password'])
+        response = self.client.post(self.login_url, self.login, format="json")
+        self.assertEqual(response.status_code, 200)
+        user.refresh_from_db()
+        self.assertIsNotNone(user.last_login)
+
+    # Last logins are written before the connections of the request are closed
+    def test_last_login_flushed_before_closing_connections(self):
+        receivers = request_finished._live_receivers(None)
+        self.assertLess(receivers.index(write_deferred_last_logins), receivers.index(close_old_connections))
+
+    # Logins are refused rather than queued when the hasher pool is saturated
+    def test_login_hasher_busy(self):
+        User.objects.create_user(email=self.login['email'], password=self.login['password'])
+        with mock.patch('user.hashing.run_hasher', side_effect=HasherBusy):
+            response = self.client.post(self.login_url, self.login, format="json")
+        self.assertEqual(response.status_code, 503)
+
 
 class ProfileTestViews(ProfileTestSetUp):
     # Authenticated get request
@@ -123,6 +159,13 @@ class ProfileTestViews(ProfileTestSetUp):
         response = self.client.get(self.profile_url, format="json")
         self.assertEqual(response.status_code, 401)
 
+    # Repeated requests are served from the user cache
+    def test_cached_user(self):
+        self.client.get(self.profile_url, format="json")
+        with self.assertNumQueries(0):
+            response = self.client.get(self.profile_url, format="json")
+        self.assertEqual(response.data['email'], self.user.email)
+
 
 class ListAdminTestViews(ListAgentTestSetup):
     # Authenticated request by admin role
@@ -222,6 +265,17 @@ class ApprovalDeleteTestViews(ApproveDeleteTestSetup):
         response = self.client.delete(self.url, format="json")
         self.assertEqual(response.status_code, 200)
 
+    # Deleting an agent deletes the loans granted by the agent and their portfolio summary rows
+    def test_admin_delete_agent_with_loans(self):
+        Loan.objects.create(user=self.customer, granted_by=self.agent, principal=50000.00, interest=8.45, months=12)
+        Loan.objects.create(user=self.customer, principal=20000.00, interest=8.45, months=12)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {jwt_encode_handler(jwt_payload_handler(self.admin))}")
+        response = self.client.delete(self.url, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(User.objects.filter(pk=self.agent.pk).exists())
+        self.assertEqual(Loan.objects.count(), 1)
+        self.assertEqual(list(LoanSummary.objects.values_list('granted_by', 'count')), [(None, 1)])
+
     # Authenticated request by non admin role - Will not work
     def test_customer_authenticated(self):
         payload = jwt_payload_handler(self.customer)
@@ -235,3 +289,205 @@ class ApprovalDeleteTestViews(ApproveDeleteTestSetup):
         self.client.force_authenticate(user=None, token=None)
         response = self.client.get(self.url, format="json")
         self.assertEqual(response.status_code, 401)
+
+    # Revoking an agent drops the cached user, so the agent loses access right away
+    def test_admin_revoke_cached_agent(self):
+        agent_token = jwt_encode_handler(jwt_payload_handler(self.agent))
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {jwt_encode_handler(jwt_payload_handler(self.admin))}")
+        self.client.put(self.url, {"is_approved": True}, format="json")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {agent_token}")
+        self.assertEqual(self.client.post(reverse('customer-loan')).status_code, 400)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {jwt_encode_handler(jwt_payload_handler(self.admin))}")
+        self.client.put(self.url, {"is_approved": False}, format="json")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {agent_token}")
+        self.assertEqual(self.client.post(reverse('customer-loan')).status_code, 403)
+
+
+class UserCacheStatsTestViews(ApproveDeleteTestSetup):
+
+    # Authenticated request by admin role
+    def test_admin_authenticated(self):
+        payload = jwt_payload_handler(self.admin)
+        token = jwt_encode_handler(payload)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        response = self.client.get(reverse('cache-stats'), format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('hits', response.data['stats'])
+
+    # Authenticated request by non admin role - Will not work
+    def test_customer_authenticated(self):
+        payload = jwt_payload_handler(self.customer)
+        token = jwt_encode_handler(payload)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        response = self.client.get(reverse('cache-stats'), format="json")
+        self.assertEqual(response.status_code, 403)
+
+
+class RoleClaimsTestViews(ApproveDeleteTestSetup):
+
+    def authenticate(self, user):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {jwt_encode_handler(jwt_payload_handler(user))}")
+
+    # Tokens carry the role claims and their version
+    def test_payload_claims(self):
+        payload = jwt_payload_handler(self.agent)
+        self.assertTrue(payload['is_agent'])
+        self.assertTrue(payload['is_approved'])
+        self.assertEqual(payload['role_version'], 0)
+
+    # Read only endpoints authorize from the token without reading the user
+    def test_stateless_permission(self):
+        self.authenticate(self.admin)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('list-approvals'), format="json")
+        self.assertEqual(response.status_code, 200)
+
+    # Flipping the approval of an agent revokes the tokens issued before
+    def test_approval_revokes_tokens(self):
+        old_token = jwt_encode_handler(jwt_payload_handler(self.agent))
+        self.authenticate(self.admin)
+        self.client.put(self.url, {"is_approved": False}, format="json")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {old_token}")
+        self.assertEqual(self.client.get(reverse('list-agent'), format="json").status_code, 401)
+        self.agent.refresh_from_db()
+        self.authenticate(self.agent)
+        self.assertEqual(self.client.get(reverse('list-agent'), format="json").status_code, 200)
+
+    # Deleting a user revokes all of its tokens
+    def test_delete_revokes_tokens(self):
+        agent_token = jwt_encode_handler(jwt_payload_handler(self.agent))
+        self.authenticate(self.admin)
+        self.client.delete(self.url, format="json")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {agent_token}")
+        self.assertEqual(self.client.get(reverse('list-agent'), format="json").status_code, 401)
+
+
+    # Revocations are not lost with the cache: on a miss the role version is read from the database
+    def test_revocation_survives_cache_miss(self):
+        old_token = jwt_encode_handler(jwt_payload_handler(self.agent))
+        key = role_version_key(self.agent.pk, self.agent.email)
+        self.authenticate(self.admin)
+        self.client.put(self.url, {"is_approved": False}, format="json")
+        cache.delete(key)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {old_token}")
+        self.assertEqual(self.client.get(reverse('list-agent'), format="json").status_code, 401)
+        self.assertEqual(cache.get(key), 1)
+        self.agent.refresh_from_db()
+        self.authenticate(self.agent)
+        cache.delete(key)
+        self.assertEqual(self.client.get(reverse('list-agent'), format="json").status_code, 200)
+        self.agent.delete()
+        cache.delete(key)
+        self.assertEqual(self.client.get(reverse('list-agent'), format="json").status_code, 401)
+
+
+class AsyncViewsTestViews(ListAgentTestSetup):
+
+    def get(self, name, user=None, asynchronous=False):
+        token = user and f"Bearer {jwt_encode_handler(jwt_payload_handler(user))}"
+        if asynchronous:
+            # The async client of Django 3.2 takes headers by their name, not their WSGI environ key
+            extra = {'authorization': token} if token else {}
+            return async_get(self.async_client, reverse(name), **extra)
+        extra = {'HTTP_AUTHORIZATION': token} if token else {}
+        return self.client.get(reverse(name), **extra)
+
+    # The async views answer exactly like the synchronous ones
+    def test_same_responses(self):
+        for name, user in [('profile', self.admin), ('list-agent', self.agent), ('list-admin', self.admin),
+                           ('list-approvals', self.admin)]:
+            response = self.get(name, user)
+            async_response = self.get(f'async-{name}', user, asynchronous=True)
+            self.assertEqual(async_response.status_code, 200)
+            self.assertEqual(async_response.content, response.content)
+            self.assertEqual(async_response['Content-Type'], response['Content-Type'])
+
+    # Permissions and authentication failures are the same as well
+    def test_denied(self):
+        response = self.get('async-list-admin', self.customer, asynchronous=True)
+        self.assertEqual(response.status_code, 403)
+        response = self.get('async-list-agent', asynchronous=True)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['WWW-Authenticate'], self.get('list-agent')['WWW-Authenticate'])
+
+    # A role version missing from the cache is read from the database off the event loop
+    def test_async_role_version_miss(self):
+        key = role_version_key(self.admin.pk, self.admin.email)
+        token = f"Bearer {jwt_encode_handler(jwt_payload_handler(self.admin))}"
+        cache.delete(key)
+        self.assertEqual(async_get(self.async_client, reverse('async-list-admin'), authorization=token).status_code,
+                         200)
+        self.admin.delete()
+        cache.delete(key)
+        self.assertEqual(async_get(self.async_client, reverse('async-list-admin'), authorization=token).status_code,
+                         401)
+
+    # The profile is served from the user cache without touching the database
+    def test_async_cached_user(self):
+        self.get('async-profile', self.admin, asynchronous=True)
+        with self.assertNumQueries(0):
+            response = self.get('async-profile', self.admin, asynchronous=True)
+        self.assertEqual(response.json()['email'], self.admin.email)
+
+
+class UserSearchTestViews(UserSearchTestSetup):
+
+    def search(self, user, **params):
+        token = jwt_encode_handler(jwt_payload_handler(user))
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        return self.client.get(self.url, params, format="json")
+
+    # Prefix of the email, ignoring case, in order of the email
+    def test_email_prefix(self):
+        response = self.search(self.admin, q="RA")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([user['email'] for user in response.data['results']],
+                         ["rahul@yahoo.com", "Raj@gmail.com", "ravi@gmail.com"])
+
+    # Prefix of the first or last name
+    def test_name_prefix(self):
+        response = self.search(self.admin, q="ar", field="first_name")
+        self.assertEqual([user['email'] for user in response.data['results']], ["arjun@gmail.com"])
+        # Users with the same name follow one another in the order they signed up
+        response = self.search(self.admin, q="ra", field="last_name")
+        self.assertEqual([user['email'] for user in response.data['results']],
+                         ["agent@gmail.com", "rahul@yahoo.com", "arjun@gmail.com"])
+
+    # Admins search customers and agents or either role, agents only customers
+    def test_roles(self):
+        response = self.search(self.admin, q="a", role="agent")
+        self.assertEqual([user['email'] for user in response.data['results']], ["agent@gmail.com"])
+        response = self.search(self.agent, q="a")
+        self.assertEqual([user['email'] for user in response.data['results']], ["arjun@gmail.com"])
+        response = self.search(self.agent, q="a", role="agent")
+        self.assertEqual([user['email'] for user in response.data['results']], ["arjun@gmail.com"])
+
+    # Pages are bounded and follow one another in one query each
+    def test_pages(self):
+        response = self.search(self.admin, q="r", page_size=1000)
+        self.assertEqual(len(response.data['results']), 3)
+        emails = []
+        url = self.url + "?q=r&page_size=2"
+        while url:
+            with self.assertNumQueries(1):
+                response = self.client.get(url, format="json")
+            emails += [user['email'] for user in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(emails, ["rahul@yahoo.com", "Raj@gmail.com", "ravi@gmail.com"])
+
+    def test_invalid(self):
+        for params in [{}, {'q': 'ra', 'field': 'password'}, {'q': 'ra', 'role': 'admin'}]:
+            response = self.search(self.admin, **params)
+            self.assertEqual(response.status_code, 400)
+            self.assertFalse(response.data['success'])
+
+    # Authenticated request by customer role - Will not work
+    def test_customer_authenticated(self):
+        response = self.search(self.customers[0], q="ra")
+        self.assertEqual(response.status_code, 403)
+
+    # Unauthenticated request
+    def test_not_authenticated(self):
+        self.client.force_authenticate(user=None, token=None)
+        response = self.client.get(self.url, {'q': 'ra'}, format="json")
+        self.assertEqual(response.status_code, 401)
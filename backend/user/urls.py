@@ -1,6 +1,7 @@
 from django.urls import path
 from .views import UserView, LoginView, ProfileView, ListAdminUserView, ListAgentUserView, CreateAdminView, \
-                    ListApprovalsView, ApproveDeleteAgentView
+                    ListApprovalsView, ApproveDeleteAgentView, UserCacheStatsView, AsyncProfileView, \
+                    AsyncListAgentUserView, AsyncListAdminUserView, AsyncListApprovalsView, UserSearchView
 
 urlpatterns = [
     path('signup/', UserView.as_view(), name='signup'),
@@ -9,6 +10,12 @@ urlpatterns = [
     path('profile/', ProfileView.as_view(), name='profile'),
     path('list-agent/', ListAgentUserView.as_view(), name='list-agent'),
     path('list-admin/', ListAdminUserView.as_view(), name='list-admin'),
+    path('search/', UserSearchView.as_view(), name='user-search'),
     path('list-approvals/', ListApprovalsView.as_view(), name='list-approvals'),
-    path('approve-delete/<int:pk>/', ApproveDeleteAgentView.as_view(), name='approve-delete')
+    path('approve-delete/<int:pk>/', ApproveDeleteAgentView.as_view(), name='approve-delete'),
+    path('cache-stats/', UserCacheStatsView.as_view(), name='cache-stats'),
+    path('async/profile/', AsyncProfileView.as_view(), name='async-profile'),
+    path('async/list-agent/', AsyncListAgentUserView.as_view(), name='async-list-agent'),
+    path('async/list-admin/', AsyncListAdminUserView.as_view(), name='async-list-admin'),
+    path('async/list-approvals/', AsyncListApprovalsView.as_view(), name='async-list-approvals')
 ]
@@ -0,0 +1,11 @@
+from rest_framework_jwt.utils import jwt_payload_handler as base_jwt_payload_handler
+
+ROLE_CLAIMS = ('is_admin', 'is_agent', 'is_customer', 'is_approved')
+
+
+def jwt_payload_handler(user):
+    payload = base_jwt_payload_handler(user)
+    for claim in ROLE_CLAIMS:
+        payload[claim] = getattr(user, claim)
+    payload['role_version'] = user.role_version
+    return payload
@@ -1,5 +1,6 @@
 import datetime
 
+from django.db import connection
 from django.db.models import Q
 from django.http import Http404
 
@@ -8,12 +9,19 @@ from rest_framework import generics
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.views import APIView
-from rest_framework_jwt.authentication import JSONWebTokenAuthentication
 from rest_framework_jwt.settings import api_settings
 from rest_framework.exceptions import ValidationError
 
+from backend.async_views import AsyncAPIViewMixin
+from backend.query_budget import QueryBudgetMixin
+
+from .authentication import CachedJSONWebTokenAuthentication, RoleClaimsJSONWebTokenAuthentication
+from .cache import user_cache
+from .hashing import HasherBusy
 from .permissions import IsAdmin, IsAgent, IsAdminOrAgent
 from .models import User
+from .pagination import UserSearchPagination
+from .search import SEARCH_FIELDS, search_users
 from .serializers import UserSerializer, LoginSerializer, ListUserSerializer, CreateAdminSerializer, \
     ApproveAgentSerializer
 
@@ -47,7 +55,7 @@ class UserView(APIView):
 
 class CreateAdminView(APIView):
     permission_classes = (IsAuthenticated, IsAdmin,)
-    authentication_classes = (JSONWebTokenAuthentication,)
+    authentication_classes = (CachedJSONWebTokenAuthentication,)
 
     def post(self, request):
         user_serializer = CreateAdminSerializer(data=request.data)
@@ -87,15 +95,21 @@ class LoginView(APIView):
                 'message': f'Internal Server Error'
             }
             return Response(response, status=status.HTTP_400_BAD_REQUEST)
+        except HasherBusy:
+            response = {
+                'success': False,
+                'message': 'Too many logins in progress, please retry'
+            }
+            return Response(response, status=status.HTTP_503_SERVICE_UNAVAILABLE)
 
 
 class ProfileView(APIView):
     permission_classes = (IsAuthenticated,)
-    authentication_classes = (JSONWebTokenAuthentication,)
+    authentication_classes = (CachedJSONWebTokenAuthentication,)
 
     def get(self, request):
         try:
-            user = User.objects.get(email=request.user)
+            user = request.user
             response = {
                 'success': True,
                 'message': 'Profile fetched',
@@ -118,10 +132,11 @@ class ProfileView(APIView):
             return Response(response, status=status.HTTP_400_BAD_REQUEST)
 
 
-class ListAgentUserView(generics.ListAPIView):
+class ListAgentUserView(QueryBudgetMixin, generics.ListAPIView):
     permission_classes = (IsAuthenticated, IsAdminOrAgent,)
-    authentication_classes = (JSONWebTokenAuthentication,)
+    authentication_classes = (RoleClaimsJSONWebTokenAuthentication,)
     serializer_class = ListUserSerializer
+    query_budget = 2
     queryset = User.objects.filter(is_customer=True)
 
     def list(self, request, *args, **kwargs):
@@ -130,10 +145,11 @@ class ListAgentUserView(generics.ListAPIView):
         return Response(serializer.data)
 
 
-class ListAdminUserView(generics.ListAPIView):
+class ListAdminUserView(QueryBudgetMixin, generics.ListAPIView):
     permission_classes = (IsAuthenticated, IsAdmin,)
-    authentication_classes = (JSONWebTokenAuthentication,)
+    authentication_classes = (RoleClaimsJSONWebTokenAuthentication,)
     serializer_class = ListUserSerializer
+    query_budget = 2
     queryset = User.objects.filter(Q(is_customer=True) | Q(is_agent=True))
 
     def list(self, request, *args, **kwargs):
@@ -142,10 +158,43 @@ class ListAdminUserView(generics.ListAPIView):
         return Response(serializer.data)
 
 
-class ListApprovalsView(generics.ListAPIView):
+class UserSearchView(QueryBudgetMixin, generics.ListAPIView):
+    permission_classes = (IsAuthenticated, IsAdminOrAgent,)
+    authentication_classes = (RoleClaimsJSONWebTokenAuthentication,)
+    serializer_class = ListUserSerializer
+    pagination_class = UserSearchPagination
+    query_budget = 1
+    roles = {'customer': Q(is_customer=True), 'agent': Q(is_agent=True)}
+
+    def get_queryset(self):
+        params = self.request.query_params
+        # Agents only see customers, as in list-agent
+        role = params.get('role') if self.request.user.is_admin else 'customer'
+        qs = User.objects.filter(self.roles[role] if role else self.roles['customer'] | self.roles['agent'])
+        return search_users(qs, params.get('field', 'email'), params['q'], connection.vendor)
+
+    def list(self, request, *args, **kwargs):
+        params = request.query_params
+        if not params.get('q'):
+            message = 'A search prefix q is required'
+        elif params.get('field', 'email') not in SEARCH_FIELDS:
+            message = f"field must be one of {', '.join(SEARCH_FIELDS)}"
+        elif params.get('role', 'customer') not in self.roles:
+            message = f"role must be one of {', '.join(self.roles)}"
+        else:
+            return super().list(request, *args, **kwargs)
+        response = {
+            'success': False,
+            'message': message
+        }
+        return Response(response, status=status.HTTP_400_BAD_REQUEST)
+
+
+class ListApprovalsView(QueryBudgetMixin, generics.ListAPIView):
     permission_classes = (IsAuthenticated, IsAdmin,)
-    authentication_classes = (JSONWebTokenAuthentication,)
+    authentication_classes = (RoleClaimsJSONWebTokenAuthentication,)
     serializer_class = ListUserSerializer
+    query_budget = 2
     queryset = User.objects.filter(is_agent=True, is_approved=False)
 
     def list(self, request, *args, **kwargs):
@@ -156,7 +205,7 @@ class ListApprovalsView(generics.ListAPIView):
 
 class ApproveDeleteAgentView(APIView):
     permission_classes = (IsAuthenticated, IsAdmin,)
-    authentication_classes = (JSONWebTokenAuthentication,)
+    authentication_classes = (CachedJSONWebTokenAuthentication,)
 
     def get_object(self, pk):
         try:
@@ -195,3 +244,34 @@ class ApproveDeleteAgentView(APIView):
                 "message": "Could not delete agent"
             }
             return Response(response, status=status.HTTP_400_BAD_REQUEST)
+
+
+class UserCacheStatsView(APIView):
+    permission_classes = (IsAuthenticated, IsAdmin,)
+    authentication_classes = (CachedJSONWebTokenAuthentication,)
+
+    def get(self, request):
+        response = {
+            'success': True,
+            'message': 'User cache stats fetched',
+            'stats': user_cache.stats()
+        }
+        return Response(response, status=status.HTTP_200_OK)
+
+
+class AsyncProfileView(AsyncAPIViewMixin, ProfileView):
+    # Builds the profile from the authenticated user alone, so it never leaves the event loop
+    async def get(self, request):
+        return super().get(request)
+
+
+class AsyncListAgentUserView(AsyncAPIViewMixin, ListAgentUserView):
+    pass
+
+
+class AsyncListAdminUserView(AsyncAPIViewMixin, ListAdminUserView):
+    pass
+
+
+class AsyncListApprovalsView(AsyncAPIViewMixin, ListApprovalsView):
+    pass